@@ -4,6 +4,7 @@ import collections
 import copy
 import logging
 import asyncio
+import random
 import urllib.parse
 import sys
 import typing
@@ -196,6 +197,9 @@ class CommonContext:
             self._unknown_item: typing.Callable[[int], str] = lambda key: f"Unknown {lookup_type} (ID: {key})"
             self._archipelago_lookup: typing.Dict[int, str] = {}
             self._flat_store: typing.Dict[int, str] = Utils.KeyedDefaultDict(self._unknown_item)
+            self._flat_store_updates: typing.Dict[str, typing.Mapping[int, str]] = {}
+            """ latest lookup table by game not yet added to _flat_store, which only the deprecated implicit lookups
+            need """
             self._game_store: typing.Dict[str, typing.ChainMap[int, str]] = collections.defaultdict(
                 lambda: collections.ChainMap(self._archipelago_lookup, Utils.KeyedDefaultDict(self._unknown_item)))
             self.warned: bool = False
@@ -212,6 +216,9 @@ class CommonContext:
                                   f"{self.lookup_type}, name could be incorrect. Please use "
                                   f"`{self.lookup_type}_names.lookup_in_game()` or "
                                   f"`{self.lookup_type}_names.lookup_in_slot()` instead.")
+                for lookup_table in self._flat_store_updates.values():
+                    self._flat_store.update(lookup_table)
+                self._flat_store_updates.clear()
                 return self._flat_store[key]  # type: ignore
 
             return self._game_store[key]
@@ -248,12 +255,20 @@ class CommonContext:
 
             return self.lookup_in_game(code, self.ctx.slot_info[slot].game)
 
-        def update_game(self, game: str, name_to_id_lookup_table: typing.Dict[str, int]) -> None:
+        def update_game(self, game: str, name_to_id_lookup_table: typing.Mapping[str, int]) -> None:
             """Overrides existing lookup tables for a particular game."""
-            id_to_name_lookup_table = Utils.KeyedDefaultDict(self._unknown_item)
-            id_to_name_lookup_table.update({code: name for name, code in name_to_id_lookup_table.items()})
-            self._game_store[game] = collections.ChainMap(self._archipelago_lookup, id_to_name_lookup_table)
-            self._flat_store.update(id_to_name_lookup_table)  # Only needed for legacy lookup method.
+            id_to_name_lookup_table: typing.Mapping[int, str]
+            if isinstance(name_to_id_lookup_table, Utils.DataPackageNameToId):
+                # names are looked up in the cache file, instead of building a dict of all of them
+                id_to_name_lookup_table = name_to_id_lookup_table.id_to_name
+            else:
+                id_to_name_lookup_table = {code: name for name, code in name_to_id_lookup_table.items()}
+            self._game_store[game] = collections.ChainMap(self._archipelago_lookup, id_to_name_lookup_table,
+                                                          Utils.KeyedDefaultDict(self._unknown_item))
+            # Only needed for legacy lookup method. Replaces the game's pending table, moving it last so it still
+            # overrides the tables of games updated before it.
+            self._flat_store_updates.pop(game, None)
+            self._flat_store_updates[game] = id_to_name_lookup_table
             if game == "Archipelago":
                 # Keep track of the Archipelago data package separately so if it gets updated in a custom datapackage,
                 # it updates in all chain maps automatically.
@@ -263,6 +278,9 @@ class CommonContext:
     # defaults
     starting_reconnect_delay: int = 5
     current_reconnect_delay: int = starting_reconnect_delay
+    maximum_reconnect_delay: int = 300
+    reconnect_jitter: float = 0.5
+    """ reconnect delays are randomized by this fraction, so clients don't all return to a restarted server at once """
     command_processor: typing.Type[CommandProcessor] = ClientCommandProcessor
     ui: typing.Optional["kvui.GameManager"] = None
     ui_task: typing.Optional["asyncio.Task[None]"] = None
@@ -293,6 +311,8 @@ class CommonContext:
     slot: typing.Optional[int]
     auth: typing.Optional[str]
     seed_name: typing.Optional[str]
+    resume_token: typing.Optional[str]
+    """ sent by the server in Connected, lets a reconnect skip items we already have """
 
     # locations
     locations_checked: typing.Set[int]  # local state
@@ -307,6 +327,10 @@ class CommonContext:
     stored_data: typing.Dict[str, typing.Any]
     stored_data_notification_keys: typing.Set[str]
 
+    # data package
+    data_package_checksums: typing.Dict[str, str]
+    """ checksums of the data packages currently loaded into item_names and location_names """
+
     # internals
     # current message box through kvui
     _messagebox: typing.Optional["kvui.MessageBox"] = None
@@ -333,6 +357,7 @@ class CommonContext:
         self.slot = None
         self.auth = None
         self.seed_name = None
+        self.resume_token = None
 
         self.locations_checked = set()  # local state
         self.locations_scouted = set()
@@ -355,6 +380,7 @@ class CommonContext:
 
         self.item_names = self.NameLookupDict(self, "item")
         self.location_names = self.NameLookupDict(self, "location")
+        self.data_package_checksums = {}
 
         self.jsontotextparser = JSONtoTextParser(self)
         self.rawjsontotextparser = RawJSONtoTextParser(self)
@@ -362,6 +388,7 @@ class CommonContext:
 
         # execution
         self.keep_alive_task = asyncio.create_task(keep_alive(self), name="Bouncy")
+        self.scheduled_message_tasks: typing.Set["asyncio.Task[None]"] = set()
 
     @property
     def suggested_address(self) -> str:
@@ -388,7 +415,10 @@ class CommonContext:
         self.auth = None
         self.slot = None
         self.team = None
-        self.items_received = []
+        if self.disconnected_intentionally:
+            self.items_received = []
+            self.resume_token = None
+        # else keep them, to resume with the items we already have after automatically reconnecting
         self.locations_info = {}
         self.server_version = Version(0, 0, 0)
         self.generator_version = Version(0, 0, 0)
@@ -417,6 +447,22 @@ class CommonContext:
             return
         await self.server.socket.send(encode(msgs))
 
+    def schedule_messages(self, messages: typing.Iterable[str], interval: float = 0.05, delay: float = 0,
+                          log: typing.Callable[[str], None] = logger.info) -> "asyncio.Task[None]":
+        """Logs `messages` one after another, `interval` seconds apart and starting after `delay` seconds, without
+        blocking the event loop like sleeping between them would. Pending messages are dropped on shutdown."""
+        async def log_messages() -> None:
+            await asyncio.sleep(delay)
+            for index, message in enumerate(messages):
+                if index:
+                    await asyncio.sleep(interval)
+                log(message)
+
+        task = asyncio.create_task(log_messages(), name="scheduled messages")
+        self.scheduled_message_tasks.add(task)
+        task.add_done_callback(self.scheduled_message_tasks.discard)
+        return task
+
     def consume_players_package(self, package: typing.List[tuple]):
         self.player_names = {slot: name for team, slot, name, orig_name in package if self.team == team}
         self.player_names[0] = "Archipelago"
@@ -451,6 +497,9 @@ class CommonContext:
             'tags': self.tags, 'items_handling': self.items_handling,
             'uuid': Utils.get_unique_identifier(), 'game': self.game, "slot_data": self.want_slot_data,
         }
+        if self.resume_token:
+            payload["resume_token"] = self.resume_token
+            payload["items_index"] = len(self.items_received)
         if kwargs:
             payload.update(kwargs)
         await self.send_msgs([payload])
@@ -500,7 +549,7 @@ class CommonContext:
     def on_print_json(self, args: dict):
         if self.ui:
             # send copy to UI
-            self.ui.print_json(copy.deepcopy(args["data"]))
+            self.ui.print_json(copy.deepcopy(args["data"]), args)
 
         logging.getLogger("FileLog").info(self.rawjsontotextparser(copy.deepcopy(args["data"])),
                                           extra={"NoStream": True})
@@ -545,6 +594,8 @@ class CommonContext:
             self.input_queue.put_nowait(None)
             self.input_requests -= 1
         self.keep_alive_task.cancel()
+        for task in self.scheduled_message_tasks:
+            task.cancel()
         if self.ui_task:
             await self.ui_task
         if self.input_task:
@@ -567,6 +618,9 @@ class CommonContext:
             remote_version: int = remote_date_package_versions.get(game, 0)
             remote_checksum: typing.Optional[str] = remote_data_package_checksums.get(game)
 
+            if remote_checksum and self.data_package_checksums.get(game) == remote_checksum:
+                continue  # already loaded, for example when reconnecting
+
             if remote_version == 0 and not remote_checksum:  # custom data package and no checksum for this game
                 needed_updates.add(game)
                 continue
@@ -591,6 +645,10 @@ class CommonContext:
     def update_game(self, game_package: dict, game: str):
         self.item_names.update_game(game, game_package["item_name_to_id"])
         self.location_names.update_game(game, game_package["location_name_to_id"])
+        if "checksum" in game_package:
+            self.data_package_checksums[game] = game_package["checksum"]
+        else:
+            self.data_package_checksums.pop(game, None)
 
     def update_data_package(self, data_package: dict):
         for game, game_data in data_package["games"].items():
@@ -787,14 +845,16 @@ async def server_loop(ctx: CommonContext, address: typing.Optional[str] = None)
     finally:
         await ctx.connection_closed()
         if ctx.server_address and ctx.username and not ctx.disconnected_intentionally:
-            logger.info(f"... automatically reconnecting in {ctx.current_reconnect_delay} seconds")
+            delay = ctx.current_reconnect_delay * random.uniform(1 - ctx.reconnect_jitter, 1 + ctx.reconnect_jitter)
+            logger.info(f"... automatically reconnecting in {delay:.1f} seconds")
             assert ctx.autoreconnect_task is None
-            ctx.autoreconnect_task = asyncio.create_task(server_autoreconnect(ctx), name="server auto reconnect")
-        ctx.current_reconnect_delay *= 2
+            ctx.autoreconnect_task = asyncio.create_task(server_autoreconnect(ctx, delay),
+                                                         name="server auto reconnect")
+        ctx.current_reconnect_delay = min(ctx.current_reconnect_delay * 2, ctx.maximum_reconnect_delay)
 
 
-async def server_autoreconnect(ctx: CommonContext):
-    await asyncio.sleep(ctx.current_reconnect_delay)
+async def server_autoreconnect(ctx: CommonContext, delay: typing.Optional[float] = None):
+    await asyncio.sleep(ctx.current_reconnect_delay if delay is None else delay)
     if ctx.server_address and ctx.server_task is None:
         ctx.server_task = asyncio.create_task(server_loop(ctx), name="server loop")
 
@@ -886,6 +946,7 @@ async def process_server_cmd(ctx: CommonContext, args: dict):
         ctx.username = ctx.auth
         ctx.team = args["team"]
         ctx.slot = args["slot"]
+        ctx.resume_token = args.get("resume_token")
         # int keys get lost in JSON transfer
         ctx.slot_info = {0: NetworkSlot("Archipelago", "Archipelago", SlotType.player)}
         ctx.slot_info.update({int(pid): data for pid, data in args["slot_info"].items()})
@@ -7,7 +7,7 @@ import tempfile
 import time
 import zipfile
 import zlib
-from typing import Dict, List, Optional, Set, Tuple, Union
+from typing import Callable, Dict, List, Optional, Set, Tuple, Union
 
 import worlds
 from BaseClasses import CollectionState, Item, Location, LocationProgressType, MultiWorld, Region
@@ -22,7 +22,13 @@ from worlds.generic.Rules import exclusion_rules, locality_rules
 __all__ = ["main"]
 
 
-def main(args, seed=None, baked_server_options: Optional[Dict[str, object]] = None):
+def main(args, seed=None, baked_server_options: Optional[Dict[str, object]] = None,
+         on_phase: Optional[Callable[[str], None]] = None):
+    """on_phase is called with the name of each generation phase as it begins, for reporting progress."""
+    def enter_phase(phase: str) -> None:
+        if on_phase:
+            on_phase(phase)
+
     if not baked_server_options:
         baked_server_options = get_settings().server_options.as_dict()
     assert isinstance(baked_server_options, dict)
@@ -84,6 +90,7 @@ def main(args, seed=None, baked_server_options: Optional[Dict[str, object]] = No
     if not args.skip_output:
         AutoWorld.call_stage(multiworld, "assert_generate")
 
+    enter_phase("generate_early")
     AutoWorld.call_all(multiworld, "generate_early")
 
     logger.info('')
@@ -110,12 +117,15 @@ def main(args, seed=None, baked_server_options: Optional[Dict[str, object]] = No
                     del local_early
             del early
 
+    enter_phase("create_regions")
     logger.info('Creating MultiWorld.')
     AutoWorld.call_all(multiworld, "create_regions")
 
+    enter_phase("create_items")
     logger.info('Creating Items.')
     AutoWorld.call_all(multiworld, "create_items")
 
+    enter_phase("set_rules")
     logger.info('Calculating Access Rules.')
 
     for player in multiworld.player_ids:
@@ -198,14 +208,17 @@ def main(args, seed=None, baked_server_options: Optional[Dict[str, object]] = No
     if any(multiworld.item_links.values()):
         multiworld._all_state = None
 
+    enter_phase("plando")
     logger.info("Running Item Plando.")
 
     distribute_planned(multiworld)
 
+    enter_phase("pre_fill")
     logger.info('Running Pre Main Fill.')
 
     AutoWorld.call_all(multiworld, "pre_fill")
 
+    enter_phase("fill")
     logger.info(f'Filling the multiworld with {len(multiworld.itempool)} items.')
 
     if multiworld.algorithm == 'flood':
@@ -213,6 +226,7 @@ def main(args, seed=None, baked_server_options: Optional[Dict[str, object]] = No
     elif multiworld.algorithm == 'balanced':
         distribute_items_restrictive(multiworld, get_settings().generator.panic_method)
 
+    enter_phase("post_fill")
     AutoWorld.call_all(multiworld, 'post_fill')
 
     if multiworld.players > 1 and not args.skip_prog_balancing:
@@ -227,6 +241,7 @@ def main(args, seed=None, baked_server_options: Optional[Dict[str, object]] = No
         logger.info('Done. Skipped output/spoiler generation. Total Time: %s', time.perf_counter() - start)
         return multiworld
 
+    enter_phase("output")
     logger.info(f'Beginning output...')
     outfilebase = 'AP_' + multiworld.seed_name
 
@@ -362,12 +377,14 @@ def main(args, seed=None, baked_server_options: Optional[Dict[str, object]] = No
                 future.result()
 
         if args.spoiler > 1:
+            enter_phase("playthrough")
             logger.info('Calculating playthrough.')
             multiworld.spoiler.create_playthrough(create_paths=args.spoiler > 2)
 
         if args.spoiler:
             multiworld.spoiler.to_file(os.path.join(temp_dir, '%s_Spoiler.txt' % outfilebase))
 
+        enter_phase("archive")
         zipfilename = output_path(f"AP_{multiworld.seed_name}.zip")
         logger.info(f"Creating final archive at {zipfilename}")
         with zipfile.ZipFile(zipfilename, mode="w", compression=zipfile.ZIP_DEFLATED,
@@ -2,12 +2,15 @@ from __future__ import annotations
 
 import argparse
 import asyncio
+import base64
 import collections
 import contextlib
 import copy
 import datetime
 import functools
+import gzip
 import hashlib
+import hmac
 import inspect
 import itertools
 import logging
@@ -15,7 +18,9 @@ import math
 import operator
 import pickle
 import random
+import secrets
 import shlex
+import sys
 import threading
 import time
 import typing
@@ -159,6 +164,121 @@ class Client(Endpoint):
 team_slot = typing.Tuple[int, int]
 
 
+class _NameLookup(dict):
+    """Read-only id to name table, shared between all Contexts of a process that host the same game data."""
+    __slots__ = ("kind", "__weakref__")
+
+    def __init__(self, kind: str, names: typing.Iterable[typing.Tuple[int, str]]):
+        super().__init__((code, sys.intern(name)) for code, name in names)
+        self.kind = kind
+
+    def __missing__(self, code: int) -> str:
+        return f"Unknown {self.kind} (ID:{code})"
+
+
+class SharedGameData:
+    """Name tables derived from one game's data package. Treat as immutable, as it is shared between rooms."""
+    __slots__ = ("item_names", "location_names", "all_item_and_group_names", "all_location_and_group_names",
+                 "__weakref__")
+
+    item_names: typing.Mapping[int, str]
+    location_names: typing.Mapping[int, str]
+    all_item_and_group_names: typing.FrozenSet[str]
+    all_location_and_group_names: typing.FrozenSet[str]
+
+    def __init__(self, game_package: typing.Dict[str, typing.Any], archipelago_package: typing.Dict[str, typing.Any],
+                 item_name_groups: typing.Iterable[str], location_name_groups: typing.Iterable[str]):
+        self.item_names = _NameLookup("item", itertools.chain(
+            ((item_id, item_name) for item_name, item_id in game_package["item_name_to_id"].items()),
+            ((item_id, item_name) for item_name, item_id in archipelago_package["item_name_to_id"].items())))
+        self.location_names = _NameLookup("location", itertools.chain(
+            ((location_id, location_name)
+             for location_name, location_id in game_package["location_name_to_id"].items()),
+            ((location_id, location_name)
+             for location_name, location_id in archipelago_package["location_name_to_id"].items())))
+        self.all_item_and_group_names = frozenset(map(sys.intern, itertools.chain(
+            game_package["item_name_to_id"], item_name_groups)))
+        self.all_location_and_group_names = frozenset(map(sys.intern, itertools.chain(
+            game_package["location_name_to_id"], location_name_groups)))
+
+
+_shared_game_data: "weakref.WeakValueDictionary[typing.Tuple[str, str, str], SharedGameData]" = \
+    weakref.WeakValueDictionary()
+""" { (game, checksum, Archipelago checksum): game data }, kept alive by the Contexts using it """
+
+
+def get_shared_game_data(game: str, game_package: typing.Dict[str, typing.Any],
+                         archipelago_package: typing.Dict[str, typing.Any],
+                         item_name_groups: typing.Iterable[str],
+                         location_name_groups: typing.Iterable[str]) -> SharedGameData:
+    """Returns the name tables of a game, reusing the ones of another Context if the checksums match."""
+    if game == "Archipelago":
+        archipelago_package = {"item_name_to_id": {}, "location_name_to_id": {}}
+    key = game, game_package.get("checksum"), archipelago_package.get("checksum")
+    if key[1] is None or (game != "Archipelago" and key[2] is None):
+        # data package from before checksums, can't safely be shared
+        return SharedGameData(game_package, archipelago_package, item_name_groups, location_name_groups)
+    game_data = _shared_game_data.get(key)
+    if game_data is None:
+        game_data = _shared_game_data[key] = SharedGameData(game_package, archipelago_package,
+                                                            item_name_groups, location_name_groups)
+    return game_data
+
+
+class CommandRecorder:
+    """Writes every inbound client command and every server command of a room to a gzip compressed log, one json
+    record per line. The first line holds the save the room started from, the last line the save it ended with.
+    See MultiServerReplay.py to run a log against a fresh server."""
+    version = 2
+    """ 2 added server commands, from the console, the website and admins """
+    flush_interval: float = 5.0
+    """ seconds between flushes to disk, so a crashed room still leaves a mostly complete log """
+
+    def __init__(self, path: str, ctx: Context):
+        self.path = path
+        self.file = gzip.open(path, "wt", encoding="utf-8")
+        self.start = time.monotonic()
+        self.last_flush = self.start
+        self.endpoint_ids: "weakref.WeakKeyDictionary[Endpoint, int]" = weakref.WeakKeyDictionary()
+        # ids are never reused, even after their endpoint is gone from endpoint_ids
+        self.next_endpoint_id = itertools.count(1)
+        self._write({"version": self.version, "seed_name": ctx.seed_name, "save": self.dump_save(ctx.get_save())})
+
+    @staticmethod
+    def dump_save(save: dict) -> str:
+        return base64.b64encode(zlib.compress(pickle.dumps(save))).decode()
+
+    @staticmethod
+    def load_save(data: str) -> dict:
+        return restricted_loads(zlib.decompress(base64.b64decode(data)))
+
+    def _write(self, record: typing.Any):
+        self.file.write(encode(record) + "\n")
+
+    def record(self, endpoint: typing.Optional[Endpoint], event: str, msg: typing.Any = None):
+        """Records event ("connect", "cmd" or "disconnect") of endpoint, with msg being the decoded command,
+        or a "server" command of no endpoint, with msg being its text."""
+        if self.file.closed:
+            return
+        if endpoint is None:
+            endpoint_id = 0
+        else:
+            endpoint_id = self.endpoint_ids.get(endpoint)
+            if endpoint_id is None:
+                endpoint_id = self.endpoint_ids[endpoint] = next(self.next_endpoint_id)
+        now = time.monotonic()
+        self._write([round(now - self.start, 3), endpoint_id, event, msg])
+        if now - self.last_flush > self.flush_interval:
+            self.last_flush = now
+            self.file.flush()
+
+    def close(self, ctx: Context):
+        """Writes the final save state and closes the log."""
+        if not self.file.closed:
+            self._write({"save": self.dump_save(ctx.get_save())})
+            self.file.close()
+
+
 class Context:
     dumper = staticmethod(encode)
     loader = staticmethod(decode)
@@ -185,17 +305,23 @@ class Context:
     slot_info: typing.Dict[int, NetworkSlot]
     generator_version = Version(0, 0, 0)
     checksums: typing.Dict[str, str]
-    item_names: typing.Dict[str, typing.Dict[int, str]] = (
-        collections.defaultdict(lambda: Utils.KeyedDefaultDict(lambda code: f'Unknown item (ID:{code})')))
+    item_names: typing.Dict[str, typing.Mapping[int, str]]
     item_name_groups: typing.Dict[str, typing.Dict[str, typing.Set[str]]]
-    location_names: typing.Dict[str, typing.Dict[int, str]] = (
-        collections.defaultdict(lambda: Utils.KeyedDefaultDict(lambda code: f'Unknown location (ID:{code})')))
+    location_names: typing.Dict[str, typing.Mapping[int, str]]
     location_name_groups: typing.Dict[str, typing.Dict[str, typing.Set[str]]]
-    all_item_and_group_names: typing.Dict[str, typing.Set[str]]
-    all_location_and_group_names: typing.Dict[str, typing.Set[str]]
+    all_item_and_group_names: typing.Dict[str, typing.AbstractSet[str]]
+    all_location_and_group_names: typing.Dict[str, typing.AbstractSet[str]]
+    shared_game_data: typing.Dict[str, SharedGameData]
+    """ keeps the game data shared with other Contexts alive, see get_shared_game_data """
     non_hintable_names: typing.Dict[str, typing.AbstractSet[str]]
     spheres: typing.List[typing.Dict[int, typing.Set[int]]]
     """ each sphere is { player: { location_id, ... } } """
+    location_jobs: typing.Dict[typing.Tuple[str, int, int], asyncio.Task]
+    """ running release and collect jobs, { (kind, team, slot): task } """
+    location_job_chunk_size: int = 100
+    """ amount of locations a release or collect job registers before yielding to the event loop """
+    recorder: typing.Optional[CommandRecorder] = None
+    """ records inbound commands for replaying them later, see CommandRecorder """
     logger: logging.Logger
 
 
@@ -261,10 +387,15 @@ class Context:
         self.stored_data_notification_clients = collections.defaultdict(weakref.WeakSet)
         self.read_data = {}
         self.spheres = []
+        self.location_jobs = {}
+        self.resume_secret = secrets.token_bytes(16)
 
         # init empty to satisfy linter, I suppose
         self.gamespackage = {}
         self.checksums = {}
+        self.item_names = collections.defaultdict(lambda: _NameLookup("item", ()))
+        self.location_names = collections.defaultdict(lambda: _NameLookup("location", ()))
+        self.shared_game_data = {}
         self.item_name_groups = {}
         self.location_name_groups = {}
         self.all_item_and_group_names = {}
@@ -276,7 +407,10 @@ class Context:
     # Data package retrieval
     def _load_game_data(self):
         import worlds
-        self.gamespackage = worlds.network_data_package["games"]
+        # remove groups from data sent to clients, without modifying the shared data package
+        self.gamespackage = {game_name: {key: value for key, value in game_package.items()
+                                         if key not in ("item_name_groups", "location_name_groups")}
+                             for game_name, game_package in worlds.network_data_package["games"].items()}
 
         self.item_name_groups = {world_name: world.item_name_groups for world_name, world in
                                  worlds.AutoWorldRegister.world_types.items()}
@@ -285,30 +419,19 @@ class Context:
         for world_name, world in worlds.AutoWorldRegister.world_types.items():
             self.non_hintable_names[world_name] = world.hint_blacklist
 
-        for game_package in self.gamespackage.values():
-            # remove groups from data sent to clients
-            del game_package["item_name_groups"]
-            del game_package["location_name_groups"]
-
     def _init_game_data(self):
+        archipelago_package = self.gamespackage.get("Archipelago", {"item_name_to_id": {}, "location_name_to_id": {}})
         for game_name, game_package in self.gamespackage.items():
             if "checksum" in game_package:
                 self.checksums[game_name] = game_package["checksum"]
-            for item_name, item_id in game_package["item_name_to_id"].items():
-                self.item_names[game_name][item_id] = item_name
-            for location_name, location_id in game_package["location_name_to_id"].items():
-                self.location_names[game_name][location_id] = location_name
-            self.all_item_and_group_names[game_name] = \
-                set(game_package["item_name_to_id"]) | set(self.item_name_groups[game_name])
-            self.all_location_and_group_names[game_name] = \
-                set(game_package["location_name_to_id"]) | set(self.location_name_groups.get(game_name, []))
-
-        archipelago_item_names = self.item_names["Archipelago"]
-        archipelago_location_names = self.location_names["Archipelago"]
-        for game in [game_name for game_name in self.gamespackage if game_name != "Archipelago"]:
-            # Add Archipelago items and locations to each data package.
-            self.item_names[game].update(archipelago_item_names)
-            self.location_names[game].update(archipelago_location_names)
+            game_data = get_shared_game_data(game_name, game_package, archipelago_package,
+                                             self.item_name_groups.get(game_name, ()),
+                                             self.location_name_groups.get(game_name, ()))
+            self.shared_game_data[game_name] = game_data
+            self.item_names[game_name] = game_data.item_names
+            self.location_names[game_name] = game_data.location_names
+            self.all_item_and_group_names[game_name] = game_data.all_item_and_group_names
+            self.all_location_and_group_names[game_name] = game_data.all_location_and_group_names
 
     def item_names_for_game(self, game: str) -> typing.Optional[typing.Dict[str, int]]:
         return self.gamespackage[game]["item_name_to_id"] if game in self.gamespackage else None
@@ -491,12 +614,13 @@ class Context:
             if game_name in game_data_packages:
                 data = game_data_packages[game_name]
             self.logger.info(f"Loading embedded data package for game {game_name}")
-            self.gamespackage[game_name] = data
+            # remove groups from data package, but keep in self.item_name_groups.
+            # data may be shared with other rooms, so it is not modified
+            self.gamespackage[game_name] = {key: value for key, value in data.items()
+                                            if key not in ("item_name_groups", "location_name_groups")}
             self.item_name_groups[game_name] = data["item_name_groups"]
             if "location_name_groups" in data:
                 self.location_name_groups[game_name] = data["location_name_groups"]
-                del data["location_name_groups"]
-            del data["item_name_groups"]  # remove from data package, but keep in self.item_name_groups
         self._init_game_data()
         for game_name, data in self.item_name_groups.items():
             self.read_data[f"item_name_groups_{game_name}"] = lambda lgame=game_name: self.item_name_groups[lgame]
@@ -597,6 +721,8 @@ class Context:
             "random_state": self.random.getstate(),
             "group_collected": dict(self.group_collected),
             "stored_data": self.stored_data,
+            "location_jobs": list(self.location_jobs),
+            "resume_secret": self.resume_secret,
             "game_options": {"hint_cost": self.hint_cost, "location_check_points": self.location_check_points,
                              "server_password": self.server_password, "password": self.password,
                              "release_mode": self.release_mode,
@@ -643,6 +769,14 @@ class Context:
 
         if "stored_data" in savedata:
             self.stored_data = savedata["stored_data"]
+
+        if "resume_secret" in savedata:
+            self.resume_secret = savedata["resume_secret"]
+
+        for kind, team, slot in savedata.get("location_jobs", ()):
+            self.logger.info(f"Resuming interrupted {kind} of {self.player_names[team, slot]} (Team #{team + 1})")
+            start_location_job(self, kind, team, slot)
+
         # count items and slots from lists for items_handling = remote
         self.logger.info(
             f'Loaded save file with {sum([len(v) for k, v in self.received_items.items() if k[2]])} received items '
@@ -650,6 +784,12 @@ class Context:
 
     # rest
 
+    def get_resume_token(self, team: int, slot: int, items_handling: int) -> str:
+        """Token a client can present on reconnect to only be sent the items it is missing.
+        Stays valid across server restarts, as long as the save is kept."""
+        return hmac.new(self.resume_secret, f"{self.seed_name}:{team}:{slot}:{items_handling}".encode(),
+                        "sha256").hexdigest()
+
     def get_hint_cost(self, slot):
         if self.hint_cost:
             return max(1, int(self.hint_cost * 0.01 * len(self.locations[slot])))
@@ -717,7 +857,7 @@ class Context:
             hints = [hint for hint in hints if hint not in self.hints[team, hint.finding_player]]
         if not hints:
             return
-        new_hint_events: typing.Set[int] = set()
+        new_hints: typing.Dict[int, typing.Set[NetUtils.Hint]] = collections.defaultdict(set)
         concerns = collections.defaultdict(list)
         for hint in sorted(hints, key=operator.attrgetter('found'), reverse=True):
             data = (hint, hint.as_network_message())
@@ -730,14 +870,14 @@ class Context:
                 # since hints are bidirectional, finding player and receiving player,
                 # we can check once if hint already exists
                 if hint not in self.hints[team, hint.finding_player]:
-                    self.hints[team, hint.finding_player].add(hint)
-                    new_hint_events.add(hint.finding_player)
+                    new_hints[hint.finding_player].add(hint)
                     for player in self.slot_set(hint.receiving_player):
-                        self.hints[team, player].add(hint)
-                        new_hint_events.add(player)
+                        new_hints[player].add(hint)
 
             self.logger.info("Notice (Team #%d): %s" % (team + 1, format_hint(self, team, hint)))
-        for slot in new_hint_events:
+        # apply all new hints to the hint store in one go, so each slot is notified once per batch
+        for slot, slot_hints in new_hints.items():
+            self.hints[team, slot] |= slot_hints
             self.on_new_hint(team, slot)
         for slot, hint_data in concerns.items():
             if recipients is None or slot in recipients:
@@ -796,6 +936,8 @@ async def server(websocket, path: str = "/", ctx: Context = None):
     try:
         if ctx.log_network:
             ctx.logger.info("Incoming connection")
+        if ctx.recorder:
+            ctx.recorder.record(client, "connect")
         await on_client_connected(ctx, client)
         if ctx.log_network:
             ctx.logger.info("Sent Room Info")
@@ -803,6 +945,8 @@ async def server(websocket, path: str = "/", ctx: Context = None):
             if ctx.log_network:
                 ctx.logger.info(f"Incoming message: {data}")
             for msg in decode(data):
+                if ctx.recorder:
+                    ctx.recorder.record(client, "cmd", msg)
                 await process_client_cmd(ctx, client, msg)
     except Exception as e:
         if not isinstance(e, websockets.WebSocketException):
@@ -810,6 +954,8 @@ async def server(websocket, path: str = "/", ctx: Context = None):
     finally:
         if ctx.log_network:
             ctx.logger.info("Disconnected")
+        if ctx.recorder:
+            ctx.recorder.record(client, "disconnect")
         await ctx.disconnect(client)
 
 
@@ -984,32 +1130,86 @@ def update_checked_locations(ctx: Context, team: int, slot: int):
 
 def release_player(ctx: Context, team: int, slot: int):
     """register any locations that are in the multidata"""
-    all_locations = set(ctx.locations[slot])
     ctx.broadcast_text_all("%s (Team #%d) has released all remaining items from their world."
                            % (ctx.player_names[(team, slot)], team + 1),
                            {"type": "Release", "team": team, "slot": slot})
-    register_location_checks(ctx, team, slot, all_locations)
-    update_checked_locations(ctx, team, slot)
+    start_location_job(ctx, "release", team, slot)
 
 
-def collect_player(ctx: Context, team: int, slot: int, is_group: bool = False):
+def collect_player(ctx: Context, team: int, slot: int):
     """register any locations that are in the multidata, pointing towards this player"""
-    all_locations = ctx.locations.get_for_player(slot)
-
     ctx.broadcast_text_all("%s (Team #%d) has collected their items from other worlds."
                            % (ctx.player_names[(team, slot)], team + 1),
                            {"type": "Collect", "team": team, "slot": slot})
-    for source_player, location_ids in all_locations.items():
-        register_location_checks(ctx, team, source_player, location_ids, count_activity=False)
-        update_checked_locations(ctx, team, source_player)
+    start_location_job(ctx, "collect", team, slot)
 
-    if not is_group:
+
+def start_location_job(ctx: Context, kind: str, team: int, slot: int):
+    """Start a release or collect of slot as a background task, registering its locations in chunks.
+    Running jobs are part of the save, so a job interrupted by a shutdown resumes on the next load."""
+    key = kind, team, slot
+    if key in ctx.location_jobs:
+        return  # already running
+    ctx.location_jobs[key] = asyncio.create_task(_run_location_job(ctx, kind, team, slot),
+                                                 name=f"{kind} {team} {slot}")
+    ctx.save()  # remember the job in case of a crash
+
+
+def cancel_location_job(ctx: Context, kind: str, team: int, slot: int) -> bool:
+    """Stop a running release or collect, keeping the locations that were already registered."""
+    task = ctx.location_jobs.pop((kind, team, slot), None)
+    if task:
+        task.cancel()
+        ctx.save()
+        return True
+    return False
+
+
+async def _run_location_job(ctx: Context, kind: str, team: int, slot: int):
+    try:
+        for _ in _location_job_steps(ctx, kind, team, slot):
+            await asyncio.sleep(0)  # let other clients be served between chunks
+    except Exception as e:
+        ctx.logger.exception(e)
+    # cancellation, including the one at shutdown, skips this, so an interrupted job stays in the save
+    del ctx.location_jobs[kind, team, slot]
+    ctx.save()
+
+    if kind == "collect" and slot not in ctx.groups:
         for group, group_players in ctx.groups.items():
             if slot in group_players:
                 group_collected_players = ctx.group_collected.setdefault(group, set())
                 group_collected_players.add(slot)
                 if set(group_players) == group_collected_players:
-                    collect_player(ctx, team, group, True)
+                    collect_player(ctx, team, group)
+
+
+def _location_job_steps(ctx: Context, kind: str, team: int, slot: int) -> typing.Generator[None, None, None]:
+    """Registers one chunk of locations per step, then sends one summary per receiving player."""
+    if kind == "release":
+        all_locations = {slot: get_missing_checks(ctx, team, slot)}
+    elif kind == "collect":
+        all_locations = ctx.locations.get_for_player(slot)
+    else:
+        raise ValueError(f"Unknown location job {kind}")
+
+    received: typing.Counter[int] = collections.Counter()
+    try:
+        for source_player, location_ids in all_locations.items():
+            location_ids = sorted(location_ids)
+            for start in range(0, len(location_ids), ctx.location_job_chunk_size):
+                register_location_checks(ctx, team, source_player,
+                                         location_ids[start:start + ctx.location_job_chunk_size],
+                                         count_activity=kind == "release", summary=received)
+                yield
+            update_checked_locations(ctx, team, source_player)
+    finally:
+        for receiving_player, count in received.items():
+            clients = [client for player in ctx.slot_set(receiving_player)
+                       for client in ctx.clients[team].get(player, ())]
+            if clients:
+                ctx.broadcast(clients, [json_format_location_job_summary(kind, team, slot, receiving_player,
+                                                                         count)])
 
 
 def get_remaining(ctx: Context, team: int, slot: int) -> typing.List[typing.Tuple[int, int]]:
@@ -1025,7 +1225,8 @@ def send_items_to(ctx: Context, team: int, target_slot: int, *items: NetworkItem
 
 
 def register_location_checks(ctx: Context, team: int, slot: int, locations: typing.Iterable[int],
-                             count_activity: bool = True):
+                             count_activity: bool = True, summary: typing.Optional[typing.Counter[int]] = None):
+    """summary, if given, counts the sent items per receiving player instead of announcing each of them to the team"""
     new_locations = set(locations) - ctx.location_checks[team, slot]
     new_locations.intersection_update(ctx.locations[slot])  # ignore location IDs unknown to this multidata
     if new_locations:
@@ -1039,8 +1240,11 @@ def register_location_checks(ctx: Context, team: int, slot: int, locations: typi
             ctx.logger.info('(Team #%d) %s sent %s to %s (%s)' % (
                 team + 1, ctx.player_names[(team, slot)], ctx.item_names[ctx.slot_info[target_player].game][item_id],
                 ctx.player_names[(team, target_player)], ctx.location_names[ctx.slot_info[slot].game][location]))
-            info_text = json_format_send_event(new_item, target_player)
-            ctx.broadcast_team(team, [info_text])
+            if summary is None:
+                info_text = json_format_send_event(new_item, target_player)
+                ctx.broadcast_team(team, [info_text])
+            else:
+                summary[target_player] += 1
 
         ctx.location_checks[team, slot] |= new_locations
         send_new_items(ctx)
@@ -1090,6 +1294,22 @@ def collect_hint_location_id(ctx: Context, team: int, slot: int, seeked_location
     return []
 
 
+def collect_hint_location_ids(ctx: Context, team: int, slot: int,
+                              seeked_locations: typing.Iterable[int]) -> typing.List[NetUtils.Hint]:
+    """Bulk version of collect_hint_location_id, looking up the slot's state only once."""
+    slot_locations = ctx.locations[slot]
+    checked = ctx.location_checks[team, slot]
+    entrances = ctx.er_hint_data.get(slot, {})
+    hints = []
+    for seeked_location in seeked_locations:
+        result = slot_locations.get(seeked_location, (None, None, None))
+        if any(result):
+            item_id, receiving_player, item_flags = result
+            hints.append(NetUtils.Hint(receiving_player, slot, seeked_location, item_id,
+                                       seeked_location in checked, entrances.get(seeked_location, ""), item_flags))
+    return hints
+
+
 def format_hint(ctx: Context, team: int, hint: NetUtils.Hint) -> str:
     text = f"[Hint]: {ctx.player_names[team, hint.receiving_player]}'s " \
            f"{ctx.item_names[ctx.slot_info[hint.receiving_player].game][hint.item]} is " \
@@ -1122,6 +1342,20 @@ def json_format_send_event(net_item: NetworkItem, receiving_player: int):
             "item": net_item}
 
 
+def json_format_location_job_summary(kind: str, team: int, slot: int, receiving_player: int, count: int):
+    parts = []
+    NetUtils.add_json_text(parts, slot, type=NetUtils.JSONTypes.player_id)
+    if kind == "release":
+        NetUtils.add_json_text(parts, f" released {count} item{'' if count == 1 else 's'} to ")
+        NetUtils.add_json_text(parts, receiving_player, type=NetUtils.JSONTypes.player_id)
+    else:
+        NetUtils.add_json_text(parts, f" collected {count} item{'' if count == 1 else 's'} from other worlds")
+    NetUtils.add_json_text(parts, ".")
+
+    return {"cmd": "PrintJSON", "data": parts, "type": kind.capitalize(),
+            "team": team, "slot": slot, "receiving": receiving_player, "count": count}
+
+
 class CommandMeta(type):
     def __new__(cls, name, bases, attrs):
         commands = attrs["commands"] = {}
@@ -1722,6 +1956,7 @@ async def process_client_cmd(ctx: Context, client: Client, args: dict):
             client.version = args['version']
             client.tags = args['tags']
             client.no_locations = 'TextOnly' in client.tags or 'Tracker' in client.tags
+            resume_token = ctx.get_resume_token(team, slot, client.items_handling)
             connected_packet = {
                 "cmd": "Connected",
                 "team": client.team, "slot": client.slot,
@@ -1730,13 +1965,23 @@ async def process_client_cmd(ctx: Context, client: Client, args: dict):
                 "checked_locations": get_checked_checks(ctx, team, slot),
                 "slot_info": ctx.slot_info,
                 "hint_points": get_slot_points(ctx, team, slot),
+                "resume_token": resume_token,
             }
             reply = [connected_packet]
             start_inventory = get_start_inventory(ctx, slot, client.remote_start_inventory)
             items = get_received_items(ctx, client.team, client.slot, client.remote_items)
             if (start_inventory or items) and not client.no_items:
-                reply.append({"cmd": 'ReceivedItems', "index": 0, "items": start_inventory + items})
-                client.send_index = len(start_inventory) + len(items)
+                item_count = len(start_inventory) + len(items)
+                # a resuming client already has the items before its index
+                index = args.get("items_index", 0) if type(args.get("resume_token")) is str and \
+                    hmac.compare_digest(args["resume_token"], resume_token) else 0
+                if type(index) is not int or not 0 <= index <= item_count:
+                    index = 0
+                if index < item_count:
+                    first_new_item = max(0, index - len(start_inventory))
+                    reply.append({"cmd": 'ReceivedItems', "index": index,
+                                  "items": start_inventory[index:] + items[first_new_item:]})
+                client.send_index = item_count
             if not client.auth:  # if this was a Re-Connect, don't print to console
                 client.auth = True
                 await on_client_joined(ctx, client)
@@ -1816,24 +2061,31 @@ async def process_client_cmd(ctx: Context, client: Client, args: dict):
                 register_location_checks(ctx, client.team, client.slot, args["locations"])
 
         elif cmd == 'LocationScouts':
-            locs = []
-            create_as_hint: int = int(args.get("create_as_hint", 0))
-            hints = []
-            for location in args["locations"]:
-                if type(location) is not int:
-                    await ctx.send_msgs(client,
-                                        [{'cmd': 'InvalidPacket', "type": "arguments", "text": 'LocationScouts',
-                                          "original_cmd": cmd}])
-                    return
+            locations = args["locations"]
+            if any(type(location) is not int for location in locations):
+                await ctx.send_msgs(client,
+                                    [{'cmd': 'InvalidPacket', "type": "arguments", "text": 'LocationScouts',
+                                      "original_cmd": cmd}])
+                return
+
+            slot_locations = ctx.locations[client.slot]
+            if len(locations) == len(slot_locations) and set(locations) == set(slot_locations):
+                # full-slot scout, as sent by most clients on connect; the encoded reply is cached by the store
+                reply = ctx.locations.get_location_info(client.slot)
+            else:
+                locs = []
+                for location in locations:
+                    target_item, target_player, flags = slot_locations[location]
+                    locs.append(NetworkItem(target_item, location, target_player, flags))
+                reply = ctx.dumper([{'cmd': 'LocationInfo', 'locations': locs}])
 
-                target_item, target_player, flags = ctx.locations[client.slot][location]
-                if create_as_hint:
-                    hints.extend(collect_hint_location_id(ctx, client.team, client.slot, location))
-                locs.append(NetworkItem(target_item, location, target_player, flags))
-            ctx.notify_hints(client.team, hints, only_new=create_as_hint == 2)
-            if locs and create_as_hint:
-                ctx.save()
-            await ctx.send_msgs(client, [{'cmd': 'LocationInfo', 'locations': locs}])
+            create_as_hint: int = int(args.get("create_as_hint", 0))
+            if create_as_hint:
+                hints = collect_hint_location_ids(ctx, client.team, client.slot, locations)
+                ctx.notify_hints(client.team, hints, only_new=create_as_hint == 2)
+                if locations:
+                    ctx.save()
+            await ctx.send_encoded_msgs(client, reply)
 
         elif cmd == 'StatusUpdate':
             update_client_status(ctx, client, args["status"])
@@ -1923,6 +2175,11 @@ class ServerCommandProcessor(CommonCommandProcessor):
         self.ctx = ctx
         super(ServerCommandProcessor, self).__init__()
 
+    def __call__(self, raw: str) -> typing.Optional[bool]:
+        if raw and self.ctx.recorder:
+            self.ctx.recorder.record(None, "server", raw)
+        return super(ServerCommandProcessor, self).__call__(raw)
+
     def output(self, text: str):
         if self.client:
             self.ctx.notify_client(self.client, text, {"type": "AdminCommandResult"})
@@ -2028,6 +2285,22 @@ class ServerCommandProcessor(CommonCommandProcessor):
         self.output(f"Could not find player {player_name} to release")
         return False
 
+    @mark_raw
+    def _cmd_cancel_release(self, player_name: str) -> bool:
+        """Stop a release or collect of a player that is still in progress."""
+        player = self.resolve_player(player_name)
+        if player:
+            team, slot, name = player
+            cancelled = [kind for kind in ("release", "collect") if cancel_location_job(self.ctx, kind, team, slot)]
+            if cancelled:
+                self.output(f"Cancelled {' and '.join(cancelled)} of {name}.")
+            else:
+                self.output(f"{name} has no release or collect in progress.")
+            return bool(cancelled)
+
+        self.output(f"Could not find player {player_name} to cancel the release of")
+        return False
+
     @mark_raw
     def _cmd_allow_release(self, player_name: str) -> bool:
         """Allow the specified player to use the !release command."""
@@ -2311,6 +2584,8 @@ def parse_args() -> argparse.Namespace:
     #0 -> recommended for tournaments to force a level playing field, only allow an exact version match
     """)
     parser.add_argument('--log_network', default=defaults["log_network"], action="store_true")
+    parser.add_argument('--record', help="Path to write a compressed log of all client and server commands to, "
+                                         "which can be replayed with MultiServerReplay.py.")
     args = parser.parse_args()
     return args
 
@@ -2386,6 +2661,8 @@ async def main(args: argparse.Namespace):
         raise
 
     ctx.init_save(not args.disable_save)
+    if args.record:
+        ctx.recorder = CommandRecorder(args.record, ctx)
 
     ssl_context = load_server_cert(args.cert, args.cert_key) if args.cert else None
 
@@ -2402,6 +2679,8 @@ async def main(args: argparse.Namespace):
     console_task.cancel()
     if ctx.shutdown_task:
         await ctx.shutdown_task
+    if ctx.recorder:
+        ctx.recorder.close(ctx)
 
 
 client_message_processor = ClientMessageProcessor
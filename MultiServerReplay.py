@@ -0,0 +1,152 @@
+"""Replays a command log written by MultiServer --record against a fresh server, to reproduce a room's behaviour
+offline or to benchmark the server with real traffic."""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import gzip
+import logging
+import sys
+import time
+import typing
+
+import ModuleUpdate
+ModuleUpdate.update()
+
+from MultiServer import Client, CommandRecorder, Context, ServerCommandProcessor, on_client_connected, \
+    process_client_cmd
+from NetUtils import Endpoint, decode
+
+ignored_save_keys = {"client_activity_timers", "client_connection_timers"}
+""" save keys holding wall clock times, which can't match between the original run and a replay """
+
+
+class ReplayContext(Context):
+    """Server Context that handles commands like a hosted room, but only counts what it would send."""
+    sent_messages: int = 0
+
+    async def send_msgs(self, endpoint: Endpoint, msgs: typing.Iterable[dict]) -> bool:
+        self.sent_messages += 1
+        return True
+
+    async def send_encoded_msgs(self, endpoint: Endpoint, msg: str) -> bool:
+        self.sent_messages += 1
+        return True
+
+    async def broadcast_send_encoded_msgs(self, endpoints: typing.Iterable[Endpoint], msg: str) -> bool:
+        self.sent_messages += sum(1 for _ in endpoints)
+        return True
+
+
+class ReplayCommandProcessor(ServerCommandProcessor):
+    def output(self, text: str):
+        pass
+
+
+class _ReplaySocket:
+    open = True
+
+
+class ReplayResult(typing.NamedTuple):
+    ctx: ReplayContext
+    commands: int
+    duration: float
+    final_save_recorded: bool
+    differences: typing.List[str]
+    """ save keys that differ from the recorded final save, empty if it matched or none was recorded """
+
+
+def read_log(path: str) -> typing.Tuple[dict, typing.List[list], typing.Optional[dict]]:
+    """Returns the header, the records and the final save (None if the log ended abruptly) of a command log."""
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        lines = f.read().splitlines()
+    header = decode(lines[0])
+    if header.get("version", 0) > CommandRecorder.version:
+        raise Exception(f"{path} was recorded by a newer server.")
+    records = [decode(line) for line in lines[1:]]
+    final_save = None
+    if records and isinstance(records[-1], dict):
+        final_save = CommandRecorder.load_save(records.pop()["save"])
+    return header, records, final_save
+
+
+def compare_saves(expected: dict, actual: dict) -> typing.List[str]:
+    return sorted(key for key in expected.keys() | actual.keys()
+                  if key not in ignored_save_keys and expected.get(key) != actual.get(key))
+
+
+async def _settle(ctx: Context):
+    """Lets running release and collect jobs finish, so results don't depend on replay speed."""
+    while ctx.location_jobs:
+        await asyncio.gather(*ctx.location_jobs.values(), return_exceptions=True)
+    await asyncio.sleep(0)
+
+
+async def replay(multidata: str, log: str, realtime: bool = False) -> ReplayResult:
+    """Runs the commands of log against a new Context of multidata,
+    either as fast as possible or with the recorded delays between them."""
+    ctx = ReplayContext("", 0, "", "", 0, 0, False, logger=logging.getLogger("Replay"))
+    ctx.load(multidata)
+    return await replay_log(ctx, log, realtime)
+
+
+async def replay_log(ctx: ReplayContext, log: str, realtime: bool = False) -> ReplayResult:
+    """Runs the commands of log against ctx, which has to be freshly loaded from the recorded multidata."""
+    header, records, final_save = read_log(log)
+    if ctx.seed_name != header["seed_name"]:
+        raise Exception(f"{log} was not recorded for seed {ctx.seed_name}.")
+    ctx.set_save(CommandRecorder.load_save(header["save"]))
+    ctx.commandprocessor = ReplayCommandProcessor(ctx)
+    # logs since version 2 hold the server commands admins ran, which the admin's own messages would run again
+    server_commands_recorded = header.get("version", 1) >= 2
+    await _settle(ctx)
+
+    clients: typing.Dict[int, Client] = {}
+    start = time.perf_counter()
+    commands = 0
+    for timestamp, endpoint_id, event, msg in records:
+        if realtime:
+            await asyncio.sleep(timestamp - (time.perf_counter() - start))
+        if event == "connect":
+            client = clients[endpoint_id] = Client(_ReplaySocket(), ctx)
+            ctx.endpoints.append(client)
+            await on_client_connected(ctx, client)
+        elif event == "cmd":
+            commands += 1
+            if not (server_commands_recorded and msg.get("cmd") == "Say" and
+                    str(msg.get("text", "")).startswith("!admin")):
+                await process_client_cmd(ctx, clients[endpoint_id], msg)
+        elif event == "server":
+            commands += 1
+            ctx.commandprocessor(msg)
+        elif event == "disconnect":
+            await ctx.disconnect(clients.pop(endpoint_id))
+        await _settle(ctx)
+    duration = time.perf_counter() - start
+
+    differences = compare_saves(final_save, ctx.get_save()) if final_save else []
+    return ReplayResult(ctx, commands, duration, final_save is not None, differences)
+
+
+def main(args: typing.Optional[typing.List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("multidata", help="The multidata (.archipelago or .zip) the log was recorded with.")
+    parser.add_argument("log", help="The command log written by MultiServer --record.")
+    parser.add_argument("--realtime", action="store_true",
+                        help="Keep the recorded delays between commands instead of replaying at maximum speed.")
+    parsed = parser.parse_args(args)
+    logging.basicConfig(level=logging.WARNING)
+
+    result = asyncio.run(replay(parsed.multidata, parsed.log, parsed.realtime))
+    print(f"Replayed {result.commands} commands in {result.duration:.3f}s "
+          f"({result.commands / max(result.duration, 1e-9):.0f}/s), sending {result.ctx.sent_messages} messages.")
+    if not result.final_save_recorded:
+        print("The log has no final save state to compare to, the recording was likely cut short.")
+    elif result.differences:
+        print(f"Final save state differs from the recording in: {', '.join(result.differences)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
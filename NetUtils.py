@@ -362,6 +362,8 @@ class _LocationStore(dict, typing.MutableMapping[int, typing.Dict[int, typing.Tu
         if len(self.get(0, {})):
             raise ValueError("Invalid player id 0 for location")
 
+        self._location_info: typing.Dict[int, str] = {}
+
     def find_item(self, slots: typing.Set[int], seeked_item_id: int
                   ) -> typing.Generator[typing.Tuple[int, int, int, int, int], None, None]:
         for finding_player, check_data in self.items():
@@ -378,6 +380,16 @@ class _LocationStore(dict, typing.MutableMapping[int, typing.Dict[int, typing.Tu
                     all_locations[source_slot].add(location_id)
         return all_locations
 
+    def get_location_info(self, slot: int) -> str:
+        """Returns the encoded LocationInfo message for all locations of slot, built once and cached."""
+        payload = self._location_info.get(slot, None)
+        if payload is None:
+            payload = encode([{"cmd": "LocationInfo", "locations": [
+                NetworkItem(item_id, location_id, receiving_player, item_flags)
+                for location_id, (item_id, receiving_player, item_flags) in self[slot].items()]}])
+            self._location_info[slot] = payload
+        return payload
+
     def get_checked(self, state: typing.Dict[typing.Tuple[int, int], typing.Set[int]], team: int, slot: int
                     ) -> typing.List[int]:
         checked = state[team, slot]
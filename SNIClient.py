@@ -128,6 +128,13 @@ class SNIContext(CommonContext):
     snes_recv_queue: "asyncio.Queue[bytes]"
     snes_request_lock: asyncio.Lock
     snes_write_buffer: typing.List[typing.Tuple[int, bytes]]
+    snes_verify_buffer: typing.List[typing.Tuple[int, int]]
+    snes_write_gap: int = 0
+    """ writes at most this many bytes apart are sent as one, writing back the bytes between them as they were read.
+    Only for memory the game doesn't change between that read and the write. """
+    snes_watch_data: typing.Dict[int, bytes]
+    """ address: data of the client handler's watch list, read at the start of the current game_watcher tick """
+    snes_watch_task: "typing.Optional[asyncio.Task[None]]"
     snes_connector_lock: threading.Lock
     death_state: DeathState
     killing_player_task: "typing.Optional[asyncio.Task[None]]"
@@ -154,6 +161,9 @@ class SNIContext(CommonContext):
         self.snes_recv_queue = asyncio.Queue()
         self.snes_request_lock = asyncio.Lock()
         self.snes_write_buffer = []
+        self.snes_verify_buffer = []
+        self.snes_watch_data = {}
+        self.snes_watch_task = None
         self.snes_connector_lock = threading.Lock()
         self.death_state = DeathState.alive  # for death link flop behaviour
         self.killing_player_task = None
@@ -511,50 +521,105 @@ async def snes_recv_loop(ctx: SNIContext) -> None:
             ctx.snes_autoreconnect_task = asyncio.create_task(snes_autoreconnect(ctx), name="snes auto-reconnect")
 
 
-async def snes_read(ctx: SNIContext, address: int, size: int) -> typing.Optional[bytes]:
-    try:
-        await ctx.snes_request_lock.acquire()
+def snes_socket_open(ctx: SNIContext) -> bool:
+    return ctx.snes_state == SNESState.SNES_ATTACHED and ctx.snes_socket is not None and \
+        ctx.snes_socket.open and not ctx.snes_socket.closed
 
-        if (
-            ctx.snes_state != SNESState.SNES_ATTACHED or
-            ctx.snes_socket is None or
-            not ctx.snes_socket.open or
-            ctx.snes_socket.closed
-        ):
-            return None
 
-        GetAddress_Request: SNESRequest = {
-            "Opcode": "GetAddress",
-            "Space": "SNES",
-            "Operands": [hex(address)[2:], hex(size)[2:]]
-        }
+async def _snes_get_address(ctx: SNIContext, reads: typing.List[typing.Tuple[int, int]]) -> typing.Optional[bytes]:
+    """Reads all ranges with one GetAddress, returning their data concatenated. Needs snes_request_lock."""
+    if not snes_socket_open(ctx):
+        return None
+    assert ctx.snes_socket is not None
+
+    GetAddress_Request: SNESRequest = {
+        "Opcode": "GetAddress",
+        "Space": "SNES",
+        "Operands": [hex(value)[2:] for read in reads for value in read]
+    }
+    try:
+        await ctx.snes_socket.send(dumps(GetAddress_Request))
+    except ConnectionClosed:
+        return None
+
+    size = sum(size for _address, size in reads)
+    data: bytes = bytes()
+    while len(data) < size:
         try:
-            await ctx.snes_socket.send(dumps(GetAddress_Request))
-        except ConnectionClosed:
-            return None
+            data += await asyncio.wait_for(ctx.snes_recv_queue.get(), 5)
+        except asyncio.TimeoutError:
+            break
 
-        data: bytes = bytes()
-        while len(data) < size:
-            try:
-                data += await asyncio.wait_for(ctx.snes_recv_queue.get(), 5)
-            except asyncio.TimeoutError:
-                break
-
-        if len(data) != size:
-            snes_logger.error('Error reading %s, requested %d bytes, received %d' % (hex(address), size, len(data)))
-            if len(data):
-                snes_logger.error(str(data))
-                snes_logger.warning('Communication Failure with SNI')
-            if ctx.snes_socket is not None and not ctx.snes_socket.closed:
-                await ctx.snes_socket.close()
-            return None
+    if len(data) != size:
+        snes_logger.error('Error reading %s, requested %d bytes, received %d' %
+                          (", ".join(hex(address) for address, _size in reads), size, len(data)))
+        if len(data):
+            snes_logger.error(str(data))
+            snes_logger.warning('Communication Failure with SNI')
+        if ctx.snes_socket is not None and not ctx.snes_socket.closed:
+            await ctx.snes_socket.close()
+        return None
 
-        return data
+    return data
+
+
+def _snes_read_watched(ctx: SNIContext, address: int, size: int) -> typing.Optional[bytes]:
+    if ctx.snes_watch_data and asyncio.current_task() is ctx.snes_watch_task:
+        for start, data in ctx.snes_watch_data.items():
+            if start <= address and address + size <= start + len(data):
+                return data[address - start:address - start + size]
+    return None
+
+
+async def snes_read(ctx: SNIContext, address: int, size: int) -> typing.Optional[bytes]:
+    watched = _snes_read_watched(ctx, address, size)
+    if watched is not None:
+        return watched
+    try:
+        await ctx.snes_request_lock.acquire()
+        return await _snes_get_address(ctx, [(address, size)])
     finally:
         ctx.snes_request_lock.release()
 
 
+async def snes_read_multiple(ctx: SNIContext, reads: typing.Iterable[typing.Tuple[int, int]]
+                             ) -> typing.Optional[typing.Dict[int, bytes]]:
+    """Reads several (address, size) ranges in one request, returning their data by address.
+    Ranges starting at the same address are read once, with the largest size asked for."""
+    ranges: typing.Dict[int, int] = {}
+    for address, size in reads:
+        ranges[address] = max(size, ranges.get(address, 0))
+    if not ranges:
+        return {}
+    try:
+        await ctx.snes_request_lock.acquire()
+        data = await _snes_get_address(ctx, list(ranges.items()))
+    finally:
+        ctx.snes_request_lock.release()
+    if data is None:
+        return None
+    results: typing.Dict[int, bytes] = {}
+    offset = 0
+    for address, size in ranges.items():
+        results[address] = data[offset:offset + size]
+        offset += size
+    return results
+
+
+async def snes_read_watch_list(ctx: SNIContext, handler: SNIClient) -> None:
+    """Reads the watch list of the game's handler for this game_watcher tick, so snes_read of the task can be served
+    without a request of its own."""
+    ctx.snes_watch_data = {}
+    if handler.watch_list:
+        ctx.snes_watch_data = await snes_read_multiple(ctx, handler.watch_list) or {}
+        ctx.snes_watch_task = asyncio.current_task()
+
+
 async def snes_write(ctx: SNIContext, write_list: typing.List[typing.Tuple[int, bytes]]) -> bool:
+    # watched data this overwrites is outdated
+    ctx.snes_watch_data = {start: data for start, data in ctx.snes_watch_data.items()
+                           if not any(address < start + len(data) and start < address + len(written)
+                                      for address, written in write_list)}
     try:
         await ctx.snes_request_lock.acquire()
 
@@ -579,21 +644,87 @@ async def snes_write(ctx: SNIContext, write_list: typing.List[typing.Tuple[int,
         ctx.snes_request_lock.release()
 
 
-def snes_buffered_write(ctx: SNIContext, address: int, data: bytes) -> None:
-    if ctx.snes_write_buffer and (ctx.snes_write_buffer[-1][0] + len(ctx.snes_write_buffer[-1][1])) == address:
-        # append to existing write command, bundling them
-        ctx.snes_write_buffer[-1] = (ctx.snes_write_buffer[-1][0], ctx.snes_write_buffer[-1][1] + data)
-    else:
-        ctx.snes_write_buffer.append((address, data))
+def snes_buffered_write(ctx: SNIContext, address: int, data: bytes, verify: bool = False) -> None:
+    """Queues a write for snes_flush_writes. With `verify`, the flush reads the bytes back to make sure they arrived."""
+    ctx.snes_write_buffer.append((address, data))
+    if verify:
+        ctx.snes_verify_buffer.append((address, len(data)))
 
 
-async def snes_flush_writes(ctx: SNIContext) -> None:
+class CoalescedWrites(typing.NamedTuple):
+    writes: typing.List[typing.Tuple[int, bytearray]]
+    """ runs to write in buffer order, with unwritten bytes still to be filled in """
+    gaps: typing.List[typing.Tuple[int, int, int]]
+    """ (index of the run, address, size) of unwritten bytes between the writes of a run """
+
+
+def coalesce_writes(writes: typing.Iterable[typing.Tuple[int, bytes]], gap: int = 0) -> CoalescedWrites:
+    """Merges each write into the run before it if they overlap, are adjacent or are up to `gap` bytes apart, later
+    writes taking precedence. Runs keep the buffer order, so a flag written after its data still arrives after it."""
+    runs: typing.List[typing.Tuple[int, int, typing.Dict[int, int]]] = []  # start, end, values by address
+    for address, data in writes:
+        if not data:
+            continue
+        end = address + len(data)
+        if runs and address - runs[-1][1] <= gap and runs[-1][0] - end <= gap:
+            start, run_end, memory = runs[-1]
+            runs[-1] = min(start, address), max(run_end, end), memory
+        else:
+            memory = {}
+            runs.append((address, end, memory))
+        for offset, value in enumerate(data):
+            memory[address + offset] = value
+
+    coalesced = CoalescedWrites([], [])
+    written: typing.Dict[int, int] = {}  # bytes written by the runs before
+    for index, (start, end, memory) in enumerate(runs):
+        coalesced.writes.append((start, bytearray(memory.get(address, written.get(address, 0))
+                                                  for address in range(start, end))))
+        gap_start = None
+        for address in range(start, end + 1):
+            if address < end and address not in memory and address not in written:
+                if gap_start is None:
+                    gap_start = address
+            elif gap_start is not None:
+                coalesced.gaps.append((index, gap_start, address - gap_start))
+                gap_start = None
+        written.update(memory)
+    return coalesced
+
+
+async def snes_flush_writes(ctx: SNIContext) -> bool:
+    """Sends the buffered writes, merged by coalesce_writes with ctx.snes_write_gap.
+    Returns False if they could not be sent, or if verified writes read back differently."""
     if not ctx.snes_write_buffer:
-        return
+        return True
 
     # swap buffers
     ctx.snes_write_buffer, writes = [], ctx.snes_write_buffer
-    await snes_write(ctx, writes)
+    ctx.snes_verify_buffer, verify = [], ctx.snes_verify_buffer
+    coalesced = coalesce_writes(writes, ctx.snes_write_gap)
+    if coalesced.gaps:
+        # the bytes between writes have to be written as they are
+        gaps = await snes_read_multiple(ctx, list(dict.fromkeys((address, size)
+                                                                for _index, address, size in coalesced.gaps)))
+        if gaps is None:
+            return False
+        for index, address, size in coalesced.gaps:
+            start, data = coalesced.writes[index]
+            data[address - start:address - start + size] = gaps[address][:size]
+    if not await snes_write(ctx, [(start, bytes(data)) for start, data in coalesced.writes]):
+        return False
+
+    if verify:
+        expected = {address + offset: value for address, data in writes for offset, value in enumerate(data)}
+        written = await snes_read_multiple(ctx, verify)
+        if written is None:
+            return False
+        for address, size in verify:
+            if written[address][:size] != bytes(expected[address + offset] for offset in range(size)):
+                snes_logger.warning(f"Write to {hex(address)} could not be verified, "
+                                    f"read {written[address][:size].hex()}.")
+                return False
+    return True
 
 
 async def game_watcher(ctx: SNIContext) -> None:
@@ -604,6 +735,7 @@ async def game_watcher(ctx: SNIContext) -> None:
         except asyncio.TimeoutError:
             pass
         ctx.watcher_event.clear()
+        ctx.snes_watch_data = {}
 
         if not ctx.rom or not ctx.client_handler:
             ctx.finished_game = False
@@ -633,6 +765,7 @@ async def game_watcher(ctx: SNIContext) -> None:
         if not ctx.client_handler:
             continue
 
+        await snes_read_watch_list(ctx, ctx.client_handler)
         rom_validated = await ctx.client_handler.validate_rom(ctx)
 
         if not rom_validated or (ctx.auth and ctx.auth != ctx.rom):
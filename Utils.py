@@ -14,6 +14,7 @@ import io
 import collections
 import importlib
 import logging
+import struct
 import warnings
 
 from argparse import Namespace
@@ -331,17 +332,190 @@ def get_file_safe_name(name: str) -> str:
     return "".join(c for c in name if c not in '<>:"/\\|?*')
 
 
+class DataPackageNames(typing.Mapping[int, str]):
+    """id -> name of a data package table in the binary cache, looked up by bisecting the sorted ids of the memory
+    mapped file. Names are decoded on first use."""
+
+    def __init__(self, ids: memoryview, names: memoryview, strings: "_DataPackageStrings") -> None:
+        self.ids = ids
+        self.names = names
+        self.strings = strings
+
+    def __getitem__(self, code: int) -> str:
+        import bisect
+        index = bisect.bisect_left(self.ids, code)
+        if index == len(self.ids) or self.ids[index] != code:
+            raise KeyError(code)
+        return self.strings[self.names[index]]
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __iter__(self) -> typing.Iterator[int]:
+        return iter(self.ids)
+
+
+class DataPackageNameToId(typing.Mapping[str, int]):
+    """name -> id of a data package table in the binary cache. Clients look ids up by name rarely, so the dict for that
+    is only built on first use, while `id_to_name` can be used right away."""
+
+    def __init__(self, id_to_name: DataPackageNames) -> None:
+        self.id_to_name = id_to_name
+
+    @functools.cached_property
+    def _lookup(self) -> Dict[str, int]:
+        return {name: code for code, name in self.id_to_name.items()}
+
+    def __getitem__(self, name: str) -> int:
+        return self._lookup[name]
+
+    def __len__(self) -> int:
+        return len(self.id_to_name)
+
+    def __iter__(self) -> typing.Iterator[str]:
+        return iter(self._lookup)
+
+
+class DataPackageGroups(typing.Mapping[str, typing.List[str]]):
+    """Name groups of a data package in the binary cache, which clients rarely use, so they are parsed on first use."""
+
+    def __init__(self, encoded: memoryview) -> None:
+        self.encoded = encoded
+
+    @functools.cached_property
+    def _groups(self) -> Dict[str, typing.List[str]]:
+        return json.loads(bytes(self.encoded))
+
+    def __getitem__(self, group: str) -> typing.List[str]:
+        return self._groups[group]
+
+    def __len__(self) -> int:
+        return len(self._groups)
+
+    def __iter__(self) -> typing.Iterator[str]:
+        return iter(self._groups)
+
+
+class _DataPackageStrings:
+    """Interned names shared by the tables of a binary data package."""
+
+    def __init__(self, offsets: memoryview, blob: memoryview) -> None:
+        self.offsets = offsets
+        self.blob = blob
+        self.decoded: Dict[int, str] = {}
+
+    def __getitem__(self, index: int) -> str:
+        name = self.decoded.get(index)
+        if name is None:
+            name = self.decoded[index] = str(self.blob[self.offsets[index]:self.offsets[index + 1]], "utf-8")
+        return name
+
+
+# binary data package: header, section index, then 8 byte aligned sections
+_data_package_header = struct.Struct("<4sHxxQI4x")  # magic, format, payload size, crc32 of payload
+_data_package_sections = ("meta", "item_name_groups", "location_name_groups", "string_offsets", "strings",
+                          "item_ids", "item_names", "location_ids", "location_names")
+_data_package_index = struct.Struct(f"<{len(_data_package_sections) * 2}Q")  # offset and size of each section
+_data_package_tables = ("item_name_to_id", "location_name_to_id", "item_name_groups", "location_name_groups")
+_DATA_PACKAGE_MAGIC = b"APDP"
+_DATA_PACKAGE_FORMAT = 1
+
+
+def dump_data_package_binary(data: typing.Mapping[str, Any]) -> bytes:
+    """Encodes a game's data package as sorted id arrays referencing a table of interned names, with the remaining
+    fields as json. See `load_data_package_binary`."""
+    import array
+    import zlib
+
+    strings: Dict[str, int] = {}
+
+    def encode_table(name_to_id: typing.Mapping[str, int]) -> typing.Tuple[bytes, bytes]:
+        pairs = sorted((code, strings.setdefault(name, len(strings))) for name, code in name_to_id.items())
+        return array.array("q", (code for code, _ in pairs)).tobytes(), \
+            array.array("I", (index for _, index in pairs)).tobytes()
+
+    item_ids, item_names = encode_table(data.get("item_name_to_id", {}))
+    location_ids, location_names = encode_table(data.get("location_name_to_id", {}))
+    encoded = [name.encode("utf-8") for name in strings]
+    offsets = array.array("I", [0])
+    for name in encoded:
+        offsets.append(offsets[-1] + len(name))
+    def encode_json(value: Any) -> bytes:
+        return json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+    meta = {key: value for key, value in data.items() if key not in _data_package_tables}
+    sections = [encode_json(meta), encode_json(data.get("item_name_groups", {})),
+                encode_json(data.get("location_name_groups", {})), offsets.tobytes(), b"".join(encoded),
+                item_ids, item_names, location_ids, location_names]
+
+    payload = bytearray(_data_package_index.size)
+    index = []
+    for section in sections:
+        index += [len(payload), len(section)]
+        payload += section
+        payload += bytes(-len(payload) % 8)
+    _data_package_index.pack_into(payload, 0, *index)
+    return _data_package_header.pack(_DATA_PACKAGE_MAGIC, _DATA_PACKAGE_FORMAT, len(payload),
+                                     zlib.crc32(payload)) + payload
+
+
+def load_data_package_binary(path: str, checksum: str) -> Dict[str, Any]:
+    """Memory maps a data package written by `dump_data_package_binary`, verifying it is complete and for `checksum`.
+    `item_name_to_id` and `location_name_to_id` are `DataPackageNameToId`, which look names up in the file, and the
+    name groups are `DataPackageGroups`."""
+    import mmap
+    import zlib
+
+    if sys.byteorder != "little":
+        raise ValueError("Binary data packages are little endian.")
+    with open(path, "rb") as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    view = memoryview(mapped)
+    magic, data_format, size, crc = _data_package_header.unpack_from(view)
+    payload = view[_data_package_header.size:]
+    if magic != _DATA_PACKAGE_MAGIC or data_format != _DATA_PACKAGE_FORMAT:
+        raise ValueError(f"Unknown data package format {magic!r} {data_format}.")
+    if size != len(payload) or zlib.crc32(payload) != crc:
+        raise ValueError("Data package is damaged.")
+
+    index = _data_package_index.unpack_from(payload)
+    sections = {name: payload[index[2 * number]:index[2 * number] + index[2 * number + 1]]
+                for number, name in enumerate(_data_package_sections)}
+    data: Dict[str, Any] = json.loads(bytes(sections["meta"]))
+    if data.get("checksum") != checksum:
+        raise ValueError(f"Data package has checksum {data.get('checksum')}, not {checksum}.")
+    strings = _DataPackageStrings(sections["string_offsets"].cast("I"), sections["strings"])
+    data["item_name_to_id"] = DataPackageNameToId(
+        DataPackageNames(sections["item_ids"].cast("q"), sections["item_names"].cast("I"), strings))
+    data["location_name_to_id"] = DataPackageNameToId(
+        DataPackageNames(sections["location_ids"].cast("q"), sections["location_names"].cast("I"), strings))
+    data["item_name_groups"] = DataPackageGroups(sections["item_name_groups"])
+    data["location_name_groups"] = DataPackageGroups(sections["location_name_groups"])
+    return data
+
+
 def load_data_package_for_checksum(game: str, checksum: typing.Optional[str]) -> Dict[str, Any]:
     if checksum and game:
         if checksum != get_file_safe_name(checksum):
             raise ValueError(f"Bad symbols in checksum: {checksum}")
+        binary_path = cache_path("datapackage", get_file_safe_name(game), f"{checksum}.bin")
+        if os.path.exists(binary_path):
+            try:
+                return load_data_package_binary(binary_path, checksum)
+            except Exception as e:
+                logging.debug(f"Could not load binary data package: {e}")
         path = cache_path("datapackage", get_file_safe_name(game), f"{checksum}.json")
         if os.path.exists(path):
             try:
                 with open(path, "r", encoding="utf-8-sig") as f:
-                    return json.load(f)
+                    data = json.load(f)
             except Exception as e:
                 logging.debug(f"Could not load data package: {e}")
+            else:
+                if data.get("checksum") == checksum:
+                    # cached before the binary format, or the binary file was damaged
+                    _store_data_package_binary(binary_path, data)
+                return data
 
     # fall back to old cache
     cache = persistent_load().get("datapackage", {}).get("games", {}).get(game, {})
@@ -364,6 +538,20 @@ def store_data_package_for_checksum(game: str, data: typing.Dict[str, Any]) -> N
                 json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
         except Exception as e:
             logging.debug(f"Could not store data package: {e}")
+        _store_data_package_binary(os.path.join(game_folder, f"{checksum}.bin"), data)
+
+
+def _store_data_package_binary(path: str, data: typing.Mapping[str, Any]) -> None:
+    # written under a temporary name, as other clients may have the file mapped
+    temp_path = f"{path}.{os.getpid()}"
+    try:
+        with open(temp_path, "wb") as f:
+            f.write(dump_data_package_binary(data))
+        os.replace(temp_path, path)
+    except Exception as e:
+        logging.debug(f"Could not store binary data package: {e}")
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
 
 
 def get_default_adjuster_settings(game_name: str) -> Namespace:
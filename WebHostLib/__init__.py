@@ -24,6 +24,8 @@ app.jinja_env.filters['all'] = all
 app.config["SELFHOST"] = True  # application process is in charge of running the websites
 app.config["GENERATORS"] = 8  # maximum concurrent world gens
 app.config["HOSTERS"] = 8  # maximum concurrent room hosters
+app.config["HOSTER_MEMORY_LIMIT"] = 0  # bytes of memory use above which a room hoster is avoided for new rooms
+app.config["ROOM_COMMAND_INTERVAL"] = 0.5  # seconds between checks for commands sent to rooms from the website
 app.config["SELFLAUNCH"] = True  # application process is in charge of launching Rooms.
 app.config["SELFLAUNCHCERT"] = None  # can point to a SSL Certificate to encrypt Room websocket connections
 app.config["SELFLAUNCHKEY"] = None  # can point to a SSL Certificate Key to encrypt Room websocket connections
@@ -32,12 +34,24 @@ app.config["DEBUG"] = False
 app.config["PORT"] = 80
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 app.config['MAX_CONTENT_LENGTH'] = 64 * 1024 * 1024  # 64 megabyte limit
+# bytes an uploaded .zip may extract to, which also limits its multidata once decompressed. 0 for no limit
+app.config["MAX_UPLOAD_SIZE"] = 512 * 1024 * 1024
+app.config["MAX_UPLOAD_SLOTS"] = 0  # slots an uploaded multiworld may have, not counting groups. 0 for no limit
 # if you want to deploy, make sure you have a non-guessable secret key
 app.config["SECRET_KEY"] = bytes(socket.gethostname(), encoding="utf-8")
 # at what amount of worlds should scheduling be used, instead of rolling in the web-thread
 app.config["JOB_THRESHOLD"] = 1
 # after what time in seconds should generation be aborted, freeing the queue slot. Can be set to None to disable.
 app.config["JOB_TIME"] = 600
+# player counts above which queued generations drop into the next lower priority class
+app.config["GENERATION_PRIORITY_PLAYERS"] = [2, 8]
+app.config["GENERATION_PRIORITY_OWNERS"] = []  # session ids whose generations are always in the top priority class
+app.config["GENERATION_PRIORITY_AGING"] = 300  # seconds of waiting after which a generation rises one priority class
+app.config["GENERATION_OWNER_LIMIT"] = 2  # generations of one owner running at once. 0 for no limit
+# generators kept free for the top priority class, while the others are busy. At most GENERATORS - 1
+app.config["GENERATION_RESERVED"] = 1
+# token for admin api endpoints such as /api/generation_queue, sent as the X-Admin-Token header. None to disable
+app.config["ADMIN_TOKEN"] = None
 app.config['SESSION_PERMANENT'] = True
 
 # waitress uses one thread for I/O, these are for processing of views that then get sent
@@ -51,6 +65,14 @@ app.config["PONY"] = {
 }
 app.config["MAX_ROLL"] = 20
 app.config["CACHE_TYPE"] = "SimpleCache"
+app.config["TRACKER_PUBLISH_INTERVAL"] = 1.0  # seconds rooms wait before publishing changed progress to trackers
+app.config["TRACKER_DATA_CACHE_SIZE"] = 256 * 1024 * 1024  # estimated bytes of decoded seeds kept for trackers
+app.config["TRACKER_EVENTS_INTERVAL"] = 2.0  # seconds between checks for new progress in tracker event streams
+app.config["TRACKER_EVENTS_DURATION"] = 60  # seconds an event stream is held open before the browser reconnects
+# concurrent tracker event streams, each holding a view thread open; pages beyond the limit reload periodically
+app.config["TRACKER_EVENTS_STREAMS"] = 4
+# ids of rooms, as in their url, whose commands get recorded to logs/ for MultiServerReplay.py while they run
+app.config["RECORD_ROOMS"] = []
 app.config["HOST_ADDRESS"] = ""
 app.config["ASSET_RIGHTS"] = False
 
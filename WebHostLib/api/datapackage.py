@@ -1,25 +1,66 @@
-from flask import abort
+import functools
+import gzip
+import hashlib
+import typing
+
+from flask import Response, abort, request
 
-from Utils import restricted_loads
 from WebHostLib import cache
-from WebHostLib.models import GameDataPackage
+from WebHostLib.game_data import compress_game_data, get_game_data_json
 from . import api_endpoints
 
 
+def _set_cache_headers(response: Response, etag: str, immutable: bool) -> None:
+    response.vary.add("Accept-Encoding")
+    response.set_etag(etag)
+    response.cache_control.public = True
+    if immutable:
+        response.cache_control.max_age = 365 * 24 * 60 * 60
+        response.cache_control.immutable = True
+    else:
+        response.cache_control.no_cache = True  # revalidating is cheap, and the content changes with worlds
+
+
+def _json_response(etag: str, compressed: bytes, immutable: bool = False) -> Response:
+    """Serves pre-compressed json, decompressing only for clients that don't accept gzip.
+    Requests with a matching If-None-Match get a 304 without a body."""
+    if request.accept_encodings["gzip"]:
+        response = Response(compressed, mimetype="application/json")
+        response.content_encoding = "gzip"
+    else:
+        response = Response(gzip.decompress(compressed), mimetype="application/json")
+    _set_cache_headers(response, etag, immutable)
+    return response.make_conditional(request)
+
+
+@functools.lru_cache(maxsize=1)
+def _get_network_data_package_json() -> typing.Tuple[str, bytes]:
+    from worlds import network_data_package
+    compressed = compress_game_data(network_data_package)
+    return hashlib.sha1(compressed).hexdigest(), compressed
+
+
 @api_endpoints.route('/datapackage')
-@cache.cached()
 def get_datapackage():
-    from worlds import network_data_package
-    return network_data_package
+    return _json_response(*_get_network_data_package_json())
 
 
-@api_endpoints.route('/datapackage/<string:checksum>')
 @cache.memoize(timeout=3600)
+def _get_game_data_json(checksum: str) -> typing.Optional[bytes]:
+    return get_game_data_json(checksum)
+
+
+@api_endpoints.route('/datapackage/<string:checksum>')
 def get_datapackage_by_checksum(checksum: str):
-    package = GameDataPackage.get(checksum=checksum)
-    if package:
-        return restricted_loads(package.data)
-    return abort(404)
+    if request.if_none_match.contains(checksum):
+        # the checksum identifies the content, so there is no need to look it up
+        response = Response(status=304)
+        _set_cache_headers(response, checksum, immutable=True)
+        return response
+    compressed = _get_game_data_json(checksum)
+    if compressed is None:
+        return abort(404)
+    return _json_response(checksum, compressed, immutable=True)
 
 
 @api_endpoints.route('/datapackage_checksum')
@@ -1,15 +1,14 @@
-import json
-import pickle
+import hmac
 from uuid import UUID
 
 from flask import request, session, url_for
 from markupsafe import Markup
-from pony.orm import commit
 
 from WebHostLib import app
 from WebHostLib.check import get_yaml_data, roll_options
 from WebHostLib.generate import get_meta
-from WebHostLib.models import Generation, STATE_QUEUED, Seed, STATE_ERROR
+from WebHostLib.jobs import cancel_generation, get_queue_status, get_queue_summary, queue_generation
+from WebHostLib.models import Generation, Seed, STATE_ERROR
 from . import api_endpoints
 
 
@@ -55,12 +54,8 @@ def generate_api():
             return {"text": str(results),
                     "detail": results}, 400
         else:
-            gen = Generation(
-                options=pickle.dumps({name: vars(options) for name, options in gen_options.items()}),
-                # convert to json compatible
-                meta=json.dumps(meta), state=STATE_QUEUED,
-                owner=session["_id"])
-            commit()
+            gen = queue_generation({name: vars(options) for name, options in gen_options.items()}, meta,
+                                   session["_id"], app.config)
             return {"text": f"Generation of seed {gen.id} started successfully.",
                     "detail": gen.id,
                     "encoded": app.url_map.converters["suuid"].to_url(None, gen.id),
@@ -82,4 +77,25 @@ def wait_seed_api(seed: UUID):
         return {"text": "Generation not found"}, 404
     elif generation.state == STATE_ERROR:
         return {"text": "Generation failed"}, 500
-    return {"text": "Generation running"}, 202
+    return {"text": "Generation running", **get_queue_status(generation)}, 202
+
+
+@api_endpoints.route('/cancel/<suuid:seed>', methods=['POST'])
+def cancel_seed_api(seed: UUID):
+    generation = Generation.get(id=seed)
+    if not generation:
+        return {"text": "Generation not found"}, 404
+    if generation.owner != session["_id"]:
+        return {"text": "Only the owner can cancel a generation"}, 403
+    if not cancel_generation(generation):
+        return {"text": "Generation already failed"}, 409
+    return {"text": "Generation cancelled"}, 200
+
+
+@api_endpoints.route('/generation_queue')
+def generation_queue_api():
+    """Queue depth and per-phase timings of running generations, for admins keeping an eye on the generators."""
+    token = app.config["ADMIN_TOKEN"]
+    if not token or not hmac.compare_digest(request.headers.get("X-Admin-Token", ""), token):
+        return {"text": "Not authorized"}, 403
+    return get_queue_summary()
@@ -1,14 +1,18 @@
 from __future__ import annotations
 
+import base64
 import json
 import logging
 import multiprocessing
+import os
+import signal
 import typing
+from collections import Counter
 from datetime import timedelta, datetime
 from threading import Event, Thread
 from uuid import UUID
 
-from pony.orm import db_session, select, commit
+from pony.orm import db_session, exists, select, commit
 
 from Utils import restricted_loads
 from .locker import Locker, AlreadyRunningException
@@ -35,22 +39,28 @@ def handle_generation_failure(result: BaseException):
         logging.exception(e)
 
 
-def launch_generator(pool: multiprocessing.pool.Pool, generation: Generation):
+def launch_generator(pool: multiprocessing.pool.Pool, generation: Generation
+                     ) -> typing.Optional[multiprocessing.pool.AsyncResult]:
     try:
         meta = json.loads(generation.meta)
         options = restricted_loads(generation.options)
         logging.info(f"Generating {generation.id} for {len(options)} players")
-        pool.apply_async(gen_game, (options,),
-                         {"meta": meta,
-                          "sid": generation.id,
-                          "owner": generation.owner},
-                         handle_generation_success, handle_generation_failure)
+        result = pool.apply_async(gen_game, (options,),
+                                  {"meta": meta,
+                                   "sid": generation.id,
+                                   "owner": generation.owner},
+                                  handle_generation_success, handle_generation_failure)
     except Exception as e:
         generation.state = STATE_ERROR
         commit()
         logging.exception(e)
+        return None
     else:
         generation.state = STATE_STARTED
+        job = GenerationJob.get(id=generation.id)
+        if job:
+            job.started = datetime.utcnow()
+        return result
 
 
 def init_db(pony_config: dict):
@@ -82,16 +92,16 @@ def autohost(config: dict):
                     hoster = MultiworldInstance(config, x)
                     hosters.append(hoster)
                     hoster.start()
+                scheduler = RoomScheduler(hosters, config["HOSTER_MEMORY_LIMIT"])
 
                 while not stop_event.wait(0.1):
+                    scheduler.update()
                     with db_session:
-                        rooms = select(
-                            room for room in Room if
-                            room.last_activity >= datetime.utcnow() - timedelta(days=3))
-                        for room in rooms:
+                        for room in get_active_rooms(datetime.utcnow() - timedelta(days=3)):
                             # we have to filter twice, as the per-room timeout can't currently be PonyORM transpiled.
-                            if room.last_activity >= datetime.utcnow() - timedelta(seconds=room.timeout + 5):
-                                hosters[room.id.int % len(hosters)].start_room(room.id)
+                            if room.last_activity >= datetime.utcnow() - timedelta(seconds=room.timeout + 5) \
+                                    and not scheduler.is_hosted(room.id):
+                                scheduler.start_room(room.id, len(Room[room.id].seed.slots))
 
         except AlreadyRunningException:
             logging.info("Autohost reports as already running, not starting another.")
@@ -107,6 +117,16 @@ def autogen(config: dict):
 
                 with multiprocessing.Pool(config["GENERATORS"], initializer=init_db,
                                           initargs=(config["PONY"],), maxtasksperchild=10) as generator_pool:
+                    scheduler = GenerationScheduler(config["GENERATORS"], config["GENERATION_OWNER_LIMIT"],
+                                                    config["GENERATION_RESERVED"], config["GENERATION_PRIORITY_AGING"])
+                    results: typing.Dict[UUID, multiprocessing.pool.AsyncResult] = {}
+
+                    def start(generation: Generation):
+                        result = launch_generator(generator_pool, generation)
+                        if result:
+                            results[generation.id] = result
+                            scheduler.start(generation.id, generation.owner)
+
                     with db_session:
                         to_start = select(generation for generation in Generation if generation.state == STATE_STARTED)
 
@@ -117,28 +137,161 @@ def autogen(config: dict):
                                 if sid:
                                     generation.delete()
                                 else:
-                                    launch_generator(generator_pool, generation)
+                                    start(generation)
 
                             commit()
                         select(generation for generation in Generation if generation.state == STATE_ERROR).delete()
+                        select(job for job in GenerationJob
+                               if not exists(generation for generation in Generation if generation.id == job.id)
+                               ).delete(bulk=True)
 
                     while not stop_event.wait(0.1):
+                        for generation_id, result in list(results.items()):
+                            if result.ready():
+                                del results[generation_id]
+                                scheduler.finish(generation_id)
                         with db_session:
+                            if results:
+                                for job in select(job for job in GenerationJob if job.cancelled):
+                                    if job.id in results and stop_generator(job):
+                                        del results[job.id]
+                                        scheduler.finish(job.id)
+                                commit()
                             # for update locks the database row(s) during transaction, preventing writes from elsewhere
-                            to_start = select(
+                            to_start = {generation.id: generation for generation in select(
                                 generation for generation in Generation
-                                if generation.state == STATE_QUEUED).for_update()
-                            for generation in to_start:
-                                launch_generator(generator_pool, generation)
+                                if generation.state == STATE_QUEUED).for_update()}
+                            now = datetime.utcnow()
+                            queued = [
+                                QueuedGeneration(job.id, job.owner, job.priority, (now - job.queued).total_seconds())
+                                for job in (get_job(generation, config) for generation in to_start.values())]
+                            while True:
+                                chosen = scheduler.choose(queued)
+                                if not chosen:
+                                    break
+                                queued.remove(chosen)
+                                start(to_start[chosen.id])
         except AlreadyRunningException:
             logging.info("Autogen reports as already running, not starting another.")
 
     Thread(target=keep_running, name="AP_Autogen").start()
 
 
+def stop_generator(job: GenerationJob) -> bool:
+    """Kills the generator process running a cancelled job, the pool replaces it.
+    Returns False if the job hasn't reported a process yet, it then stops by itself when reaching its first phase."""
+    if not job.pid:
+        return False
+    try:
+        os.kill(job.pid, signal.SIGTERM)
+    except OSError as e:
+        logging.warning(f"Could not stop generator process {job.pid} of {job.id}: {e}")
+    generation = Generation.get(id=job.id)
+    if generation and generation.state != STATE_ERROR:
+        set_error(generation, "Generation was cancelled.")
+    logging.info(f"Cancelled generation {job.id}")
+    return True
+
+
+class QueuedGeneration(typing.NamedTuple):
+    id: UUID
+    owner: UUID
+    priority: int
+    waited: float
+    """ seconds since it was queued """
+
+
+class GenerationScheduler:
+    """Picks which queued generation runs next on a free generator.
+    Lower priority classes come first, with waiting raising a generation one class per aging seconds so large
+    multiworlds don't starve. Within a class, owners with fewer generations running come first (fair share),
+    then the longest waiting. Some generators are only given to the top class while the others are busy."""
+
+    def __init__(self, workers: int, owner_limit: int = 0, reserved: int = 0, aging: float = 0):
+        self.workers = workers
+        self.owner_limit = owner_limit
+        """ generations of one owner running at once, 0 for no limit """
+        self.reserved = max(0, min(reserved, workers - 1))
+        self.aging = aging
+        """ seconds of waiting per priority class gained, 0 to disable """
+        self.running: typing.Dict[UUID, UUID] = {}
+        """ generation id: owner """
+
+    def get_priority(self, generation: QueuedGeneration) -> int:
+        if self.aging:
+            return max(0, generation.priority - int(generation.waited // self.aging))
+        return generation.priority
+
+    def choose(self, queued: typing.Iterable[QueuedGeneration]) -> typing.Optional[QueuedGeneration]:
+        """The generation to start next, or None if there is none that may start now."""
+        free = self.workers - len(self.running)
+        if free <= 0:
+            return None
+        owner_running = Counter(self.running.values())
+
+        def key(generation: QueuedGeneration) -> typing.Tuple[int, int, float]:
+            return self.get_priority(generation), owner_running[generation.owner], -generation.waited
+
+        chosen = min((generation for generation in queued
+                      if not self.owner_limit or owner_running[generation.owner] < self.owner_limit),
+                     key=key, default=None)
+        if chosen and self.get_priority(chosen) and free <= self.reserved:
+            return None
+        return chosen
+
+    def start(self, generation_id: UUID, owner: UUID):
+        self.running[generation_id] = owner
+
+    def finish(self, generation_id: UUID):
+        self.running.pop(generation_id, None)
+
+
 multiworlds: typing.Dict[type(Room.id), MultiworldInstance] = {}
 
 
+class RoomScheduler:
+    """Places rooms on the hoster with the least load, based on the HosterLoad each hoster process reports.
+    Rooms are only pinned to a hoster while running, so idle rooms that shut down get placed anew on restart."""
+    room_weight: float = 1.0
+    slot_weight: float = 0.25
+    """ an idle slot may connect a client at any time """
+    client_weight: float = 1.0
+    loop_lag_weight: float = 50.0
+    """ per second of event loop lag """
+
+    def __init__(self, hosters: typing.Sequence[MultiworldInstance], memory_limit: int = 0):
+        self.hosters = hosters
+        self.memory_limit = memory_limit
+        """ bytes of RSS above which a hoster only gets new rooms if all hosters are above it, 0 to disable """
+
+    def update(self):
+        for hoster in self.hosters:
+            hoster.update()
+
+    def is_hosted(self, room_id: UUID) -> bool:
+        return any(room_id in hoster.room_ids for hoster in self.hosters)
+
+    def get_score(self, hoster: MultiworldInstance) -> float:
+        """Estimated load of a hoster, including rooms placed on it since its last report. Lower is better."""
+        load = hoster.load
+        return (load.rooms + hoster.pending_rooms) * self.room_weight + \
+            (load.slots + hoster.pending_slots) * self.slot_weight + \
+            load.clients * self.client_weight + \
+            load.loop_lag * self.loop_lag_weight
+
+    def choose_hoster(self) -> MultiworldInstance:
+        def key(hoster: MultiworldInstance) -> typing.Tuple[bool, float]:
+            over_limit = bool(self.memory_limit) and hoster.load.rss > self.memory_limit
+            return over_limit, self.get_score(hoster)
+
+        return min(self.hosters, key=key)
+
+    def start_room(self, room_id: UUID, slots: int) -> MultiworldInstance:
+        hoster = self.choose_hoster()
+        hoster.start_room(room_id, slots)
+        return hoster
+
+
 class MultiworldInstance():
     def __init__(self, config: dict, id: int):
         self.room_ids = set()
@@ -147,8 +300,17 @@ class MultiworldInstance():
         self.cert = config["SELFLAUNCHCERT"]
         self.key = config["SELFLAUNCHKEY"]
         self.host = config["HOST_ADDRESS"]
+        self.command_interval = config["ROOM_COMMAND_INTERVAL"]
+        self.progress_interval = config["TRACKER_PUBLISH_INTERVAL"]
+        self.record_rooms = frozenset(UUID(bytes=base64.urlsafe_b64decode(room_id + "=="))
+                                      for room_id in config["RECORD_ROOMS"])
         self.rooms_to_start = multiprocessing.Queue()
         self.rooms_shutting_down = multiprocessing.Queue()
+        self.load_reports = multiprocessing.Queue()
+        self.load = HosterLoad()
+        self.pending_rooms = 0
+        self.pending_slots = 0
+        """ rooms and their slots started since the last load report """
         self.name = f"MultiHoster{id}"
 
     def start(self):
@@ -159,17 +321,29 @@ class MultiworldInstance():
                                           args=(self.name, self.ponyconfig, get_static_server_data(),
                                                 self.cert, self.key, self.host,
                                                 self.rooms_to_start, self.rooms_shutting_down),
+                                          kwargs={"command_interval": self.command_interval,
+                                                  "load_reports": self.load_reports,
+                                                  "progress_interval": self.progress_interval,
+                                                  "record_rooms": self.record_rooms},
                                           name=self.name)
         process.start()
         self.process = process
 
-    def start_room(self, room_id):
+    def update(self):
+        """Processes rooms that shut down and load reports sent by the hoster process."""
         while not self.rooms_shutting_down.empty():
-            self.room_ids.remove(self.rooms_shutting_down.get(block=True, timeout=None))
+            self.room_ids.discard(self.rooms_shutting_down.get(block=True, timeout=None))
+        while not self.load_reports.empty():
+            self.load = self.load_reports.get(block=True, timeout=None)
+            self.pending_rooms = self.pending_slots = 0
+
+    def start_room(self, room_id, slots: int = 0):
         if room_id in self.room_ids:
             pass  # should already be hosted currently.
         else:
             self.room_ids.add(room_id)
+            self.pending_rooms += 1
+            self.pending_slots += slots
             self.rooms_to_start.put(room_id)
 
     def stop(self):
@@ -185,6 +359,8 @@ class MultiworldInstance():
         self.process = None
 
 
-from .models import Room, Generation, STATE_QUEUED, STATE_STARTED, STATE_ERROR, db, Seed, Slot
-from .customserver import run_server_process, get_static_server_data
+from .models import Room, Generation, GenerationJob, STATE_QUEUED, STATE_STARTED, STATE_ERROR, db, Seed, Slot
+from .jobs import get_job, set_error
+from .room_storage import get_active_rooms
+from .customserver import run_server_process, get_static_server_data, HosterLoad
 from .generate import gen_game
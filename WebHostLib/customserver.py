@@ -6,23 +6,27 @@ import datetime
 import functools
 import logging
 import multiprocessing
-import pickle
+import os
 import random
 import socket
 import threading
 import time
 import typing
 import sys
+from uuid import UUID
 
 import websockets
 from pony.orm import commit, db_session, select
 
 import Utils
 
-from MultiServer import Context, server, auto_shutdown, ServerCommandProcessor, ClientMessageProcessor, load_server_cert
+from MultiServer import Context, server, auto_shutdown, ServerCommandProcessor, ClientMessageProcessor, \
+    CommandRecorder, load_server_cert
 from Utils import restricted_loads, cache_argsless
 from .locker import Locker
-from .models import Command, GameDataPackage, Room, db
+from .models import Command, GameDataPackage, Room, SlotProgress, db
+from .progress import ProgressRecord, encode_checked, encode_hints, encode_received, encode_video
+from .room_storage import load_room_save, store_room_save, update_room_activity
 
 
 class CustomClientMessageProcessor(ClientMessageProcessor):
@@ -70,6 +74,10 @@ class WebHostContext(Context):
         del self.static_server_data
         self.main_loop = asyncio.get_running_loop()
         self.video = {}
+        self.progress_dirty = True
+        self._published_progress: typing.Dict[typing.Tuple[int, int], typing.Tuple[typing.Any, ...]] = {}
+        self.pending_activity: typing.Optional[datetime.datetime] = None
+        """ time of the last save, not yet written as the room's last activity by the SlotProgressPublisher """
         self.tags = ["AP", "WebHost"]
 
     def __del__(self):
@@ -86,19 +94,6 @@ class WebHostContext(Context):
             setattr(self, key, value)
         self.non_hintable_names = collections.defaultdict(frozenset, self.non_hintable_names)
 
-    def listen_to_db_commands(self):
-        cmdprocessor = DBCommandProcessor(self)
-
-        while not self.exit_event.is_set():
-            with db_session:
-                commands = select(command for command in Command if command.room.id == self.room_id)
-                if commands:
-                    for command in commands:
-                        self.main_loop.call_soon_threadsafe(cmdprocessor, command.commandtext)
-                        command.delete()
-                    commit()
-            time.sleep(5)
-
     @db_session
     def load(self, room_id: int):
         self.room_id = room_id
@@ -126,9 +121,9 @@ class WebHostContext(Context):
                     # games package could be dropped from static data once all rooms embed data package
                     del multidata["datapackage"][game]
                 else:
-                    row = GameDataPackage.get(checksum=game_data["checksum"])
-                    if row:  # None if rolled on >= 0.3.9 but uploaded to <= 0.3.8. multidata should be complete
-                        game_data_packages[game] = Utils.restricted_loads(row.data)
+                    data_package = load_game_data_package(game_data["checksum"])
+                    if data_package:  # None if rolled on >= 0.3.9 but uploaded to <= 0.3.8. multidata should be complete
+                        game_data_packages[game] = data_package
                         continue
                     else:
                         self.logger.warning(f"Did not find game_data_package for {game}: {game_data['checksum']}")
@@ -147,19 +142,17 @@ class WebHostContext(Context):
     def init_save(self, enabled: bool = True):
         self.saving = enabled
         if self.saving:
-            savegame_data = Room.get(id=self.room_id).multisave
+            savegame_data, _ = load_room_save(Room.get(id=self.room_id))
             if savegame_data:
-                self.set_save(restricted_loads(Room.get(id=self.room_id).multisave))
+                self.set_save(savegame_data)
             self._start_async_saving(atexit_save=False)
-        threading.Thread(target=self.listen_to_db_commands, daemon=True).start()
 
     @db_session
     def _save(self, exit_save: bool = False) -> bool:
-        room = Room.get(id=self.room_id)
-        room.multisave = pickle.dumps(self.get_save())
+        store_room_save(Room.get(id=self.room_id), self.get_save())
         # saving only occurs on activity, so we can "abuse" this information to mark this as last_activity
         if not exit_save:  # we don't want to count a shutdown as activity, which would restart the server again
-            room.last_activity = datetime.datetime.utcnow()
+            self.pending_activity = datetime.datetime.utcnow()
         return True
 
     def get_save(self) -> dict:
@@ -167,6 +160,267 @@ class WebHostContext(Context):
         d["video"] = [(tuple(playerslot), videodata) for playerslot, videodata in self.video.items()]
         return d
 
+    def save(self, now=False) -> bool:
+        # every change a tracker shows gets saved, so this is where trackers get to know about it as well
+        self.progress_dirty = True
+        return super(WebHostContext, self).save(now)
+
+    def collect_progress(self) -> typing.List[ProgressRecord]:
+        """Returns the progress of all slots that changed since the last call. Has to run on the room's loop."""
+        self.progress_dirty = False
+        records = []
+        published = {}
+        for (team, slot) in self.player_names:
+            checked = self.location_checks[team, slot]
+            received = self.received_items.get((team, slot, True), ())
+            hints = self.hints[team, slot]
+            status = self.client_game_state[team, slot]
+            activity = self.client_activity_timers.get((team, slot))
+            last_activity = activity.timestamp() if activity else None
+            alias = self.name_aliases.get((team, slot))
+            video = self.video.get((team, slot))
+            # hints only ever change in count or by being found
+            fingerprint = (len(checked), len(received), len(hints), sum(hint.found for hint in hints), status,
+                           last_activity, alias, video)
+            if self._published_progress.get((team, slot)) != fingerprint:
+                published[team, slot] = fingerprint
+                # item link groups have no locations of their own
+                records.append(ProgressRecord(
+                    team, slot, encode_checked(self.locations.get(slot, {}), checked), encode_received(received),
+                    len(received), encode_hints(hints), status, last_activity, alias, encode_video(video)))
+        self._published_progress.update(published)
+        return records
+
+    def discard_progress(self, records: typing.Iterable[ProgressRecord]) -> None:
+        """Collects the slots of records again on the next call of collect_progress, as they were not written."""
+        for record in records:
+            self._published_progress.pop((record.team, record.slot), None)
+        self.progress_dirty = True
+
+
+class DBCommandDispatcher:
+    """Polls the Command table for all rooms of a hoster process at once
+    and hands the commands to their room's DBCommandProcessor on the event loop."""
+    interval: float
+    """ seconds between polls, which is the maximum delay until a command is handled """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, interval: float = 0.5):
+        self.loop = loop
+        self.interval = interval
+        self.rooms: typing.Dict[int, DBCommandProcessor] = {}
+        self.lock = threading.Lock()
+        self.thread: typing.Optional[threading.Thread] = None
+
+    def register(self, ctx: WebHostContext):
+        with self.lock:
+            self.rooms[ctx.room_id] = DBCommandProcessor(ctx)
+            if not self.thread:
+                self.thread = threading.Thread(target=self.run, name="DBCommandDispatcher", daemon=True)
+                self.thread.start()
+
+    def unregister(self, ctx: WebHostContext):
+        with self.lock:
+            if self.rooms.get(ctx.room_id) and self.rooms[ctx.room_id].ctx is ctx:
+                del self.rooms[ctx.room_id]
+
+    @db_session
+    def poll(self) -> int:
+        """Dispatches all pending commands of the registered rooms with a single query. Returns the command count."""
+        with self.lock:
+            room_ids = list(self.rooms)
+        if not room_ids:
+            return 0
+        commands = select(command for command in Command if command.room.id in room_ids).order_by(Command.id)[:]
+        for command in commands:
+            processor = self.rooms.get(command.room.id)
+            if processor:  # room may have shut down since the query
+                self.loop.call_soon_threadsafe(processor, command.commandtext)
+            command.delete()
+        if commands:
+            commit()
+        return len(commands)
+
+    def run(self):
+        while True:
+            try:
+                self.poll()
+            except Exception as e:
+                logging.exception(e)
+            time.sleep(self.interval)
+
+
+class SlotProgressPublisher:
+    """Writes the progress of all rooms of a hoster process to the SlotProgress table, for the trackers to read,
+    and the last activity of the rooms that saved since, all in one transaction."""
+    interval: float
+    """ seconds between checks for changed progress, which is the maximum delay until trackers see a change """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, interval: float = 1.0):
+        self.loop = loop
+        self.interval = interval
+        self.rooms: typing.Dict[int, WebHostContext] = {}
+        self.lock = threading.Lock()
+        self.write_lock = threading.Lock()
+        """ held while writing, so the activity of a room is not written anymore once it is unregistered """
+        self.thread: typing.Optional[threading.Thread] = None
+
+    def register(self, ctx: WebHostContext):
+        with self.lock:
+            self.rooms[ctx.room_id] = ctx
+            if not self.thread:
+                self.thread = threading.Thread(target=self.run, name="SlotProgressPublisher", daemon=True)
+                self.thread.start()
+
+    def unregister(self, ctx: WebHostContext):
+        """Writes the progress of all slots of the room one last time, so nothing since the last publish is lost.
+        Has to run on the room's loop."""
+        with self.write_lock:
+            with self.lock:
+                if self.rooms.get(ctx.room_id) is not ctx:
+                    return
+                del self.rooms[ctx.room_id]
+            try:
+                # progress collected by a publish still in progress is not written anymore, so write all of it
+                ctx._published_progress.clear()
+                self.write([(ctx.room_id, ctx.collect_progress())])
+            except Exception as e:
+                ctx.logger.exception(e)
+
+    def publish(self) -> int:
+        """Writes the changed progress and activity of all registered rooms in one transaction.
+        Returns the written progress row count. If anything fails, it is written on the next publish instead."""
+        with self.lock:
+            dirty = [ctx for ctx in self.rooms.values() if ctx.progress_dirty]
+            activity = {ctx.room_id: ctx.pending_activity for ctx in self.rooms.values() if ctx.pending_activity}
+        if not dirty and not activity:
+            return 0
+
+        async def collect() -> typing.List[typing.Tuple[WebHostContext, typing.List[ProgressRecord]]]:
+            changes = []
+            for ctx in dirty:
+                try:
+                    changes.append((ctx, ctx.collect_progress()))
+                except Exception as e:  # don't stop publishing the other rooms
+                    ctx.logger.exception(e)
+            return changes
+
+        changes = asyncio.run_coroutine_threadsafe(collect(), self.loop).result() if dirty else []
+        try:
+            with self.write_lock, db_session:
+                with self.lock:
+                    # a room that shut down since marked itself idle, which its last save must not undo,
+                    # and wrote its progress, which may be newer than what was collected here
+                    activity = {room_id: time for room_id, time in activity.items() if room_id in self.rooms}
+                    changes = [(ctx, records) for ctx, records in changes if self.rooms.get(ctx.room_id) is ctx]
+                update_room_activity(activity)
+                count = self.write((ctx.room_id, records) for ctx, records in changes)
+        except BaseException:
+            for ctx, records in changes:
+                ctx.discard_progress(records)
+            raise
+        with self.lock:
+            for ctx in self.rooms.values():
+                # the room may have saved again since
+                if ctx.pending_activity is not None and ctx.pending_activity == activity.get(ctx.room_id):
+                    ctx.pending_activity = None
+        return count
+
+    @staticmethod
+    @db_session
+    def write(changes: typing.Iterable[typing.Tuple[int, typing.List[ProgressRecord]]]) -> int:
+        count = 0
+        now = datetime.datetime.utcnow()
+        for room_id, records in changes:
+            if not records:
+                continue
+            room = Room.get(id=room_id)
+            if not room:
+                continue
+            rows = {(row.team, row.slot): row for row in select(row for row in SlotProgress if row.room == room)}
+            for record in records:
+                values = record._asdict()
+                team, slot = values.pop("team"), values.pop("slot")
+                row = rows.get((team, slot))
+                if row:
+                    row.set(updated=now, **values)
+                else:
+                    SlotProgress(room=room, team=team, slot=slot, updated=now, **values)
+                count += 1
+        return count
+
+    def run(self):
+        while True:
+            try:
+                self.publish()
+            except Exception as e:
+                logging.exception(e)
+            time.sleep(self.interval)
+
+
+class HosterLoad(typing.NamedTuple):
+    """Load of a hoster process, as reported to the autohost scheduler."""
+    rooms: int = 0
+    slots: int = 0
+    """ total slots of all hosted rooms, each one may connect a client later """
+    clients: int = 0
+    loop_lag: float = 0.0
+    """ seconds the event loop was late on the last report """
+    rss: int = 0
+    """ resident memory of the process in bytes, 0 if unknown """
+
+
+def get_hoster_load(contexts: typing.Iterable[WebHostContext], loop_lag: float) -> HosterLoad:
+    rooms = slots = clients = 0
+    for ctx in contexts:
+        rooms += 1
+        slots += len(ctx.slot_info)
+        clients += sum(len(slot_clients) for team in ctx.clients.values() for slot_clients in team.values())
+    return HosterLoad(rooms, slots, clients, loop_lag, get_rss())
+
+
+_rss_unknown_warned = False
+
+
+def get_rss() -> int:
+    """Resident memory of this process in bytes, from psutil or /proc, 0 if neither is available."""
+    global _rss_unknown_warned
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        pass
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    if not _rss_unknown_warned:
+        _rss_unknown_warned = True
+        logging.warning("Memory use of room hosters can't be measured, so HOSTER_MEMORY_LIMIT is not applied. "
+                        "Install psutil to measure it.")
+    return 0
+
+
+_game_data_packages: typing.OrderedDict[str, typing.Dict[str, typing.Any]] = collections.OrderedDict()
+""" { checksum: data package }, custom data packages shared by all rooms of this process """
+max_game_data_packages = 64
+
+
+def load_game_data_package(checksum: str) -> typing.Optional[typing.Dict[str, typing.Any]]:
+    """Returns the data package of a custom game from the database, reusing the copy of other rooms if possible.
+    The result is shared, so it may not be modified. Requires a db_session."""
+    data_package = _game_data_packages.get(checksum)
+    if data_package is None:
+        row = GameDataPackage.get(checksum=checksum)
+        if not row:
+            return None
+        data_package = _game_data_packages[checksum] = restricted_loads(row.data)
+        while len(_game_data_packages) > max_game_data_packages:
+            _game_data_packages.popitem(last=False)  # evict least recently used
+    else:
+        _game_data_packages.move_to_end(checksum)
+    return data_package
+
 
 def get_random_port():
     return random.randint(49152, 65535)
@@ -201,6 +455,13 @@ def get_static_server_data() -> dict:
     return data
 
 
+def get_recording_path(room_id: UUID) -> str:
+    """Where the commands of a run of a room listed in RECORD_ROOMS are recorded, see MultiServerReplay.py."""
+    import os
+    return os.path.join(Utils.user_path("logs"),
+                        f"{room_id}_{datetime.datetime.utcnow().strftime('%Y_%m_%d_%H_%M_%S')}.aplog")
+
+
 def set_up_logging(room_id) -> logging.Logger:
     import os
     # logger setup
@@ -223,7 +484,10 @@ def set_up_logging(room_id) -> logging.Logger:
 
 def run_server_process(name: str, ponyconfig: dict, static_server_data: dict,
                        cert_file: typing.Optional[str], cert_key_file: typing.Optional[str],
-                       host: str, rooms_to_run: multiprocessing.Queue, rooms_shutting_down: multiprocessing.Queue):
+                       host: str, rooms_to_run: multiprocessing.Queue, rooms_shutting_down: multiprocessing.Queue,
+                       command_interval: float = 0.5,
+                       load_reports: typing.Optional[multiprocessing.Queue] = None, load_report_interval: float = 5,
+                       progress_interval: float = 1.0, record_rooms: typing.AbstractSet[UUID] = frozenset()):
     Utils.init_logging(name)
     try:
         import resource
@@ -249,6 +513,16 @@ def run_server_process(name: str, ponyconfig: dict, static_server_data: dict,
     gc.collect()  # free intermediate objects used during setup
 
     loop = asyncio.get_event_loop()
+    command_dispatcher = DBCommandDispatcher(loop, command_interval)
+    progress_publisher = SlotProgressPublisher(loop, progress_interval)
+    contexts: typing.Dict[int, WebHostContext] = {}  # running rooms by id
+
+    async def report_load():
+        while True:
+            before = loop.time()
+            await asyncio.sleep(load_report_interval)
+            loop_lag = max(0.0, loop.time() - before - load_report_interval)
+            load_reports.put(get_hoster_load(contexts.values(), loop_lag))
 
     async def start_room(room_id):
         with Locker(f"RoomLocker {room_id}"):
@@ -257,6 +531,11 @@ def run_server_process(name: str, ponyconfig: dict, static_server_data: dict,
                 ctx = WebHostContext(static_server_data, logger)
                 ctx.load(room_id)
                 ctx.init_save()
+                if room_id in record_rooms:
+                    ctx.recorder = CommandRecorder(get_recording_path(room_id), ctx)
+                command_dispatcher.register(ctx)
+                progress_publisher.register(ctx)
+                contexts[room_id] = ctx
                 assert ctx.server is None
                 try:
                     ctx.server = websockets.serve(
@@ -308,6 +587,12 @@ def run_server_process(name: str, ponyconfig: dict, static_server_data: dict,
                     setattr(asyncio.current_task(), "save", None)
             finally:
                 try:
+                    if ctx.recorder:
+                        ctx.recorder.close(ctx)
+                    command_dispatcher.unregister(ctx)
+                    progress_publisher.unregister(ctx)
+                    if contexts.get(room_id) is ctx:
+                        del contexts[room_id]
                     ctx.save_dirty = False  # make sure the saving thread does not write to DB after final wakeup
                     ctx.exit_event.set()  # make sure the saving thread stops at some point
                     # NOTE: async saving should probably be an async task and could be merged with shutdown_task
@@ -345,6 +630,8 @@ def run_server_process(name: str, ponyconfig: dict, static_server_data: dict,
     starter = Starter()
     starter.daemon = True
     starter.start()
+    if load_reports:
+        loop.create_task(report_load())
     try:
         loop.run_forever()
     finally:
@@ -0,0 +1,39 @@
+"""Data packages as served by the api: json encoded and gzip compressed once, so requests only copy bytes.
+Their checksum identifies the content, which makes it a strong ETag that never needs revalidation."""
+from __future__ import annotations
+
+import gzip
+import json
+import typing
+
+from pony.orm import TransactionIntegrityError, commit
+
+from Utils import restricted_loads
+from .models import GameDataPackage, GameDataPackageJSON
+
+
+def compress_game_data(game_data: typing.Dict[str, typing.Any]) -> bytes:
+    # mtime=0 keeps the output identical for identical data packages
+    return gzip.compress(json.dumps(game_data, separators=(",", ":")).encode(), compresslevel=9, mtime=0)
+
+
+def store_game_data_json(checksum: str, game_data: typing.Dict[str, typing.Any]) -> GameDataPackageJSON:
+    return GameDataPackageJSON(checksum=checksum, data=compress_game_data(game_data))
+
+
+def get_game_data_json(checksum: str) -> typing.Optional[bytes]:
+    """Compressed json of a data package, encoded from the pickled GameDataPackage the first time if it was stored
+    before json was. Requires a db_session."""
+    row = GameDataPackageJSON.get(checksum=checksum)
+    if row:
+        return row.data
+    package = GameDataPackage.get(checksum=checksum)
+    if not package:
+        return None
+    data = compress_game_data(restricted_loads(package.data))
+    try:
+        GameDataPackageJSON(checksum=checksum, data=data)
+        commit()
+    except TransactionIntegrityError:
+        pass  # encoded by a concurrent request
+    return data
@@ -1,14 +1,14 @@
 import concurrent.futures
-import json
+import logging
 import os
-import pickle
 import random
 import tempfile
+import time
 import zipfile
 from collections import Counter
 from typing import Any, Dict, List, Optional, Union, Set
 
-from flask import flash, redirect, render_template, request, session, url_for
+from flask import abort, flash, redirect, render_template, request, session, url_for
 from pony.orm import commit, db_session
 
 from BaseClasses import get_seed, seeddigits
@@ -19,7 +19,8 @@ from WebHostLib import app
 from settings import ServerOptions, GeneratorOptions
 from worlds.alttp.EntranceRandomizer import parse_arguments
 from .check import get_yaml_data, roll_options
-from .models import Generation, STATE_ERROR, STATE_QUEUED, Seed, UUID
+from .jobs import JobProgress, cancel_generation, get_queue_status, queue_generation, set_error
+from .models import Generation, GenerationJob, STATE_ERROR, Seed, UUID
 from .upload import upload_zip_to_db
 
 
@@ -82,13 +83,8 @@ def start_generation(options: Dict[str, Union[dict, str]], meta: Dict[str, Any])
         flash(f"Sorry, generating of multiworlds is limited to {app.config['MAX_ROLL']} players. "
               f"If you have a larger group, please generate it yourself and upload it.")
     elif len(gen_options) >= app.config["JOB_THRESHOLD"]:
-        gen = Generation(
-            options=pickle.dumps({name: vars(options) for name, options in gen_options.items()}),
-            # convert to json compatible
-            meta=json.dumps(meta),
-            state=STATE_QUEUED,
-            owner=session["_id"])
-        commit()
+        gen = queue_generation({name: vars(options) for name, options in gen_options.items()}, meta,
+                               session["_id"], app.config)
 
         return redirect(url_for("wait_seed", seed=gen.id))
     else:
@@ -150,9 +146,18 @@ def gen_game(gen_options: dict, meta: Optional[Dict[str, Any]] = None, owner=Non
             erargs.name[player] = handle_name(erargs.name[player], player, name_counter)
         if len(set(erargs.name.values())) != len(erargs.name):
             raise Exception(f"Names have to be unique. Names: {Counter(erargs.name.values())}")
-        ERmain(erargs, seed, baked_server_options=meta["server_options"])
-
-        return upload_to_db(target.name, sid, owner, race)
+        progress = JobProgress(sid) if sid else None
+        start = time.perf_counter()
+        ERmain(erargs, seed, baked_server_options=meta["server_options"], on_phase=progress)
+        generation_time = time.perf_counter() - start
+        if progress:
+            progress("upload")
+
+        seed_id = upload_to_db(target.name, sid, owner, race, generation_time)
+        if progress:
+            logging.info(f"Generation {sid} phase timings: " +
+                         ", ".join(f"{phase} {seconds:.3f}s" for phase, seconds in progress.finish()))
+        return seed_id
     thread_pool = concurrent.futures.ThreadPoolExecutor(max_workers=1)
     thread = thread_pool.submit(task)
 
@@ -163,22 +168,15 @@ def gen_game(gen_options: dict, meta: Optional[Dict[str, Any]] = None, owner=Non
             with db_session:
                 gen = Generation.get(id=sid)
                 if gen is not None:
-                    gen.state = STATE_ERROR
-                    meta = json.loads(gen.meta)
-                    meta["error"] = (
-                            "Allowed time for Generation exceeded, please consider generating locally instead. " +
-                            e.__class__.__name__ + ": " + str(e))
-                    gen.meta = json.dumps(meta)
+                    set_error(gen, "Allowed time for Generation exceeded, please consider generating locally "
+                                   "instead. " + e.__class__.__name__ + ": " + str(e))
                     commit()
     except BaseException as e:
         if sid:
             with db_session:
                 gen = Generation.get(id=sid)
-                if gen is not None:
-                    gen.state = STATE_ERROR
-                    meta = json.loads(gen.meta)
-                    meta["error"] = (e.__class__.__name__ + ": " + str(e))
-                    gen.meta = json.dumps(meta)
+                if gen is not None and gen.state != STATE_ERROR:
+                    set_error(gen, e.__class__.__name__ + ": " + str(e))
                     commit()
         raise
 
@@ -195,16 +193,28 @@ def wait_seed(seed: UUID):
         return "Generation not found."
     elif generation.state == STATE_ERROR:
         return render_template("seedError.html", seed_error=generation.meta)
-    return render_template("waitSeed.html", seed_id=seed_id)
+    return render_template("waitSeed.html", seed_id=seed_id, status=get_queue_status(generation),
+                           can_cancel=generation.owner == session["_id"])
+
+
+@app.route('/wait/<suuid:seed>/cancel', methods=['POST'])
+def cancel_seed(seed: UUID):
+    generation = Generation.get(id=seed)
+    if not generation:
+        abort(404)
+    if generation.owner != session["_id"]:
+        abort(403)
+    cancel_generation(generation)
+    return redirect(url_for("wait_seed", seed=seed))
 
 
-def upload_to_db(folder, sid, owner, race):
+def upload_to_db(folder, sid, owner, race, generation_time: Optional[float] = None):
     for file in os.listdir(folder):
         file = os.path.join(folder, file)
         if file.endswith(".zip"):
             with db_session:
                 with zipfile.ZipFile(file) as zfile:
-                    res = upload_zip_to_db(zfile, owner, {"race": race}, sid)
+                    res = upload_zip_to_db(zfile, owner, {"race": race}, sid, generation_time)
                 if type(res) == "str":
                     raise Exception(res)
                 elif res:
@@ -212,5 +222,8 @@ def upload_to_db(folder, sid, owner, race):
                     gen = Generation.get(id=seed.id)
                     if gen is not None:
                         gen.delete()
+                    job = GenerationJob.get(id=seed.id)
+                    if job is not None:
+                        job.delete()
                     return seed.id
     raise Exception("Generation zipfile not found.")
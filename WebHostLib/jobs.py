@@ -0,0 +1,140 @@
+"""GenerationJob rows next to queued Generations: their priority class, the progress generators report from the phases
+of Main.main and cancellation. Scheduling itself is done by autolauncher.GenerationScheduler."""
+from __future__ import annotations
+
+import json
+import os
+import pickle
+import time
+import typing
+from datetime import datetime
+from uuid import UUID
+
+from pony.orm import commit, db_session, select
+
+from .models import Generation, GenerationJob, STATE_ERROR, STATE_QUEUED, STATE_STARTED
+
+PhaseTimings = typing.List[typing.Tuple[str, float]]
+
+
+class GenerationCancelled(Exception):
+    pass
+
+
+def get_priority_class(players: int, owner: UUID, config: typing.Mapping[str, typing.Any]) -> int:
+    """0 for owners in GENERATION_PRIORITY_OWNERS, otherwise the number of GENERATION_PRIORITY_PLAYERS thresholds
+    the player count exceeds, so small multiworlds get scheduled first."""
+    if str(owner) in config["GENERATION_PRIORITY_OWNERS"]:
+        return 0
+    return sum(players > threshold for threshold in config["GENERATION_PRIORITY_PLAYERS"])
+
+
+def queue_generation(options: typing.Dict[str, dict], meta: typing.Dict[str, typing.Any], owner: UUID,
+                     config: typing.Mapping[str, typing.Any]) -> Generation:
+    generation = Generation(options=pickle.dumps(options), meta=json.dumps(meta), state=STATE_QUEUED, owner=owner)
+    GenerationJob(id=generation.id, owner=owner, players=len(options),
+                  priority=get_priority_class(len(options), owner, config))
+    commit()
+    return generation
+
+
+def get_job(generation: Generation, config: typing.Mapping[str, typing.Any]) -> GenerationJob:
+    """The job of a generation, created for generations queued before jobs existed."""
+    job = GenerationJob.get(id=generation.id)
+    if job is None:
+        players = len(pickle.loads(generation.options))
+        job = GenerationJob(id=generation.id, owner=generation.owner, players=players,
+                            priority=get_priority_class(players, generation.owner, config))
+    return job
+
+
+def get_phases(job: GenerationJob) -> PhaseTimings:
+    return [(phase, seconds) for phase, seconds in json.loads(job.phases)] if job.phases else []
+
+
+def set_error(generation: Generation, error: str) -> None:
+    generation.state = STATE_ERROR
+    meta = json.loads(generation.meta)
+    meta["error"] = error
+    generation.meta = json.dumps(meta)
+
+
+def cancel_generation(generation: Generation) -> bool:
+    """Cancels a queued or running generation. Running ones stop at their next phase, or get their generator
+    process killed by autogen. Returns False if it already failed."""
+    if generation.state == STATE_ERROR:
+        return False
+    job = GenerationJob.get_for_update(id=generation.id)
+    if job:
+        job.cancelled = True
+    if generation.state == STATE_QUEUED or not job:
+        set_error(generation, "Generation was cancelled.")
+    return True
+
+
+class JobProgress:
+    """Passed to Main.main as on_phase by the generator process. Writes the current phase and the timings of the
+    previous ones to the job, and stops generation if the job got cancelled."""
+
+    def __init__(self, generation_id: UUID):
+        self.generation_id = generation_id
+        self.phases: PhaseTimings = []
+        self.phase: typing.Optional[str] = None
+        self.phase_start = time.perf_counter()
+
+    def __call__(self, phase: typing.Optional[str]) -> None:
+        now = time.perf_counter()
+        if self.phase:
+            self.phases.append((self.phase, round(now - self.phase_start, 3)))
+        self.phase, self.phase_start = phase, now
+        with db_session:
+            job = GenerationJob.get(id=self.generation_id)
+            if job is None:
+                return
+            if job.cancelled:
+                raise GenerationCancelled("Generation was cancelled.")
+            job.phase = phase or ""
+            job.phases = json.dumps(self.phases)
+            job.pid = os.getpid()
+
+    def finish(self) -> PhaseTimings:
+        """Records the end of the last phase, returning the timings of all of them."""
+        self(None)
+        return self.phases
+
+
+def get_queue_status(generation: Generation) -> typing.Dict[str, typing.Any]:
+    """Position in the queue or current phase of a generation, for the waiting page and status api."""
+    job = GenerationJob.get(id=generation.id)
+    if job is None:
+        return {}
+    if generation.state == STATE_STARTED:
+        return {"phase": job.phase or "starting", "phases": get_phases(job)}
+    ahead = select(other for other in GenerationJob for queued in Generation
+                   if queued.id == other.id and queued.state == STATE_QUEUED and
+                   (other.priority < job.priority or other.priority == job.priority and other.queued < job.queued)
+                   ).count()
+    return {"queue_position": ahead + 1}
+
+
+def get_queue_summary() -> typing.Dict[str, typing.Any]:
+    """Queue depth per priority class and the progress of running generations."""
+    now = datetime.utcnow()
+    queued: typing.Dict[int, int] = {}
+    running = []
+    jobs = select((job, generation.state) for job in GenerationJob for generation in Generation
+                  if generation.id == job.id and generation.state != STATE_ERROR)
+    for job, state in jobs.order_by(lambda job, state: job.queued):
+        if state == STATE_QUEUED:
+            queued[job.priority] = queued.get(job.priority, 0) + 1
+        else:
+            running.append({
+                "players": job.players,
+                "priority": job.priority,
+                "waited": round(((job.started or now) - job.queued).total_seconds(), 3),
+                "running": round((now - job.started).total_seconds(), 3) if job.started else 0,
+                "phase": job.phase,
+                "phases": get_phases(job),
+                "cancelled": job.cancelled,
+            })
+    return {"queued": sum(queued.values()), "queued_by_priority": queued, "running": running}
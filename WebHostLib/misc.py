@@ -9,6 +9,7 @@ from pony.orm import count, commit, db_session
 from worlds.AutoWorld import AutoWorldRegister
 from . import app, cache
 from .models import Seed, Room, Command, UUID, uuid4
+from .stats_rollup import record_activity, record_room
 
 
 def get_world_theme(game_name: str):
@@ -93,6 +94,7 @@ def new_room(seed: UUID):
     if not seed:
         abort(404)
     room = Room(seed=seed, owner=session["_id"], tracker=uuid4())
+    record_room(room)
     commit()
     return redirect(url_for("host_room", room=room.id))
 
@@ -157,6 +159,7 @@ def host_room(room: UUID):
     should_refresh = ((not room.last_port and now - room.creation_time < datetime.timedelta(seconds=3))
                       or room.last_activity < now - datetime.timedelta(seconds=room.timeout))
     with db_session:
+        record_activity(room, room.last_activity, now)
         room.last_activity = now  # will trigger a spinup, if it's not already running
 
     browser_tokens = "Mozilla", "Chrome", "Safari"
@@ -1,4 +1,4 @@
-from datetime import datetime
+from datetime import date, datetime
 from uuid import UUID, uuid4
 from pony.orm import Database, PrimaryKey, Required, Set, Optional, buffer, LongStr
 
@@ -20,12 +20,15 @@ class Slot(db.Entity):
 
 class Room(db.Entity):
     id = PrimaryKey(UUID, default=uuid4)
-    last_activity = Required(datetime, default=lambda: datetime.utcnow(), index=True)
+    # written by rooms and web requests alike, the newer write wins instead of failing the transaction
+    last_activity = Required(datetime, default=lambda: datetime.utcnow(), index=True, optimistic=False)
     creation_time = Required(datetime, default=lambda: datetime.utcnow(), index=True)  # index used by landing page
     owner = Required(UUID, index=True)
     commands = Set('Command')
+    progress = Set('SlotProgress')
     seed = Required('Seed', index=True)
-    multisave = Optional(buffer, lazy=True)
+    multisave = Optional(buffer, lazy=True)  # only rooms that did not save since RoomSave was introduced
+    save_data = Optional('RoomSave', cascade_delete=True)
     show_spoiler = Required(int, default=0)  # 0 -> never, 1 -> after completion, -> 2 always
     timeout = Required(int, default=lambda: 2 * 60 * 60)  # seconds since last activity to shutdown
     tracker = Optional(UUID, index=True)
@@ -44,12 +47,37 @@ class Seed(db.Entity):
     meta = Required(LongStr, default=lambda: "{\"race\": false}")  # additional meta information/tags
 
 
+class RoomSave(db.Entity):
+    """Multisave of a room, compressed and kept out of the Room table, see room_storage.py."""
+    room = PrimaryKey(Room)
+    data = Required(bytes)  # zlib compressed pickle
+    size = Required(int)  # uncompressed bytes
+    updated = Required(datetime, default=lambda: datetime.utcnow())
+
+
 class Command(db.Entity):
     id = PrimaryKey(int, auto=True)
     room = Required(Room)
     commandtext = Required(str)
 
 
+class SlotProgress(db.Entity):
+    """Tracker relevant state of a slot, written by the room while it is hosted. See progress.py for the formats."""
+    room = Required(Room)
+    team = Required(int)
+    slot = Required(int)
+    PrimaryKey(room, team, slot)
+    checked = Optional(bytes)
+    received = Optional(bytes)
+    received_count = Required(int, default=0)
+    hints = Optional(bytes)
+    status = Required(int, default=0)
+    last_activity = Optional(float)
+    alias = Optional(str, nullable=True)
+    video = Optional(str, nullable=True)
+    updated = Required(datetime, default=lambda: datetime.utcnow())
+
+
 class Generation(db.Entity):
     id = PrimaryKey(UUID, default=uuid4)
     owner = Required(UUID)
@@ -58,6 +86,39 @@ class Generation(db.Entity):
     state = Required(int, default=0, index=True)
 
 
+class GenerationJob(db.Entity):
+    """Scheduling and progress of a Generation, see autolauncher.GenerationScheduler. Shares the Generation's id."""
+    id = PrimaryKey(UUID)
+    owner = Required(UUID, index=True)
+    players = Required(int)
+    priority = Required(int, default=0)  # priority class, 0 is scheduled first
+    queued = Required(datetime, default=lambda: datetime.utcnow())
+    started = Optional(datetime)
+    phase = Optional(str)  # phase of Main.main currently running
+    phases = Optional(LongStr)  # json list of [phase, seconds] of the phases already completed
+    pid = Optional(int)  # of the generator process running the job
+    cancelled = Required(bool, default=False)
+
+
 class GameDataPackage(db.Entity):
     checksum = PrimaryKey(str)
     data = Required(bytes)
+
+
+class GameDataPackageJSON(db.Entity):
+    """A GameDataPackage as served to clients, see game_data.py."""
+    checksum = PrimaryKey(str)
+    data = Required(bytes)  # gzip compressed json
+
+
+class GameStatistics(db.Entity):
+    """Counts of a game on a single day, rolled up as things happen for the stats page. See stats_rollup.py."""
+    day = Required(date)
+    game = Required(str)
+    PrimaryKey(day, game)
+    seeds = Required(int, default=0)  # seeds created with the game in them
+    generations = Required(int, default=0)  # of those, generated by the WebHost
+    generation_time = Required(float, default=0)  # seconds spent on those generations
+    rooms = Required(int, default=0)  # rooms created for seeds with the game in them
+    players = Required(int, default=0)  # slots of the game in those rooms
+    active_rooms = Required(int, default=0)  # rooms with the game in them that saw activity
@@ -0,0 +1,84 @@
+"""Compact per-slot progress records, published by running rooms to the SlotProgress table and read by the trackers,
+so those don't have to decode a room's whole multisave."""
+from __future__ import annotations
+
+import array
+import pickle
+import sys
+import typing
+
+from NetUtils import Hint, NetworkItem
+from Utils import restricted_loads
+
+
+class ProgressRecord(typing.NamedTuple):
+    team: int
+    slot: int
+    checked: bytes
+    """ bitset over the slot's location ids in ascending order, see encode_checked """
+    received: bytes
+    """ packed NetworkItems, see encode_received """
+    received_count: int
+    hints: bytes
+    status: int
+    last_activity: typing.Optional[float]
+    """ POSIX timestamp of the last check """
+    alias: typing.Optional[str]
+    video: typing.Optional[str]
+    """ "platform/user" of a registered video stream """
+
+
+def encode_checked(locations: typing.Iterable[int], checked: typing.AbstractSet[int]) -> bytes:
+    """Bitset of checked, with bit n being the n-th lowest of the slot's locations."""
+    sorted_locations = sorted(locations)
+    data = bytearray((len(sorted_locations) + 7) // 8)
+    for index, location in enumerate(sorted_locations):
+        if location in checked:
+            data[index >> 3] |= 1 << (index & 7)
+    return bytes(data)
+
+
+def decode_checked(locations: typing.Iterable[int], data: bytes) -> typing.Set[int]:
+    sorted_locations = sorted(locations)
+    checked = set()
+    for byte_index, byte in enumerate(data):
+        if byte:
+            for bit in range(8):
+                if byte & (1 << bit):
+                    checked.add(sorted_locations[byte_index * 8 + bit])
+    return checked
+
+
+def encode_received(items: typing.Sequence[NetworkItem]) -> bytes:
+    """Items as little endian 64 bit integers, four per item."""
+    packed = array.array("q", (value for item in items for value in item))
+    if sys.byteorder == "big":
+        packed.byteswap()
+    return packed.tobytes()
+
+
+def decode_received(data: bytes) -> typing.List[NetworkItem]:
+    packed = array.array("q")
+    packed.frombytes(data)
+    if sys.byteorder == "big":
+        packed.byteswap()
+    return [NetworkItem(*packed[index:index + 4]) for index in range(0, len(packed), 4)]
+
+
+def encode_hints(hints: typing.AbstractSet[Hint]) -> bytes:
+    return pickle.dumps(tuple(hints))
+
+
+def decode_hints(data: bytes) -> typing.Set[Hint]:
+    return set(restricted_loads(data)) if data else set()
+
+
+def encode_video(video: typing.Optional[typing.Tuple[str, str]]) -> typing.Optional[str]:
+    return f"{video[0]}/{video[1]}" if video else None
+
+
+def decode_video(data: typing.Optional[str]) -> typing.Optional[typing.Tuple[str, str]]:
+    if not data:
+        return None
+    platform, user = data.split("/", 1)
+    return platform, user
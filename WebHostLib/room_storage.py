@@ -0,0 +1,84 @@
+"""Access to room state that keeps the hot paths off the large columns.
+
+Multisaves are stored compressed in RoomSave, apart from the Room rows that autohost and the trackers query constantly.
+Compressed saves stay small enough for Postgres to keep them in few TOAST chunks, and updating a room's activity no
+longer rewrites a row holding its save. Activity of many rooms is written in one transaction, and autohost only reads
+the columns it schedules by."""
+from __future__ import annotations
+
+import pickle
+import typing
+import zlib
+from datetime import datetime
+from uuid import UUID
+
+from pony.orm import select
+
+from Utils import restricted_loads
+from .models import Room, RoomSave
+from .stats_rollup import record_activity
+
+compression_level = 6
+""" zlib level of stored saves, higher levels gain little on pickled saves but take a lot longer """
+
+
+class RoomActivity(typing.NamedTuple):
+    id: UUID
+    last_activity: datetime
+    timeout: int
+
+
+def load_room_save(room: Room) -> typing.Tuple[typing.Optional[typing.Dict[str, typing.Any]], int]:
+    """The decoded save of a room and its uncompressed size, or None and 0 if it never saved.
+    Rooms that did not save since RoomSave was introduced are read from their Room.multisave."""
+    save = RoomSave.get(room=room)
+    if save:
+        return restricted_loads(zlib.decompress(save.data)), save.size
+    multisave = room.multisave
+    if multisave:
+        return restricted_loads(multisave), len(multisave)
+    return None, 0
+
+
+def get_room_save_updated(room: Room) -> typing.Optional[datetime]:
+    """When the save of a room was last written, without loading it, or None if it was not since RoomSave was
+    introduced."""
+    return select(save.updated for save in RoomSave if save.room == room).first()
+
+
+def store_room_save(room: Room, save: typing.Dict[str, typing.Any]) -> int:
+    """Writes the save of a room, moving it out of Room.multisave if it was still stored there.
+    Returns the compressed size."""
+    data = pickle.dumps(save)
+    compressed = zlib.compress(data, compression_level)
+    row = RoomSave.get(room=room)
+    if row:
+        row.set(data=compressed, size=len(data), updated=datetime.utcnow())
+    else:
+        RoomSave(room=room, data=compressed, size=len(data))
+        if room.multisave is not None:
+            room.multisave = None
+    return len(compressed)
+
+
+def update_room_activity(activity: typing.Mapping[UUID, datetime]) -> int:
+    """Sets the last activity of many rooms with one select in one transaction, counting it for the daily statistics.
+    Activity only ever moves forward, so late writes can't make a room look idle. Returns the updated room count.
+    Requires a db_session."""
+    if not activity:
+        return 0
+    room_ids = list(activity)
+    updated = 0
+    for room in select(room for room in Room if room.id in room_ids):
+        now = activity[room.id]
+        if room.last_activity < now:
+            record_activity(room, room.last_activity, now)
+            room.last_activity = now
+            updated += 1
+    return updated
+
+
+def get_active_rooms(since: datetime) -> typing.List[RoomActivity]:
+    """Rooms with activity since the given time, reading only the columns needed to tell if they should run."""
+    return [RoomActivity(*row) for row in select((room.id, room.last_activity, room.timeout) for room in Room
+                                                 if room.last_activity >= since)]
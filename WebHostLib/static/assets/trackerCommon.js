@@ -32,6 +32,107 @@ const secondsToHours = (seconds) => {
     return `${hours}:${minutes}`;
 };
 
+const statusNames = {
+    0: "Disconnected",
+    5: "Connected",
+    10: "Ready",
+    20: "Playing",
+    30: "Goal Completed",
+};
+
+const escapeHtml = (text) => $('<div></div>').text(text).html();
+
+const formatPercentage = (done, total) => (total ? (done / total * 100).toFixed(2) : "100.00");
+
+/**
+ * Apply a progress event of a slot, as sent by the tracker's event stream, to the tables of the page.
+ * @param {HTMLElement} wrapper the #tracker-wrapper element
+ * @param {Object} delta
+ */
+const applyProgress = (wrapper, delta) => {
+    const slotKey = `${delta.team}-${delta.slot}`;
+
+    // multiworld tracker, one row per slot
+    $(`table#checks-table[data-team="${delta.team}"]`).each(function () {
+        const table = $(this).DataTable();
+        const row = table.row(`[data-slot="${slotKey}"]`);
+        if (!row.any())
+            return;
+        const node = row.node();
+        node.dataset.status = delta.status;
+        node.dataset.checksDone = delta.checks_done;
+        table.cell(node.querySelector('.slot-status')).data(statusNames[delta.status] || "Unknown State");
+        const checks = node.querySelector('.slot-checks');
+        checks.innerText = `${delta.checks_done}/${delta.checks_total}`;
+        checks.dataset.sort = delta.checks_done;
+        table.cell(checks).invalidate('dom');
+        table.cell(node.querySelector('.slot-percentage')).data(
+            formatPercentage(delta.checks_done, delta.checks_total));
+        table.cell(node.querySelector('.slot-activity')).data(
+            delta.last_activity === null ? "None" : delta.last_activity);
+
+        const rows = table.rows().nodes().toArray();
+        const done = rows.reduce((sum, slotRow) => sum + parseInt(slotRow.dataset.checksDone), 0);
+        const total = rows.reduce((sum, slotRow) => sum + parseInt(slotRow.dataset.checksTotal), 0);
+        const completed = rows.filter((slotRow) => parseInt(slotRow.dataset.status) === 30).length;
+        $(this).find('tfoot .team-completed').text(`${completed}/${rows.length} Complete`);
+        $(this).find('tfoot .team-checks').text(`${done}/${total}`);
+        $(this).find('tfoot .team-percentage').text(total ? formatPercentage(done, total) : "100");
+    });
+
+    // player tracker, details of its own slot
+    if (delta.checked) {
+        const locations = $('#locations-table').DataTable();
+        delta.checked.forEach((location) => {
+            const row = locations.row(`[data-location="${location}"]`);
+            if (row.any())
+                locations.cell(row.node().cells[1]).data("✔");
+        });
+    }
+    if (delta.received) {
+        const received = $('#received-table').DataTable();
+        delta.received.forEach((entry) => {
+            if (entry.index < parseInt(wrapper.dataset.receivedCount))
+                return;
+            wrapper.dataset.receivedCount = entry.index + 1;
+            const row = received.row(`[data-item="${entry.item}"]`);
+            if (row.any()) {
+                const cells = row.node().cells;
+                received.cell(cells[1]).data(parseInt(received.cell(cells[1]).data()) + 1);
+                received.cell(cells[2]).data(entry.order);
+            } else {
+                received.row.add([escapeHtml(entry.name), 1, entry.order]).node().dataset.item = entry.item;
+            }
+        });
+    }
+
+    if (delta.hints && !(wrapper.dataset.player && delta.hints_digest === parseInt(wrapper.dataset.hintsDigest))) {
+        if (wrapper.dataset.player)
+            wrapper.dataset.hintsDigest = delta.hints_digest;
+        $(`table#hints-table[data-team="${delta.team}"]`).each(function () {
+            const table = $(this).DataTable();
+            delta.hints.forEach((hint) => {
+                const cells = hint.cells.map(escapeHtml);
+                if (wrapper.dataset.player) {
+                    // on a player tracker, the player is highlighted and everyone else links to their tracker
+                    [hint.finding_player, hint.receiving_player].forEach((player, index) => {
+                        cells[index] = (player === parseInt(wrapper.dataset.player)) ? `<b>${cells[index]}</b>` :
+                            `<a href="${wrapper.dataset.trackerUrl}/${delta.team}/${player}">${cells[index]}</a>`;
+                    });
+                }
+                const row = table.row(`[data-hint="${hint.finding_player}-${hint.location}"]`);
+                if (row.any()) {
+                    row.data(cells);
+                } else {
+                    const node = table.row.add(cells).node();
+                    node.dataset.hint = `${hint.finding_player}-${hint.location}`;
+                    node.cells[6].classList.add('center-column');
+                }
+            });
+        });
+    }
+};
+
 window.addEventListener('load', () => {
     const tables = $(".table").DataTable({
         paging: false,
@@ -133,6 +234,7 @@ window.addEventListener('load', () => {
     }
 
     let update_on_view = false;
+    let streaming = false;
     const update = () => {
         if (document.hidden) {
             console.log("Document reporting as not visible, not updating Tracker...");
@@ -165,10 +267,32 @@ window.addEventListener('load', () => {
                 }
             })
         }
-        updater = setTimeout(update, getSleepTimeSeconds() * 1000);
+        if (!streaming)
+            updater = setTimeout(update, getSleepTimeSeconds() * 1000);
     }
     let updater = setTimeout(update, getSleepTimeSeconds() * 1000);
 
+    const wrapper = document.getElementById('tracker-wrapper');
+    if (wrapper.dataset.events && window.EventSource) {
+        // While progress events stream in, they are applied to the tables in place instead of reloading the page.
+        const events = new EventSource(`${wrapper.dataset.events}?since=${wrapper.dataset.eventId}`);
+        events.addEventListener('open', () => {
+            streaming = true;
+            clearTimeout(updater);
+        });
+        events.addEventListener('error', () => {
+            if (events.readyState === EventSource.CLOSED && streaming) {
+                console.log("Tracker events are unavailable, falling back to periodic updates.");
+                streaming = false;
+                updater = setTimeout(update, getSleepTimeSeconds() * 1000);
+            }
+        });
+        events.addEventListener('progress', (event) => {
+            JSON.parse(event.data).forEach((delta) => applyProgress(wrapper, delta));
+            tables.draw(false);
+        });
+    }
+
     window.addEventListener('resize', () => {
         adjustTableHeight();
         tables.draw();
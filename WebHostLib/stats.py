@@ -9,11 +9,12 @@ from bokeh.embed import components
 from bokeh.models import HoverTool
 from bokeh.plotting import figure, ColumnDataSource
 from bokeh.resources import INLINE
+import click
 from flask import render_template
-from pony.orm import select
+from pony.orm import db_session
 
 from . import app, cache
-from .models import Room
+from .stats_rollup import backfill, get_statistics
 
 PLOT_WIDTH = 600
 
@@ -23,12 +24,10 @@ def get_db_data(known_games: typing.Set[str]) -> typing.Tuple[typing.Counter[str
     games_played = defaultdict(Counter)
     total_games = Counter()
     cutoff = date.today() - timedelta(days=30)
-    room: Room
-    for room in select(room for room in Room if room.creation_time >= cutoff):
-        for slot in room.seed.slots:
-            if slot.game in known_games:
-                total_games[slot.game] += 1
-                games_played[room.creation_time.date()][slot.game] += 1
+    for statistics in get_statistics(cutoff):
+        if statistics.game in known_games and statistics.players:
+            total_games[statistics.game] += statistics.players
+            games_played[statistics.day][statistics.game] += statistics.players
     return total_games, games_played
 
 
@@ -129,3 +128,14 @@ def stats():
     script, charts = components((plot, pie, *per_game_charts))
     return render_template("stats.html", js_resources=INLINE.render_js(), css_resources=INLINE.render_css(),
                            chart_data=script, charts=charts)
+
+
+@app.cli.command("backfill-stats")
+@click.option("--start", type=click.DateTime(["%Y-%m-%d"]), help="First day to rebuild, defaults to the first seed.")
+@click.option("--end", type=click.DateTime(["%Y-%m-%d"]),
+              help="Day to stop before, defaults to the first day that already has statistics.")
+def backfill_stats(start: typing.Optional[datetime], end: typing.Optional[datetime]):
+    """Rebuild the daily game statistics of the stats page from the seeds and rooms in the database."""
+    with db_session:
+        rows = backfill(start.date() if start else None, end.date() if end else None)
+    click.echo(f"Wrote {rows} rows of game statistics.")
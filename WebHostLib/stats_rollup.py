@@ -0,0 +1,126 @@
+"""Keeps the daily per-game GameStatistics rows up to date, so the stats page never has to look at seeds and rooms.
+
+Rows are incremented within the transaction of whatever created the seed or room, or saw the activity.
+backfill rebuilds days from the seeds and rooms still in the database, for history from before rollups existed."""
+from __future__ import annotations
+
+import typing
+from collections import Counter
+from datetime import date, datetime, timedelta
+
+from pony.orm import count, select
+
+from .models import GameStatistics, Room, Seed, Slot, db
+
+StatisticsKey = typing.Tuple[date, str]
+
+
+_counts = ("seeds", "generations", "generation_time", "rooms", "players", "active_rooms")
+
+
+def _increment(day: date, game: str, **amounts: typing.Union[int, float]) -> None:
+    """Adds amounts to the row of day and game in one upsert, as two transactions creating the same row would both
+    insert it otherwise. Rows already loaded in the db_session don't see the change."""
+    quote = db.provider.quote_name
+    table = quote(GameStatistics._table_)
+    columns = {field: quote(getattr(GameStatistics, field).column) for field in _counts}
+    parameters = {f"amount_{field}": amounts.pop(field, 0) for field in _counts}
+    assert not amounts, f"unknown counts {list(amounts)}"
+    parameters["day"] = GameStatistics.day.converters[0].py2sql(day)
+    parameters["game"] = game
+    updates = ", ".join(f"{column} = {table}.{column} + excluded.{column}" for column in columns.values())
+    db.execute(f"INSERT INTO {table} ({quote(GameStatistics.day.column)}, {quote(GameStatistics.game.column)}, "
+               f"{', '.join(columns.values())}) "
+               f"VALUES ($day, $game, {', '.join(f'$amount_{field}' for field in _counts)}) "
+               f"ON CONFLICT ({quote(GameStatistics.day.column)}, {quote(GameStatistics.game.column)}) "
+               f"DO UPDATE SET {updates}", {}, parameters)
+
+
+def _game_slot_counts(seed: Seed) -> typing.Counter[str]:
+    return Counter(slot.game for slot in seed.slots)
+
+
+def record_seed(seed: Seed, generation_time: typing.Optional[float] = None) -> None:
+    """Counts a newly created seed. generation_time is given for seeds the WebHost generated itself."""
+    for game in _game_slot_counts(seed):
+        if generation_time is None:
+            _increment(seed.creation_time.date(), game, seeds=1)
+        else:
+            _increment(seed.creation_time.date(), game, seeds=1, generations=1, generation_time=generation_time)
+
+
+def record_room(room: Room) -> None:
+    """Counts a newly created room and its players. Creating a room counts as its activity for the day."""
+    for game, players in _game_slot_counts(room.seed).items():
+        _increment(room.creation_time.date(), game, rooms=1, players=players, active_rooms=1)
+
+
+def record_activity(room: Room, previous_activity: datetime, activity: datetime) -> None:
+    """Counts the room as active on the day of activity, unless its previous activity already was on that day."""
+    if previous_activity.date() != activity.date():
+        for game in _game_slot_counts(room.seed):
+            _increment(activity.date(), game, active_rooms=1)
+
+
+def get_statistics(start: date, end: typing.Optional[date] = None) -> typing.List[GameStatistics]:
+    """All rows from start, up to but not including end."""
+    query = select(statistics for statistics in GameStatistics if statistics.day >= start)
+    if end:
+        query = query.filter(lambda statistics: statistics.day < end)
+    return list(query.order_by(GameStatistics.day))
+
+
+def _day_start(day: date) -> datetime:
+    return datetime.combine(day, datetime.min.time())
+
+
+def _count_by_day(query) -> typing.Dict[StatisticsKey, int]:
+    return {(date(year, month, day), game): amount for year, month, day, game, amount in query}
+
+
+def backfill(start: typing.Optional[date] = None, end: typing.Optional[date] = None) -> int:
+    """Rebuilds the rows of the days from start up to end from the seeds and rooms in the database.
+    Defaults to everything before the first day that already has rows, or before tomorrow if there are none.
+    Generation times aren't stored anywhere else, and rooms only remember their last activity,
+    so those counts are incomplete for backfilled days. Returns the number of rows written."""
+    if end is None:
+        first_day = select(statistics.day for statistics in GameStatistics).min()
+        end = first_day if first_day else date.today() + timedelta(days=1)
+    if start is None:
+        first_seed = select(seed.creation_time for seed in Seed).min()
+        start = first_seed.date() if first_seed else end
+    if start >= end:
+        return 0
+    after, before = _day_start(start), _day_start(end)
+
+    seeds = _count_by_day(select(
+        (seed.creation_time.year, seed.creation_time.month, seed.creation_time.day, slot.game,
+         count(seed, distinct=True))
+        for seed in Seed for slot in Slot
+        if slot.seed == seed and seed.creation_time >= after and seed.creation_time < before))
+    rooms = _count_by_day(select(
+        (room.creation_time.year, room.creation_time.month, room.creation_time.day, slot.game,
+         count(room, distinct=True))
+        for room in Room for slot in Slot
+        if slot.seed == room.seed and room.creation_time >= after and room.creation_time < before))
+    players = _count_by_day(select(
+        (room.creation_time.year, room.creation_time.month, room.creation_time.day, slot.game, count(slot))
+        for room in Room for slot in Slot
+        if slot.seed == room.seed and room.creation_time >= after and room.creation_time < before))
+    # a room's last activity is the only other day it is known to have been active on
+    later_activity = _count_by_day(select(
+        (room.last_activity.year, room.last_activity.month, room.last_activity.day, slot.game,
+         count(room, distinct=True))
+        for room in Room for slot in Slot
+        if slot.seed == room.seed and room.last_activity >= after and room.last_activity < before
+        and (room.last_activity.year != room.creation_time.year or room.last_activity.month !=
+             room.creation_time.month or room.last_activity.day != room.creation_time.day)))
+
+    select(statistics for statistics in GameStatistics if statistics.day >= start and statistics.day < end).delete(
+        bulk=True)
+    keys = seeds.keys() | rooms.keys() | later_activity.keys()
+    for day, game in keys:
+        GameStatistics(day=day, game=game, seeds=seeds.get((day, game), 0), rooms=rooms.get((day, game), 0),
+                       players=players.get((day, game), 0),
+                       active_rooms=rooms.get((day, game), 0) + later_activity.get((day, game), 0))
+    return len(keys)
@@ -1,23 +1,29 @@
 import datetime
 import collections
+import json
+import threading
+import time
+import zlib
 from dataclasses import dataclass
 from typing import Any, Callable, Dict, List, Optional, Set, Tuple, NamedTuple, Counter
 from uuid import UUID
 from email.utils import parsedate_to_datetime
 
-from flask import render_template, make_response, Response, request
+from flask import jsonify, render_template, make_response, Response, request
+from pony.orm import db_session
 from werkzeug.exceptions import abort
 
 from MultiServer import Context, get_saving_second
 from NetUtils import ClientStatus, Hint, NetworkItem, NetworkSlot, SlotType
 from Utils import restricted_loads, KeyedDefaultDict
 from . import app, cache
-from .models import GameDataPackage, Room
+from .models import GameDataPackage, Room, SlotProgress
+from .progress import decode_checked, decode_hints, decode_received, decode_video
+from .room_storage import get_room_save_updated, load_room_save
 
 # Multisave is currently updated, at most, every minute.
 TRACKER_CACHE_TIMEOUT_IN_SECONDS = 60
 
-_multidata_cache = {}
 _multiworld_trackers: Dict[str, Callable] = {}
 _player_trackers: Dict[str, Callable] = {}
 
@@ -25,6 +31,94 @@ TeamPlayer = Tuple[int, int]
 ItemMetadata = Tuple[int, int, int]
 
 
+class _DecodedDataCache:
+    """Process-wide LRU cache of decoded database blobs, shared by all TrackerData instances.
+    Bounded by the estimated memory use of its entries, see TRACKER_DATA_CACHE_SIZE."""
+    blob_memory_factor = 10
+    """ rough ratio of memory used by the decoded objects to the size of the compressed blob """
+
+    def __init__(self) -> None:
+        self._entries: "collections.OrderedDict[Tuple[str, Any], Tuple[Any, Any, int]]" = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self.size = 0
+
+    def get(self, kind: str, key: Any, version: Any, load: Callable[[], Tuple[Any, int]]) -> Any:
+        """Returns the cached value of (kind, key) if it was stored with the same version,
+        otherwise calls load, which returns the value and the size of the blob it was decoded from."""
+        with self._lock:
+            entry = self._entries.get((kind, key))
+            if entry and entry[1] == version:
+                self._entries.move_to_end((kind, key))
+                return entry[0]
+        value, blob_size = load()
+        size = blob_size * self.blob_memory_factor
+        with self._lock:
+            old = self._entries.pop((kind, key), None)
+            if old:
+                self.size -= old[2]
+            self._entries[kind, key] = value, version, size
+            self.size += size
+            while self.size > app.config["TRACKER_DATA_CACHE_SIZE"] and len(self._entries) > 1:
+                self.size -= self._entries.popitem(last=False)[1][2]  # evict least recently used
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+
+_decoded_data_cache = _DecodedDataCache()
+
+
+def _load_multidata(room: Room) -> Dict[str, Any]:
+    """Decoded multidata of the room's seed. Never changes, so it is cached by seed. Do not modify."""
+    def load() -> Tuple[Dict[str, Any], int]:
+        multidata = room.seed.multidata
+        return Context.decompress(multidata), len(multidata)
+
+    return _decoded_data_cache.get("multidata", room.seed.id, None, load)
+
+
+def _load_progress(room: Room) -> Dict[TeamPlayer, SlotProgress]:
+    """Progress rows the room published while hosted, empty if it was not hosted since they were introduced."""
+    return {(row.team, row.slot): row for row in SlotProgress.select(lambda row: row.room == room)}
+
+
+def _load_multisave(room: Room) -> Dict[str, Any]:
+    """Decoded multisave of the room, only reloaded when the room saved since. Do not modify."""
+    def load() -> Tuple[Dict[str, Any], int]:
+        multisave, size = load_room_save(room)
+        return multisave or {}, size
+
+    # every write of the multisave sets its updated time, while the room's activity is only published later, if at all
+    return _decoded_data_cache.get("multisave", room.id, get_room_save_updated(room), load)
+
+
+class _GameNames(NamedTuple):
+    item_id_to_name: Dict[int, str]
+    location_id_to_name: Dict[int, str]
+    item_name_to_id: Dict[str, int]
+    location_name_to_id: Dict[str, int]
+
+
+def _load_game_names(checksum: str) -> _GameNames:
+    """Lookup tables of a GameDataPackage. Content is identified by its checksum, so they are cached by it."""
+    def load() -> Tuple[_GameNames, int]:
+        data = GameDataPackage.get(checksum=checksum).data
+        game_package = restricted_loads(data)
+        return _GameNames(
+            KeyedDefaultDict(lambda code: f"Unknown Item (ID: {code})", {
+                id: name for name, id in game_package["item_name_to_id"].items()}),
+            KeyedDefaultDict(lambda code: f"Unknown Location (ID: {code})", {
+                id: name for name, id in game_package["location_name_to_id"].items()}),
+            game_package["item_name_to_id"],
+            game_package["location_name_to_id"],
+        ), len(data)
+
+    return _decoded_data_cache.get("game_names", checksum, None, load)
+
+
 def _cache_results(func: Callable) -> Callable:
     """Stores the results of any computationally expensive methods after the initial call in TrackerData.
     If called again, returns the cached result instead, as results will not change for the lifetime of TrackerData.
@@ -47,17 +141,21 @@ class TrackerData:
 
     Provides helper methods to lazily load necessary data that each tracker require and caches any results so any
     subsequent helper method calls do not need to recompute results during the lifetime of this instance.
+    The decoded multidata is shared with other instances through _decoded_data_cache. Progress is read from the
+    SlotProgress rows published by the room, falling back to the multisave for rooms that have none yet.
     """
     room: Room
     _multidata: Dict[str, Any]
+    _progress: Dict[TeamPlayer, SlotProgress]
     _multisave: Dict[str, Any]
     _tracker_cache: Dict[str, Any]
 
     def __init__(self, room: Room):
         """Initialize a new RoomMultidata object for the current room."""
         self.room = room
-        self._multidata = Context.decompress(room.seed.multidata)
-        self._multisave = restricted_loads(room.multisave) if room.multisave else {}
+        self._multidata = _load_multidata(room)
+        self._progress = _load_progress(room)
+        self._multisave = {} if self._progress else _load_multisave(room)
         self._tracker_cache = {}
 
         self.item_name_to_id: Dict[str, Dict[str, int]] = {}
@@ -71,15 +169,13 @@ class TrackerData:
             game_name: KeyedDefaultDict(lambda code: f"Unknown Game {game_name} - Location (ID: {code})")
         })
         for game, game_package in self._multidata["datapackage"].items():
-            game_package = restricted_loads(GameDataPackage.get(checksum=game_package["checksum"]).data)
-            self.item_id_to_name[game] = KeyedDefaultDict(lambda code: f"Unknown Item (ID: {code})", {
-                id: name for name, id in game_package["item_name_to_id"].items()})
-            self.location_id_to_name[game] = KeyedDefaultDict(lambda code: f"Unknown Location (ID: {code})", {
-                id: name for name, id in game_package["location_name_to_id"].items()})
+            game_names = _load_game_names(game_package["checksum"])
+            self.item_id_to_name[game] = game_names.item_id_to_name
+            self.location_id_to_name[game] = game_names.location_id_to_name
 
             # Normal lookup tables as well.
-            self.item_name_to_id[game] = game_package["item_name_to_id"]
-            self.location_name_to_id[game] = game_package["location_name_to_id"]
+            self.item_name_to_id[game] = game_names.item_name_to_id
+            self.location_name_to_id[game] = game_names.location_name_to_id
 
     def get_seed_name(self) -> str:
         """Retrieves the seed name."""
@@ -109,8 +205,14 @@ class TrackerData:
         """Retrieves a list of all item codes a given slot starts with."""
         return self._multidata["precollected_items"][player]
 
+    @_cache_results
     def get_player_checked_locations(self, team: int, player: int) -> Set[int]:
         """Retrieves the set of all locations marked complete by this player."""
+        if self._progress:
+            progress = self._progress.get((team, player))
+            if not progress or not progress.checked:
+                return set()
+            return decode_checked(self.get_player_locations(team, player), progress.checked)
         return self._multisave.get("location_checks", {}).get((team, player), set())
 
     @_cache_results
@@ -118,8 +220,12 @@ class TrackerData:
         """Retrieves the set of all locations not marked complete by this player."""
         return set(self.get_player_locations(team, player)) - self.get_player_checked_locations(team, player)
 
+    @_cache_results
     def get_player_received_items(self, team: int, player: int) -> List[NetworkItem]:
         """Returns all items received to this player in order of received."""
+        if self._progress:
+            progress = self._progress.get((team, player))
+            return decode_received(progress.received) if progress and progress.received else []
         return self._multisave.get("received_items", {}).get((team, player, True), [])
 
     @_cache_results
@@ -138,6 +244,9 @@ class TrackerData:
     @_cache_results
     def get_player_hints(self, team: int, player: int) -> Set[Hint]:
         """Retrieves a set of all hints relevant for a particular player."""
+        if self._progress:
+            progress = self._progress.get((team, player))
+            return decode_hints(progress.hints) if progress and progress.hints else set()
         return self._multisave.get("hints", {}).get((team, player), set())
 
     @_cache_results
@@ -149,10 +258,16 @@ class TrackerData:
 
     def get_player_client_status(self, team: int, player: int) -> ClientStatus:
         """Retrieves the ClientStatus of a particular player."""
+        if self._progress:
+            progress = self._progress.get((team, player))
+            return ClientStatus(progress.status) if progress else ClientStatus.CLIENT_UNKNOWN
         return self._multisave.get("client_game_state", {}).get((team, player), ClientStatus.CLIENT_UNKNOWN)
 
     def get_player_alias(self, team: int, player: int) -> Optional[str]:
         """Returns the alias of a particular player, if any."""
+        if self._progress:
+            progress = self._progress.get((team, player))
+            return progress.alias if progress else None
         return self._multisave.get("name_aliases", {}).get((team, player), None)
 
     @_cache_results
@@ -275,7 +390,12 @@ class TrackerData:
         """
         last_activity: Dict[TeamPlayer, datetime.timedelta] = {}
         now = datetime.datetime.utcnow()
-        for (team, player), timestamp in self._multisave.get("client_activity_timers", []):
+        if self._progress:
+            timers = [(team_player, progress.last_activity) for team_player, progress in self._progress.items()
+                      if progress.last_activity is not None]
+        else:
+            timers = self._multisave.get("client_activity_timers", [])
+        for (team, player), timestamp in timers:
             last_activity[team, player] = now - datetime.datetime.utcfromtimestamp(timestamp)
 
         return last_activity
@@ -287,11 +407,26 @@ class TrackerData:
         Only supported platforms are Twitch and YouTube.
         """
         video_feeds = {}
+        if self._progress:
+            for team_player, progress in self._progress.items():
+                video_data = decode_video(progress.video)
+                if video_data:
+                    video_feeds[team_player] = video_data
+            return video_feeds
         for (team, player), video_data in self._multisave.get("video", []):
             video_feeds[team, player] = video_data
 
         return video_feeds
 
+    def get_room_progress_event_id(self) -> int:
+        """Id of the newest progress event the room's tracker pages are current with, 0 if it published none."""
+        return max((get_progress_event_id(progress.updated) for progress in self._progress.values()), default=0)
+
+    def get_player_hints_digest(self, team: int, player: int) -> int:
+        """Fingerprint of the published hints of a player, as sent with progress events."""
+        progress = self._progress.get((team, player))
+        return get_hints_digest(progress.hints if progress else None)
+
     @_cache_results
     def get_spheres(self) -> List[List[int]]:
         """ each sphere is { player: { location_id, ... } } """
@@ -422,7 +557,10 @@ def render_generic_tracker(tracker_data: TrackerData, team: int, player: int) ->
         locations=tracker_data.get_player_locations(team, player),
         checked_locations=tracker_data.get_player_checked_locations(team, player),
         received_items=received_items_in_order,
+        received_count=len(tracker_data.get_player_received_items(team, player)),
         saving_second=tracker_data.get_room_saving_second(),
+        progress_event_id=tracker_data.get_room_progress_event_id(),
+        hints_digest=tracker_data.get_player_hints_digest(team, player),
         game=game,
         games=tracker_data.get_room_games(),
         player_names_with_alias=tracker_data.get_room_long_player_names(),
@@ -454,6 +592,7 @@ def render_generic_multiworld_tracker(tracker_data: TrackerData, enabled_tracker
         item_id_to_name=tracker_data.item_id_to_name,
         location_id_to_name=tracker_data.location_id_to_name,
         saving_second=tracker_data.get_room_saving_second(),
+        progress_event_id=tracker_data.get_room_progress_event_id(),
     )
 
 
@@ -477,6 +616,197 @@ def get_multiworld_sphere_tracker(tracker: UUID):
     return render_generic_multiworld_sphere_tracker(tracker_data)
 
 
+_progress_epoch = datetime.datetime(1970, 1, 1)
+_event_streams = 0
+_event_streams_lock = threading.Lock()
+
+
+def get_progress_event_id(updated: datetime.datetime) -> int:
+    """Id of the events sent for a SlotProgress update, its time in microseconds since the epoch."""
+    return (updated - _progress_epoch) // datetime.timedelta(microseconds=1)
+
+
+def get_hints_digest(hints: Optional[bytes]) -> int:
+    """Cheap fingerprint of a slot's encoded hints, for clients to tell whether their hint rows are current."""
+    return zlib.crc32(hints or b"")
+
+
+def get_progress_events(room: Room, last_event_id: int, tracked: Optional[TeamPlayer],
+                        known: Dict[TeamPlayer, Tuple[Set[int], int, int]]) -> Tuple[int, List[Dict[str, Any]]]:
+    """Deltas of the progress the room published after last_event_id, either a summary of every slot or, if tracked
+    is given, details of that one slot. known holds what was already sent per slot, so that only what changed since
+    is sent again, and is updated. Returns the id of the newest event along with the events."""
+    multidata = _load_multidata(room)
+    after = _progress_epoch + datetime.timedelta(microseconds=last_event_id)
+    query = SlotProgress.select(lambda row: row.room == room and row.updated > after)
+    if tracked:
+        tracked_team, tracked_player = tracked
+        query = query.filter(lambda row: row.team == tracked_team and row.slot == tracked_player)
+
+    names: Optional[_EventNames] = None
+    now = datetime.datetime.utcnow()
+    events: List[Dict[str, Any]] = []
+    for row in query.order_by(SlotProgress.updated):
+        last_event_id = max(last_event_id, get_progress_event_id(row.updated))
+        team_player = row.team, row.slot
+        locations = multidata["locations"].get(row.slot, {})
+        checked = decode_checked(locations, row.checked) if row.checked else set()
+        hints_digest = get_hints_digest(row.hints)
+        sent_checked, sent_received, sent_hints_digest = known.get(team_player, (set(), 0, None))
+        event: Dict[str, Any] = {
+            "team": row.team,
+            "slot": row.slot,
+            "status": row.status,
+            "checks_done": len(checked),
+            "checks_total": len(locations),
+            "last_activity": None if row.last_activity is None else
+            (now - datetime.datetime.utcfromtimestamp(row.last_activity)).total_seconds(),
+            "hints_digest": hints_digest,
+        }
+        if hints_digest != sent_hints_digest:
+            if names is None:
+                names = _EventNames(room, multidata)
+            event["hints"] = [names.get_hint_row(row.team, hint) for hint in decode_hints(row.hints)] \
+                if row.hints else []
+        if tracked:
+            event["checked"] = sorted(checked - sent_checked)
+            received = decode_received(row.received)[sent_received:] if row.received else []
+            if received and names is None:
+                names = _EventNames(room, multidata)
+            starting_count = len(multidata["precollected_items"].get(row.slot, []))
+            event["received"] = [
+                {"index": index, "order": starting_count + index, "item": item.item,
+                 "name": names.get_item_name(row.slot, item.item)}
+                for index, item in enumerate(received, start=sent_received)
+            ]
+            known[team_player] = checked, sent_received + len(received), hints_digest
+        else:
+            known[team_player] = sent_checked, sent_received, hints_digest
+        events.append(event)
+    return last_event_id, events
+
+
+class _EventNames:
+    """Resolves the names shown in hint and item rows sent with progress events."""
+
+    def __init__(self, room: Room, multidata: Dict[str, Any]) -> None:
+        self.multidata = multidata
+        self.aliases: Dict[TeamPlayer, str] = {
+            (row.team, row.slot): row.alias
+            for row in SlotProgress.select(lambda row: row.room == room and row.alias is not None)
+        }
+
+    def get_game(self, player: int) -> str:
+        return self.multidata["slot_info"][player].game
+
+    def _get_names(self, player: int) -> Optional[_GameNames]:
+        game_package = self.multidata["datapackage"].get(self.get_game(player))
+        return _load_game_names(game_package["checksum"]) if game_package else None
+
+    def get_item_name(self, player: int, item: int) -> str:
+        names = self._get_names(player)
+        return names.item_id_to_name[item] if names else f"Unknown Item (ID: {item})"
+
+    def get_location_name(self, player: int, location: int) -> str:
+        names = self._get_names(player)
+        return names.location_id_to_name[location] if names else f"Unknown Location (ID: {location})"
+
+    def get_player_name(self, team: int, player: int) -> str:
+        name = self.multidata["slot_info"][player].name
+        alias = self.aliases.get((team, player))
+        return f"{alias} ({name})" if alias else name
+
+    def get_hint_row(self, team: int, hint: Hint) -> Dict[str, Any]:
+        return {
+            "finding_player": hint.finding_player,
+            "receiving_player": hint.receiving_player,
+            "location": hint.location,
+            "cells": [
+                self.get_player_name(team, hint.finding_player),
+                self.get_player_name(team, hint.receiving_player),
+                self.get_item_name(hint.receiving_player, hint.item),
+                self.get_location_name(hint.finding_player, hint.location),
+                self.get_game(hint.finding_player),
+                hint.entrance or "Vanilla",
+                "✔" if hint.found else "",
+            ],
+        }
+
+
+def _get_last_event_id() -> int:
+    """Id of the last event the client has seen, sent by EventSource on reconnects or by pages and pollers as since."""
+    last_event_id = request.headers.get("Last-Event-ID") or request.args.get("since")
+    try:
+        return max(0, int(last_event_id)) if last_event_id else 0
+    except ValueError:
+        abort(400)
+
+
+def _stream_progress_events(room_id: int, tracked: Optional[TeamPlayer], last_event_id: int):
+    interval = app.config["TRACKER_EVENTS_INTERVAL"]
+    end = time.monotonic() + app.config["TRACKER_EVENTS_DURATION"]
+    known: Dict[TeamPlayer, Tuple[Set[int], int, int]] = {}
+    # browsers reconnect after the stream ends, continuing from the last event id they received
+    yield f"retry: {int(interval * 1000)}\n\n"
+    while True:
+        with db_session:
+            room = Room.get(id=room_id)
+            if not room:
+                return
+            last_event_id, events = get_progress_events(room, last_event_id, tracked, known)
+        if events:
+            yield f"id: {last_event_id}\nevent: progress\ndata: {json.dumps(events)}\n\n"
+        else:
+            yield ": keep-alive\n\n"
+        if time.monotonic() + interval > end:
+            return
+        time.sleep(interval)
+
+
+def _release_event_stream() -> None:
+    global _event_streams
+    with _event_streams_lock:
+        _event_streams -= 1
+
+
+def _progress_events_response(tracker: UUID, tracked: Optional[TeamPlayer]) -> Response:
+    """Streams progress events to clients accepting text/event-stream, everyone else gets the events since the given
+    id right away, to poll again with the returned last_event_id."""
+    global _event_streams
+    room = Room.get(tracker=tracker)
+    if not room:
+        abort(404)
+    last_event_id = _get_last_event_id()
+
+    if request.accept_mimetypes.best == "text/event-stream":
+        # every stream occupies a view thread for its duration, so their number is limited;
+        # rejected EventSources don't reconnect and the page falls back to reloading periodically
+        with _event_streams_lock:
+            if _event_streams >= app.config["TRACKER_EVENTS_STREAMS"]:
+                abort(503)
+            _event_streams += 1
+        response = Response(_stream_progress_events(room.id, tracked, last_event_id), mimetype="text/event-stream")
+        response.call_on_close(_release_event_stream)
+        response.headers["Cache-Control"] = "no-cache"
+        response.headers["X-Accel-Buffering"] = "no"
+        return response
+
+    last_event_id, events = get_progress_events(room, last_event_id, tracked, {})
+    response = jsonify(last_event_id=last_event_id, events=events)
+    response.headers["Cache-Control"] = "no-cache"
+    return response
+
+
+@app.route("/tracker/<suuid:tracker>/events")
+def get_multiworld_tracker_events(tracker: UUID) -> Response:
+    return _progress_events_response(tracker, None)
+
+
+@app.route("/tracker/<suuid:tracker>/<int:tracked_team>/<int:tracked_player>/events")
+def get_player_tracker_events(tracker: UUID, tracked_team: int, tracked_player: int) -> Response:
+    return _progress_events_response(tracker, (tracked_team, tracked_player))
+
+
 # TODO: This is a temporary solution until a proper Tracker API can be implemented for tracker templates and data to
 #       live in their respective world folders.
 
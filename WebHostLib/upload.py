@@ -6,21 +6,22 @@ import uuid
 import zipfile
 import zlib
 
-from io import BytesIO
+from io import BufferedReader, BytesIO, RawIOBase
 from flask import request, flash, redirect, url_for, session, render_template, abort
 from markupsafe import Markup
 from pony.orm import commit, flush, select, rollback
 from pony.orm.core import TransactionIntegrityError
 import schema
 
-import MultiServer
 from NetUtils import SlotType
-from Utils import VersionException, __version__
+from Utils import RestrictedUnpickler, VersionException, __version__
 from worlds import GamesPackage
 from worlds.Files import AutoPatchRegister
 from worlds.AutoWorld import data_package_checksum
 from . import app
-from .models import Seed, Room, Slot, GameDataPackage
+from .game_data import store_game_data_json
+from .models import Seed, Room, Slot, GameDataPackage, db
+from .stats_rollup import record_seed
 
 banned_extensions = (".sfc", ".z64", ".n64", ".nes", ".smc", ".sms", ".gb", ".gbc", ".gba")
 allowed_options_extensions = (".yaml", ".json", ".yml", ".txt", ".zip")
@@ -48,17 +49,75 @@ def banned_file(filename: str) -> bool:
     return filename.endswith(banned_extensions)
 
 
+class UploadLimitError(Exception):
+    """An upload exceeds one of the MAX_UPLOAD_* limits, the message says which."""
+
+
+def _format_size(size: int) -> str:
+    return f"{size / 1024 / 1024:.0f} MiB"
+
+
+class _DecompressingStream(RawIOBase):
+    """Decompresses zlib data only as far as it is read, so multidata can be unpickled without ever holding all of it
+    decompressed. Raises UploadLimitError once more than limit bytes were decompressed, unless limit is 0."""
+    chunk_size = 64 * 1024
+
+    def __init__(self, data: bytes, limit: int) -> None:
+        super().__init__()
+        self._data = memoryview(data)
+        self._offset = 0
+        self._decompressor = zlib.decompressobj()
+        self._limit = limit
+        self.size = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        decompressed = b""
+        while not decompressed and not self._decompressor.eof:
+            compressed = self._decompressor.unconsumed_tail
+            if not compressed:
+                if self._offset >= len(self._data):
+                    raise zlib.error("Multidata is truncated.")
+                compressed = self._data[self._offset:self._offset + self.chunk_size]
+                self._offset += self.chunk_size
+            decompressed = self._decompressor.decompress(compressed, len(buffer))
+        self.size += len(decompressed)
+        if self._limit and self.size > self._limit:
+            raise UploadLimitError(f"Multidata is larger than the allowed {_format_size(self._limit)} "
+                                   f"once decompressed.")
+        buffer[:len(decompressed)] = decompressed
+        return len(decompressed)
+
+
+def load_multidata(compressed_multidata: bytes) -> typing.Dict[str, typing.Any]:
+    """Equivalent of MultiServer.Context.decompress for uploads, enforcing MAX_UPLOAD_SIZE as it decompresses."""
+    if compressed_multidata[0] > 3:
+        raise VersionException("Incompatible multidata.")
+    stream = _DecompressingStream(compressed_multidata[1:], app.config["MAX_UPLOAD_SIZE"])
+    return RestrictedUnpickler(BufferedReader(stream, _DecompressingStream.chunk_size)).load()
+
+
 def process_multidata(compressed_multidata, files={}):
+    """Creates the Slots and GameDataPackages of an uploaded multidata and returns them along with the multidata to
+    store. Embedded data packages are moved into their own table, multidata that has none is stored as uploaded."""
     game_data: GamesPackage
 
-    decompressed_multidata = MultiServer.Context.decompress(compressed_multidata)
+    decompressed_multidata = load_multidata(compressed_multidata)
+    modified = False
 
     slots: typing.Set[Slot] = set()
     if "datapackage" in decompressed_multidata:
         # strip datapackage from multidata, leaving only the checksums
         game_data_packages: typing.List[GameDataPackage] = []
         for game, game_data in decompressed_multidata["datapackage"].items():
-            if game_data.get("checksum"):
+            if game_data.get("checksum") and game_data.keys() <= {"version", "checksum"}:
+                # already stripped, by a previous upload to a WebHost
+                if not GameDataPackage.exists(checksum=game_data["checksum"]):
+                    raise Exception(f"Multidata refers to an unknown data package {game_data['checksum']} "
+                                    f"for game {game}.")
+            elif game_data.get("checksum"):
                 original_checksum = game_data.pop("checksum")
                 game_data = games_package_schema.validate(game_data)
                 game_data = {key: value for key, value in sorted(game_data.items())}
@@ -70,10 +129,12 @@ def process_multidata(compressed_multidata, files={}):
 
                 game_data_package = GameDataPackage(checksum=game_data["checksum"],
                                                     data=pickle.dumps(game_data))
+                store_game_data_json(game_data["checksum"], game_data)
                 decompressed_multidata["datapackage"][game] = {
                     "version": game_data.get("version", 0),
                     "checksum": game_data["checksum"],
                 }
+                modified = True
                 try:
                     commit()  # commit game data package
                     game_data_packages.append(game_data_package)
@@ -82,21 +143,45 @@ def process_multidata(compressed_multidata, files={}):
                     rollback()
 
     if "slot_info" in decompressed_multidata:
-        for slot, slot_info in decompressed_multidata["slot_info"].items():
-            # Ignore Player Groups (e.g. item links)
-            if slot_info.type == SlotType.group:
-                continue
+        # Ignore Player Groups (e.g. item links)
+        slot_infos = {slot: slot_info for slot, slot_info in decompressed_multidata["slot_info"].items()
+                      if slot_info.type != SlotType.group}
+        max_slots = app.config["MAX_UPLOAD_SLOTS"]
+        if max_slots and len(slot_infos) > max_slots:
+            raise UploadLimitError(f"Multidata has {len(slot_infos)} slots, only {max_slots} are allowed per upload.")
+        for slot, slot_info in slot_infos.items():
             slots.add(Slot(data=files.get(slot, None),
                            player_name=slot_info.name,
                            player_id=slot,
                            game=slot_info.game))
         flush()  # commit slots
 
-    compressed_multidata = compressed_multidata[0:1] + zlib.compress(pickle.dumps(decompressed_multidata), 9)
+    if modified:
+        compressed_multidata = compressed_multidata[0:1] + zlib.compress(pickle.dumps(decompressed_multidata), 9)
     return slots, compressed_multidata
 
 
-def upload_zip_to_db(zfile: zipfile.ZipFile, owner=None, meta={"race": False}, sid=None):
+def _get_slot_id(filename: str) -> int:
+    """Slot of a file named by MultiWorld.get_out_file_name_base, or of a Factorio mod."""
+    if filename.endswith(".zip"):  # Factorio
+        _, _, slot_id, *_ = filename.split('_')[0].split('-', 3)
+    else:
+        _, _, slot_id, *_ = filename.split('.')[0].split('_', 3)
+    return int(slot_id[1:])
+
+
+def _store_slot_data(slot: Slot, data: bytes) -> None:
+    """Writes the file of a flushed slot with a plain UPDATE, as setting Slot.data would keep it in the db_session until
+    it ends. The slot's data has to be read in a new db_session."""
+    quote = db.provider.quote_name
+    db.execute(f"UPDATE {quote(Slot._table_)} SET {quote(Slot.data.column)} = $data "
+               f"WHERE {quote(Slot.id.column)} = $slot_id", {}, {"data": data, "slot_id": slot.id})
+
+
+def upload_zip_to_db(zfile: zipfile.ZipFile, owner=None, meta={"race": False}, sid=None,
+                     generation_time: typing.Optional[float] = None):
+    """Creates a Seed from an uploaded zip. Only the multidata is processed as a whole, every other member is read on
+    its own and stored in its Slot right away, so the upload never has to be in memory all at once."""
     if not owner:
         owner = session["_id"]
     infolist = zfile.infolist()
@@ -105,74 +190,77 @@ def upload_zip_to_db(zfile: zipfile.ZipFile, owner=None, meta={"race": False}, s
                      'Did you mean to <a href="/generate">generate a game</a>?'))
         return
 
-    spoiler = ""
-    files = {}
-    multidata = None
+    # Check the whole upload before reading any of it.
+    if any(banned_file(file.filename) for file in infolist):
+        return "Uploaded data contained a rom file, which is likely to contain copyrighted material. " \
+               "Your file was deleted."
+    max_size = app.config["MAX_UPLOAD_SIZE"]
+    # members can't extract to more than their header claims, zipfile stops reading there
+    upload_size = sum(file.file_size for file in infolist)
+    if max_size and upload_size > max_size:
+        flash(f"Error: Your .zip file extracts to {_format_size(upload_size)}, "
+              f"only {_format_size(max_size)} are allowed per upload.")
+        return
 
-    # Load files.
+    multidata_file: typing.Optional[zipfile.ZipInfo] = None
+    spoiler_file: typing.Optional[zipfile.ZipInfo] = None
+    slot_files: typing.List[typing.Tuple[zipfile.ZipInfo, typing.Optional[int]]] = []
     for file in infolist:
-        handler = AutoPatchRegister.get_handler(file.filename)
-        if banned_file(file.filename):
-            return "Uploaded data contained a rom file, which is likely to contain copyrighted material. " \
-                   "Your file was deleted."
-
-        # AP Container
-        elif handler:
-            data = zfile.open(file, "r").read()
-            patch = handler(BytesIO(data))
-            patch.read()
-            files[patch.player] = data
-
-        # Spoiler
+        # AP Container and Minecraft name their slot in their content
+        if AutoPatchRegister.get_handler(file.filename) or file.filename.endswith(".apmc"):
+            slot_files.append((file, None))
         elif file.filename.endswith(".txt"):
-            spoiler = zfile.open(file, "r").read().decode("utf-8-sig")
-
-        # Multi-data
+            spoiler_file = file
         elif file.filename.endswith(".archipelago"):
-            try:
-                multidata = zfile.open(file).read()
-            except:
-                flash("Could not load multidata. File may be corrupted or incompatible.")
-                multidata = None
-
-        # Minecraft
-        elif file.filename.endswith(".apmc"):
-            data = zfile.open(file, "r").read()
-            metadata = json.loads(base64.b64decode(data).decode("utf-8"))
-            files[metadata["player_id"]] = data
-
-        # Factorio
-        elif file.filename.endswith(".zip"):
-            try:
-                _, _, slot_id, *_ = file.filename.split('_')[0].split('-', 3)
-            except ValueError:
-                flash("Error: Unexpected file found in .zip: " + file.filename)
-                return
-            data = zfile.open(file, "r").read()
-            files[int(slot_id[1:])] = data
-
-        # All other files using the standard MultiWorld.get_out_file_name_base method
+            multidata_file = file
+        # Factorio and all other files using the standard MultiWorld.get_out_file_name_base method
         else:
             try:
-                _, _, slot_id, *_ = file.filename.split('.')[0].split('_', 3)
+                slot_files.append((file, _get_slot_id(file.filename)))
             except ValueError:
                 flash("Error: Unexpected file found in .zip: " + file.filename)
                 return
-            data = zfile.open(file, "r").read()
-            files[int(slot_id[1:])] = data
-
-    # Load multi data.
-    if multidata:
-        slots, multidata = process_multidata(multidata, files)
-
-        seed = Seed(multidata=multidata, spoiler=spoiler, slots=slots, owner=owner, meta=json.dumps(meta),
-                    id=sid if sid else uuid.uuid4())
-        flush()  # create seed
-        for slot in slots:
-            slot.seed = seed
-        return seed
-    else:
+
+    multidata = None
+    if multidata_file:
+        try:
+            multidata = zfile.read(multidata_file)
+        except:
+            flash("Could not load multidata. File may be corrupted or incompatible.")
+    if not multidata:
         flash("No multidata was found in the zip file, which is required.")
+        return
+
+    slots, multidata = process_multidata(multidata)
+    slots_by_id = {slot.player_id: slot for slot in slots}
+    spoiler = zfile.read(spoiler_file).decode("utf-8-sig") if spoiler_file else ""
+
+    # Load files.
+    try:
+        for file, slot_id in slot_files:
+            data = zfile.read(file)
+            handler = AutoPatchRegister.get_handler(file.filename)
+            # AP Container
+            if handler:
+                patch = handler(BytesIO(data))
+                patch.read()
+                slot_id = patch.player
+            # Minecraft
+            elif file.filename.endswith(".apmc"):
+                slot_id = json.loads(base64.b64decode(data).decode("utf-8"))["player_id"]
+            if slot_id in slots_by_id:
+                _store_slot_data(slots_by_id[slot_id], data)
+    except BaseException:
+        rollback()  # don't leave the slots created so far behind
+        raise
+
+    seed = Seed(multidata=multidata, spoiler=spoiler, slots=slots, owner=owner, meta=json.dumps(meta),
+                id=sid if sid else uuid.uuid4())
+    flush()  # create seed
+    for slot in slots:
+        slot.seed = seed
+    record_seed(seed, generation_time)
+    return seed
 
 
 @app.route("/uploads", methods=["GET", "POST"])
@@ -191,6 +279,8 @@ def uploads():
                     with zipfile.ZipFile(uploaded_file, "r") as zfile:
                         try:
                             res = upload_zip_to_db(zfile)
+                        except UploadLimitError as e:
+                            flash(f"Error: {e}")
                         except VersionException:
                             flash(f"Could not load multidata. Wrong Version detected.")
                         except Exception as e:
@@ -206,11 +296,14 @@ def uploads():
                     try:
                         multidata = uploaded_file.read()
                         slots, multidata = process_multidata(multidata)
+                    except UploadLimitError as e:
+                        flash(f"Error: {e}")
                     except Exception as e:
                         flash(f"Could not load multidata. File may be corrupted or incompatible. ({e})")
                     else:
                         seed = Seed(multidata=multidata, slots=slots, owner=session["_id"])
                         flush()  # place into DB and generate ids
+                        record_seed(seed)
                         return redirect(url_for("view_seed", seed=seed.id))
             else:
                 flash("Not recognized file format. Awaiting a .archipelago file or .zip containing one.")
@@ -88,6 +88,7 @@ cdef class LocationStore:
     cdef list _items  # ~64KB/1000 players, speed up items (56 per tuple + 8 per list entry)
     cdef list _proxies  # ~92KB/1000 players, speed up self[player] (56 per struct + 28 per len + 8 per list entry)
     cdef PyObject** _raw_proxies  # 8K/1000 players, faster access to _proxies, but does not keep a ref
+    cdef dict _location_info  # encoded full-slot LocationInfo per player, built on first request
 
     def get_size(self):
         from sys import getsizeof
@@ -106,6 +107,7 @@ cdef class LocationStore:
         self._keys = []
         self._items = []
         self._proxies = []
+        self._location_info = {}
 
         # iterate over everything to get all maxima and validate everything
         cdef size_t max_sender = INVALID_SIZE  # keep track of highest used player id for indexing
@@ -246,6 +248,24 @@ cdef class LocationStore:
                         all_locations[sender].add(entry.location)
         return all_locations
 
+    def get_location_info(self, slot: int) -> str:
+        """Returns the encoded LocationInfo message for all locations of slot. The store is immutable,
+        so the payload is built once per slot and reused for every full-slot scout."""
+        cdef LocationEntry* entry
+        cdef size_t i = slot  # NOTE: this may raise TypeError
+        if i < 1 or i >= self.sender_index_size:
+            raise KeyError(slot)
+        payload = self._location_info.get(slot, None)
+        if payload is None:
+            from NetUtils import encode, NetworkItem
+            start = self.sender_index[i].start
+            count = self.sender_index[i].count
+            payload = encode([{"cmd": "LocationInfo", "locations": [
+                NetworkItem(entry.item, entry.location, entry.receiver, entry.flags)
+                for entry in self.entries[start:start+count]]}])
+            self._location_info[slot] = payload
+        return payload
+
     if TYPE_CHECKING:
         State = Dict[Tuple[int, int], Set[int]]
     else:
@@ -20,7 +20,7 @@ OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 SOFTWARE.
 ]]
 
-local SCRIPT_VERSION = 1
+local SCRIPT_VERSION = 2
 
 -- Set to log incoming requests
 -- Will cause lag due to large console output
@@ -170,6 +170,24 @@ Response:
     - `domain` (`string`): The name of the memory domain the address
     corresponds to
 
+- `WATCH`  
+    Replaces the watch list of the connection with the provided ranges of
+    memory. Watch lists are forgotten when the client disconnects. Added in
+    script version 2.
+
+    Expected Response Type: `WATCH_RESPONSE`
+
+    Additional Fields:
+    - `ranges` (`[{address: int, size: int, domain: string}]`): The ranges of
+    memory to watch, each like the fields of a `READ`
+
+- `WATCH_CHANGES`  
+    Reads every range of the watch list, returning only the ones whose data
+    changed since the last `WATCH_CHANGES`. The first one after a `WATCH`
+    returns all ranges. Added in script version 2.
+
+    Expected Response Type: `WATCH_CHANGES_RESPONSE`
+
 - `DISPLAY_MESSAGE`  
     Adds a message to the message queue which will be displayed using
     `gui.addmessage` according to the message interval.
@@ -240,6 +258,16 @@ Response:
 - `WRITE_RESPONSE`  
     Acknowledges `WRITE`.
 
+- `WATCH_RESPONSE`  
+    Acknowledges `WATCH`.
+
+- `WATCH_CHANGES_RESPONSE`  
+    Contains the ranges of the watch list whose data changed.
+
+    Additional Fields:
+    - `value` (`[{index: int, value: string}]`): The index in the watch list
+    (starting at 0) and a base64 string of the data of each changed range
+
 - `DISPLAY_MESSAGE_RESPONSE`  
     Acknowledges `DISPLAY_MESSAGE`.
 
@@ -297,6 +325,9 @@ local locked = false
 
 local rom_hash = nil
 
+-- Ranges registered by `WATCH`, with the data last reported by `WATCH_CHANGES`
+local watch_list = {}
+
 function queue_push (self, value)
     self[self.right] = value
     self.right = self.right + 1
@@ -432,6 +463,47 @@ request_handlers = {
         return res
     end,
 
+    ["WATCH"] = function (req)
+        local res = {}
+
+        res["type"] = "WATCH_RESPONSE"
+        watch_list = {}
+        for i, range in ipairs(req["ranges"]) do
+            watch_list[i] = {address = range["address"], size = range["size"], domain = range["domain"], data = nil}
+        end
+
+        return res
+    end,
+
+    ["WATCH_CHANGES"] = function (req)
+        local res = {}
+        local changes = {}
+
+        for i, range in ipairs(watch_list) do
+            local data = memory.read_bytes_as_array(range.address, range.size, range.domain)
+
+            local data_changed = range.data == nil
+            if not data_changed then
+                for j, byte in ipairs(data) do
+                    if byte ~= range.data[j] then
+                        data_changed = true
+                        break
+                    end
+                end
+            end
+
+            if data_changed then
+                range.data = data
+                table.insert(changes, {index = i - 1, value = base64.encode(data)})
+            end
+        end
+
+        res["type"] = "WATCH_CHANGES_RESPONSE"
+        res["value"] = changes
+
+        return res
+    end,
+
     ["DISPLAY_MESSAGE"] = function (req)
         local res = {}
 
@@ -584,6 +656,7 @@ function main ()
                     print("Client connected")
                     current_state = STATE_CONNECTED
                     client_socket = client
+                    watch_list = {}
                     server:close()
                     server = nil
                     client_socket:settimeout(0)
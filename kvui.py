@@ -45,6 +45,7 @@ from kivy.metrics import dp
 from kivy.effects.scroll import ScrollEffect
 from kivy.uix.widget import Widget
 from kivy.uix.button import Button
+from kivy.uix.togglebutton import ToggleButton
 from kivy.uix.gridlayout import GridLayout
 from kivy.uix.layout import Layout
 from kivy.uix.textinput import TextInput
@@ -456,10 +457,30 @@ class MessageBox(Popup):
         self.height += max(0, label.height - 18)
 
 
+def get_message_kind(args: typing.Dict[str, typing.Any], slot: typing.Optional[int]) -> str:
+    """Kind of a PrintJSON message for UILog.filters: "own_item" for items sent from or to slot, "hint", "chat" or ""
+    for everything else."""
+    message_type = args.get("type", None)
+    if message_type in ("ItemSend", "ItemCheat"):
+        if slot in (args.get("receiving", None), getattr(args.get("item", None), "player", None)):
+            return "own_item"
+    elif message_type == "Hint":
+        return "hint"
+    elif message_type in ("Chat", "ServerChat"):
+        return "chat"
+    return ""
+
+
 class GameManager(App):
     logging_pairs = [
         ("Client", "Archipelago"),
     ]
+    log_filters: typing.List[typing.Tuple[str, str]] = [
+        ("own_item", "Own Items"),
+        ("hint", "Hints"),
+        ("chat", "Chat"),
+    ]
+    """ kinds of messages that can be filtered to in the log tabs, and their button text """
     base_title: str = "Archipelago Client"
     last_autofillable_command: str
 
@@ -559,6 +580,12 @@ class GameManager(App):
         self.textinput.bind(on_text_validate=self.on_message)
         self.textinput.text_validate_unfocus = False
         bottom_layout.add_widget(self.textinput)
+        self.log_filter_buttons: typing.Dict[str, ToggleButton] = {}
+        for kind, text in self.log_filters:
+            button = ToggleButton(text=text, size=(dp(80), dp(30)), size_hint_x=None)
+            button.bind(state=self.log_filter_action)
+            bottom_layout.add_widget(button)
+            self.log_filter_buttons[kind] = button
         self.grid.add_widget(bottom_layout)
         self.commandprocessor("/help")
         Clock.schedule_interval(self.update_texts, 1 / 30)
@@ -606,6 +633,10 @@ class GameManager(App):
             logging.getLogger("Client").info("/help for client commands and once you are connected, "
                                              "!help for server commands.")
 
+    def log_filter_action(self, button, state):
+        self.set_log_filters(kind for kind, filter_button in self.log_filter_buttons.items()
+                             if filter_button.state == "down")
+
     def connect_button_action(self, button):
         self.ctx.username = None
         self.ctx.password = None
@@ -640,10 +671,24 @@ class GameManager(App):
         except Exception as e:
             logging.getLogger("Client").exception(e)
 
-    def print_json(self, data: typing.List[JSONMessagePart]):
+    def get_message_kind(self, args: typing.Dict[str, typing.Any]) -> str:
+        """Kind of a PrintJSON message for UILog.filters, see get_message_kind."""
+        return get_message_kind(args, self.ctx.slot)
+
+    def print_json(self, data: typing.List[JSONMessagePart],
+                   args: typing.Optional[typing.Dict[str, typing.Any]] = None):
+        """Shows a message, with args being the whole PrintJSON package if it came from the server."""
         text = self.json_to_kivy_parser(data)
-        self.log_panels["Archipelago"].on_message_markup(text)
-        self.log_panels["All"].on_message_markup(text)
+        kind = self.get_message_kind(args) if args else ""
+        self.log_panels["Archipelago"].on_message_markup(text, kind)
+        self.log_panels["All"].on_message_markup(text, kind)
+
+    def set_log_filters(self, filters: typing.Iterable[str]) -> None:
+        """Only shows messages of the kinds in filters in the log tabs, or all messages if it is empty."""
+        filters = frozenset(filters)
+        for panel in self.log_panels.values():
+            if isinstance(panel, UILog):
+                panel.set_filters(filters)
 
     def focus_textinput(self):
         if hasattr(self, "textinput"):
@@ -695,25 +740,40 @@ class LogtoUI(logging.Handler):
 
 
 class UILog(RecycleView):
+    """Keeps the last `messages` messages in a ring buffer. New messages and filter changes are applied to the view
+    once per frame, as every change of `data` makes the RecycleView lay out all of it again."""
     messages: typing.ClassVar[int]  # comes from kv file
+    filters: typing.FrozenSet[str] = frozenset()
+    """ kinds of messages to show, see GameManager.get_message_kind; all messages are shown if empty """
 
     def __init__(self, *loggers_to_handle, **kwargs):
         super(UILog, self).__init__(**kwargs)
         self.data = []
+        self.entries: typing.Deque[typing.Tuple[str, typing.Dict[str, str]]] = deque(maxlen=self.messages)
+        self.pending: typing.List[typing.Tuple[str, typing.Dict[str, str]]] = []
+        self.trigger_update = Clock.create_trigger(self.update_data)
         for logger in loggers_to_handle:
             logger.addHandler(LogtoUI(self.on_log))
 
     def on_log(self, record: str) -> None:
-        self.data.append({"text": escape_markup(record)})
-        self.clean_old()
+        self.add_message(escape_markup(record))
+
+    def on_message_markup(self, text: str, kind: str = "") -> None:
+        self.add_message(text, kind)
 
-    def on_message_markup(self, text):
-        self.data.append({"text": text})
-        self.clean_old()
+    def add_message(self, text: str, kind: str = "") -> None:
+        self.pending.append((kind, {"text": text}))
+        self.trigger_update()
 
-    def clean_old(self):
-        if len(self.data) > self.messages:
-            self.data.pop(0)
+    def set_filters(self, filters: typing.Iterable[str]) -> None:
+        self.filters = frozenset(filters)
+        self.trigger_update()
+
+    def update_data(self, dt: typing.Optional[float] = None) -> None:
+        pending, self.pending = self.pending, []
+        self.entries.extend(pending)
+        filters = self.filters
+        self.data = [entry for kind, entry in self.entries if not filters or kind in filters]
 
     def fix_heights(self):
         """Workaround fix for divergent texture and layout heights"""
@@ -723,6 +783,8 @@ class UILog(RecycleView):
 
 
 class HintLog(RecycleView):
+    """Rows are rendered once per hint and kept by location, so hint updates only render the hints that changed.
+    Updates are applied once per frame, and only sorted again if a row or the sorting changed."""
     header = {
         "receiving": {"text": "[u]Receiving Player[/u]"},
         "item": {"text": "[u]Item[/u]"},
@@ -740,35 +802,62 @@ class HintLog(RecycleView):
         super(HintLog, self).__init__()
         self.data = [self.header]
         self.parser = parser
+        self.rows: typing.Dict[typing.Tuple[int, int], typing.Tuple[typing.Dict[str, typing.Any], dict]] = {}
+        """ (finding player, location): (hint, row) """
+        self.sorted_by: typing.Optional[typing.Tuple[typing.Callable[[dict], str], bool]] = None
+        self.pending_hints: typing.Optional[typing.List[typing.Dict[str, typing.Any]]] = None
+        self.trigger_update = Clock.create_trigger(self.update_data)
 
     def refresh_hints(self, hints):
-        data = []
+        self.pending_hints = hints
+        self.trigger_update()
+
+    def render_hint(self, hint: typing.Dict[str, typing.Any]) -> dict:
+        return {
+            "receiving": {"text": self.parser.handle_node({"type": "player_id", "text": hint["receiving_player"]})},
+            "item": {"text": self.parser.handle_node({
+                "type": "item_id",
+                "text": hint["item"],
+                "flags": hint["item_flags"],
+                "player": hint["receiving_player"],
+            })},
+            "finding": {"text": self.parser.handle_node({"type": "player_id", "text": hint["finding_player"]})},
+            "location": {"text": self.parser.handle_node({
+                "type": "location_id",
+                "text": hint["location"],
+                "player": hint["finding_player"],
+            })},
+            "entrance": {"text": self.parser.handle_node({"type": "color" if hint["entrance"] else "text",
+                                                          "color": "blue", "text": hint["entrance"]
+                                                          if hint["entrance"] else "Vanilla"})},
+            "found": {
+                "text": self.parser.handle_node({"type": "color", "color": "green" if hint["found"] else "red",
+                                                 "text": "Found" if hint["found"] else "Not Found"})},
+        }
+
+    def update_data(self, dt: typing.Optional[float] = None) -> None:
+        hints, self.pending_hints = self.pending_hints, None
+        if hints is None:
+            return
+        rows = {}
+        changed = len(hints) != len(self.rows)
         for hint in hints:
-            data.append({
-                "receiving": {"text": self.parser.handle_node({"type": "player_id", "text": hint["receiving_player"]})},
-                "item": {"text": self.parser.handle_node({
-                    "type": "item_id",
-                    "text": hint["item"],
-                    "flags": hint["item_flags"],
-                    "player": hint["receiving_player"],
-                })},
-                "finding": {"text": self.parser.handle_node({"type": "player_id", "text": hint["finding_player"]})},
-                "location": {"text": self.parser.handle_node({
-                    "type": "location_id",
-                    "text": hint["location"],
-                    "player": hint["finding_player"],
-                })},
-                "entrance": {"text": self.parser.handle_node({"type": "color" if hint["entrance"] else "text",
-                                                              "color": "blue", "text": hint["entrance"]
-                                                              if hint["entrance"] else "Vanilla"})},
-                "found": {
-                    "text": self.parser.handle_node({"type": "color", "color": "green" if hint["found"] else "red",
-                                                     "text": "Found" if hint["found"] else "Not Found"})},
-            })
-
-        data.sort(key=self.hint_sorter, reverse=self.reversed)
-        for i in range(0, len(data), 2):
-            data[i]["striped"] = True
+            key = hint["finding_player"], hint["location"]
+            known = self.rows.get(key, None)
+            if known and known[0] == hint:
+                rows[key] = known
+            else:
+                rows[key] = hint, self.render_hint(hint)
+                changed = True
+        self.rows = rows
+        sorted_by = self.hint_sorter, self.reversed
+        if not changed and sorted_by == self.sorted_by:
+            return
+        self.sorted_by = sorted_by
+
+        data = sorted((row for hint, row in rows.values()), key=self.hint_sorter, reverse=self.reversed)
+        for i, row in enumerate(data):
+            row["striped"] = not i % 2
         data.insert(0, self.header)
         self.data = data
 
@@ -803,6 +892,7 @@ class KivyJSONtoTextParser(JSONtoTextParser):
         for name, code in color_codes.items():
             color_codes[name] = getattr(colors, name, code)
         self.color_codes = color_codes
+        self.ref_count = 0
         super().__init__(*args, **kwargs)
 
     def __call__(self, *args, **kwargs):
@@ -0,0 +1,65 @@
+def run_datapackage_benchmark(games: int = 50, repeats: int = 5):
+    """Measure how long a client takes to load the cached data packages of a room, from json and from the binary cache.
+    Uses the data packages of the installed worlds with the most locations."""
+    import asyncio
+    import json
+    import logging
+    import os
+    import tempfile
+
+    from time_it import TimeIt
+
+    import Utils
+    from Utils import init_logging, dump_data_package_binary, load_data_package_binary
+    from CommonClient import CommonContext
+    from worlds import network_data_package
+
+    init_logging("Benchmark Runner")
+    logger = logging.getLogger("Benchmark")
+
+    packages = sorted(network_data_package["games"].items(),
+                      key=lambda game: len(game[1]["location_name_to_id"]), reverse=True)[:games]
+    names = sum(len(data["item_name_to_id"]) + len(data["location_name_to_id"]) for _, data in packages)
+    logger.info(f"{len(packages)} games with {names} names.")
+
+    async def connect(load) -> CommonContext:
+        ctx = CommonContext()
+        for game, _ in packages:
+            ctx.update_game(load(game), game)
+        # a client looks up the names of a few received items and hints after connecting
+        for game, data in packages:
+            for code in list(data["item_name_to_id"].values())[:10]:
+                ctx.item_names.lookup_in_game(code, game)
+        ctx.keep_alive_task.cancel()
+        return ctx
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        paths = {}
+        for index, (game, data) in enumerate(packages):
+            paths[game] = os.path.join(temp_dir, str(index))
+            with open(f"{paths[game]}.json", "w", encoding="utf-8-sig") as f:
+                json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+            with open(f"{paths[game]}.bin", "wb") as f:
+                f.write(dump_data_package_binary(data))
+
+        def load_json(game: str):
+            with open(f"{paths[game]}.json", "r", encoding="utf-8-sig") as f:
+                return json.load(f)
+
+        def load_binary(game: str):
+            return load_data_package_binary(f"{paths[game]}.bin", dict(packages)[game]["checksum"])
+
+        sizes = {suffix: sum(os.path.getsize(f"{path}.{suffix}") for path in paths.values())
+                 for suffix in ("json", "bin")}
+        for name, load, suffix in (("json", load_json, "json"), ("binary", load_binary, "bin")):
+            with TimeIt(f"{repeats} connects from {name}") as timer:
+                for _ in range(repeats):
+                    asyncio.run(connect(load))
+            logger.info(f"{name}: {timer.dif / repeats * 1000:.1f} ms per connect, "
+                        f"{Utils.format_SI_prefix(sizes[suffix], 1024)}iB on disk.")
+
+
+if __name__ == "__main__":
+    import path_change
+    path_change.change_home()
+    run_datapackage_benchmark()
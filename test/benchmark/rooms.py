@@ -0,0 +1,48 @@
+def run_rooms_benchmark(rooms: int = 200):
+    """Measure process memory per hosted room for rooms of the same games.
+    Uses the MultiServer Context, which shares its game data between rooms the same way WebHostContext does."""
+    import gc
+    import logging
+
+    from Utils import init_logging, format_SI_prefix
+
+    init_logging("Benchmark Runner")
+    logger = logging.getLogger("Benchmark")
+
+    try:
+        import psutil
+    except ImportError:
+        import resource
+        import sys
+
+        def get_rss() -> int:
+            # peak RSS, which still grows by the amount of every new room. macOS reports bytes, others KiB
+            max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            return max_rss if sys.platform == "darwin" else max_rss * 1024
+    else:
+        def get_rss() -> int:
+            return psutil.Process().memory_info().rss
+
+    from MultiServer import Context
+
+    # first room pays for the shared data
+    contexts = [Context("", 0, "", "", 0, 0, False)]
+    contexts[0]._init_game_data()
+    gc.collect()
+    base_rss = get_rss()
+
+    for room in range(1, rooms + 1):
+        ctx = Context("", 0, "", "", 0, 0, False)
+        ctx._init_game_data()
+        contexts.append(ctx)
+        if room in (1, 10, 50) or room % 100 == 0:
+            gc.collect()
+            rss = get_rss()
+            logger.info(f"{room} additional rooms: {format_SI_prefix(rss, 1024)}iB RSS, "
+                        f"{format_SI_prefix((rss - base_rss) / room, 1024)}iB per room.")
+
+
+if __name__ == "__main__":
+    import path_change
+    path_change.change_home()
+    run_rooms_benchmark()
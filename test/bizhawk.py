@@ -0,0 +1,130 @@
+"""A stand-in for connector_bizhawk_generic.lua, for testing BizHawk clients without an emulator."""
+import asyncio
+import base64
+import json
+import typing
+
+from worlds._bizhawk import BizHawkContext, ConnectionStatus
+
+
+class FakeConnector:
+    """Serves the connector protocol from `memory`, a bytearray per domain. Like the Lua script, it handles one message
+    per emulated frame, or all of them while locked, and answers them in the order they arrived. Requests added after
+    `script_version` are answered with errors, like an older script would."""
+
+    def __init__(self, memory: typing.Dict[str, bytearray], system: str = "GBA", rom_hash: str = "F7D18982",
+                 frame_time: float = 0, script_version: int = 2) -> None:
+        self.memory = memory
+        self.system = system
+        self.rom_hash = rom_hash
+        self.frame_time = frame_time
+        self.script_version = script_version
+        self.watch_list: typing.List[typing.Tuple[typing.Dict[str, typing.Any], typing.Optional[bytes]]] = []
+        """ ranges registered by `WATCH`, with the data last reported by `WATCH_CHANGES` """
+        self.frame = 0
+        self.locked = False
+        self.messages = 0
+        """ request lists received, each costing a frame while unlocked """
+        self.requests: typing.List[typing.Dict[str, typing.Any]] = []
+        self.displayed: typing.List[str] = []
+        self.server: typing.Optional[asyncio.AbstractServer] = None
+
+    async def start(self) -> int:
+        """Starts listening, returning the port."""
+        self.server = await asyncio.start_server(self._handle_connection, "127.0.0.1", 0)
+        return self.server.sockets[0].getsockname()[1]
+
+    async def stop(self) -> None:
+        if self.server:
+            self.server.close()
+            await self.server.wait_closed()
+
+    async def connect(self, ctx: BizHawkContext) -> None:
+        """Connects `ctx` like `worlds._bizhawk.connect` would."""
+        ctx.streams = await asyncio.open_connection("127.0.0.1", await self.start())
+        ctx.connection_status = ConnectionStatus.TENTATIVE
+        ctx.script_version = None
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.watch_list = []
+        try:
+            while line := await reader.readline():
+                if not self.locked:
+                    await asyncio.sleep(self.frame_time)
+                    self.frame += 1
+                message = line.decode("utf-8").strip()
+                if message == "VERSION":
+                    writer.write(f"{self.script_version}\n".encode("utf-8"))
+                else:
+                    self.messages += 1
+                    writer.write(json.dumps(self.process(json.loads(message))).encode("utf-8") + b"\n")
+                await writer.drain()
+        except ConnectionResetError:
+            pass
+        finally:
+            writer.close()
+
+    def process(self, req_list: typing.List[typing.Dict[str, typing.Any]]) -> typing.List[typing.Dict[str, typing.Any]]:
+        responses: typing.List[typing.Dict[str, typing.Any]] = []
+        failed_guard = None
+        for req in req_list:
+            self.requests.append(req)
+            if failed_guard:
+                responses.append(failed_guard)
+                continue
+            try:
+                response = self.process_request(req)
+            except (KeyError, IndexError) as exc:
+                response = {"type": "ERROR", "err": repr(exc)}
+            if response["type"] == "GUARD_RESPONSE" and not response["value"]:
+                failed_guard = response
+            responses.append(response)
+        return responses
+
+    def process_request(self, req: typing.Dict[str, typing.Any]) -> typing.Dict[str, typing.Any]:
+        if req["type"] == "PING":
+            return {"type": "PONG"}
+        if req["type"] == "SYSTEM":
+            return {"type": "SYSTEM_RESPONSE", "value": self.system}
+        if req["type"] == "HASH":
+            return {"type": "HASH_RESPONSE", "value": self.rom_hash}
+        if req["type"] == "PREFERRED_CORES":
+            return {"type": "PREFERRED_CORES_RESPONSE", "value": {}}
+        if req["type"] == "LOCK":
+            self.locked = True
+            return {"type": "LOCKED"}
+        if req["type"] == "UNLOCK":
+            self.locked = False
+            return {"type": "UNLOCKED"}
+        if req["type"] == "DISPLAY_MESSAGE":
+            self.displayed.append(req["message"])
+            return {"type": "DISPLAY_MESSAGE_RESPONSE"}
+        if req["type"] == "SET_MESSAGE_INTERVAL":
+            return {"type": "SET_MESSAGE_INTERVAL_RESPONSE"}
+        if req["type"] == "WATCH" and self.script_version >= 2:
+            self.watch_list = [(watched, None) for watched in req["ranges"]]
+            return {"type": "WATCH_RESPONSE"}
+        if req["type"] == "WATCH_CHANGES" and self.script_version >= 2:
+            changes: typing.List[typing.Dict[str, typing.Any]] = []
+            for index, (watched, last_data) in enumerate(self.watch_list):
+                address = watched["address"]
+                data = bytes(self.memory[watched["domain"]][address:address + watched["size"]])
+                if data != last_data:
+                    self.watch_list[index] = (watched, data)
+                    changes.append({"index": index, "value": base64.b64encode(data).decode("ascii")})
+            return {"type": "WATCH_CHANGES_RESPONSE", "value": changes}
+
+        domain = self.memory[req["domain"]]
+        address = req["address"]
+        if req["type"] == "GUARD":
+            expected = base64.b64decode(req["expected_data"])
+            return {"type": "GUARD_RESPONSE", "value": domain[address:address + len(expected)] == expected,
+                    "address": address}
+        if req["type"] == "READ":
+            return {"type": "READ_RESPONSE",
+                    "value": base64.b64encode(domain[address:address + req["size"]]).decode("ascii")}
+        if req["type"] == "WRITE":
+            data = base64.b64decode(req["value"])
+            domain[address:address + len(data)] = data
+            return {"type": "WRITE_RESPONSE"}
+        return {"type": "ERROR", "err": f"Unknown command: {req['type']}"}
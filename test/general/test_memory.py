@@ -1,3 +1,4 @@
+import sys
 import unittest
 
 from worlds.AutoWorld import AutoWorldRegister
@@ -14,3 +15,36 @@ class TestWorldMemory(unittest.TestCase):
                 weak = weakref.ref(setup_solo_multiworld(world_type))
                 gc.collect()
                 self.assertFalse(weak(), "World leaked a reference")
+
+
+class TestRoomMemory(unittest.TestCase):
+    rooms: int = 5
+
+    def test_shared_game_data(self):
+        """Tests that server Contexts of the same games reference one copy of each game's name tables."""
+        import tracemalloc
+        from MultiServer import Context
+
+        first = Context("", 0, "", "", 0, 0, False)
+        first._init_game_data()
+        contexts = [first]
+        tracemalloc.start()
+        try:
+            for _ in range(self.rooms):
+                ctx = Context("", 0, "", "", 0, 0, False)
+                ctx._init_game_data()
+                contexts.append(ctx)
+            per_room, _ = tracemalloc.get_traced_memory()
+            per_room //= self.rooms
+        finally:
+            tracemalloc.stop()
+
+        for game in first.gamespackage:
+            with self.subTest("Game", game=game):
+                for ctx in contexts[1:]:
+                    self.assertIs(ctx.item_names[game], first.item_names[game])
+                    self.assertIs(ctx.location_names[game], first.location_names[game])
+                    self.assertIs(ctx.all_item_and_group_names[game], first.all_item_and_group_names[game])
+        shared_size = sum(sys.getsizeof(names) for game_names in (first.item_names, first.location_names)
+                          for names in game_names.values())
+        self.assertLess(per_room, shared_size, "Rooms allocate more than their name tables would take")
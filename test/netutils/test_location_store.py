@@ -134,6 +134,18 @@ class Base:
             self.assertEqual(self.store.get_remaining(empty_state, 0, 1), [(1, 13), (2, 21), (2, 22)])
             self.assertEqual(self.store.get_remaining(empty_state, 0, 3), [(4, 99)])
 
+        def test_get_location_info(self) -> None:
+            from NetUtils import decode, NetworkItem
+            payload = self.store.get_location_info(2)
+            self.assertIs(self.store.get_location_info(2), payload)  # cached
+            msgs = decode(payload)
+            self.assertEqual(len(msgs), 1)
+            self.assertEqual(msgs[0]["cmd"], "LocationInfo")
+            self.assertEqual(sorted(msgs[0]["locations"], key=lambda item: item.location),
+                             [NetworkItem(23, 21, 2, 0), NetworkItem(12, 22, 1, 0), NetworkItem(11, 23, 1, 0)])
+            with self.assertRaises(KeyError):
+                self.store.get_location_info(0)
+
         def test_location_set_intersection(self) -> None:
             locations = {10, 11, 12}
             locations.intersection_update(self.store[1])
@@ -0,0 +1,106 @@
+"""Tests of the log and hint views of kvui. Run by test_kvui in a process of their own."""
+import unittest
+
+import NetUtils
+from CommonClient import CommonContext
+
+
+class TestLogViews(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        import kvui
+        self.kvui = kvui
+        self.ctx = CommonContext()
+        self.ctx.slot = 1
+        self.ctx.team = 1
+        self.ctx.slot_info.update({
+            1: NetUtils.NetworkSlot("Player 1", "__TestGame1", NetUtils.SlotType.player),
+            2: NetUtils.NetworkSlot("Player 2", "__TestGame1", NetUtils.SlotType.player),
+        })
+        self.ctx.consume_players_package([
+            NetUtils.NetworkPlayer(1, 1, "Player 1", "Player 1"),
+            NetUtils.NetworkPlayer(1, 2, "Player 2", "Player 2"),
+        ])
+        self.ctx.update_data_package({
+            "games": {
+                "__TestGame1": {
+                    "location_name_to_id": {f"Test Location {location}": location for location in range(1, 4)},
+                    "item_name_to_id": {"Test Item": 1},
+                },
+            },
+        })
+
+    async def asyncTearDown(self) -> None:
+        await self.ctx.shutdown()
+
+    async def test_log_ring_buffer(self) -> None:
+        """Messages are applied once per update and only the newest are kept."""
+        log = self.kvui.UILog()
+        for i in range(log.messages + 10):
+            log.on_message_markup(str(i))
+        self.assertEqual(log.data, [])
+        log.update_data()
+        self.assertEqual(len(log.data), log.messages)
+        self.assertEqual(log.data[0]["text"], "10")
+        self.assertEqual(log.data[-1]["text"], str(log.messages + 9))
+
+    async def test_log_filters(self) -> None:
+        log = self.kvui.UILog()
+        log.on_log("connecting")
+        log.on_message_markup("item", "own_item")
+        log.on_message_markup("hello", "chat")
+        log.on_message_markup("hint", "hint")
+        log.set_filters({"chat", "hint"})
+        log.update_data()
+        self.assertEqual([entry["text"] for entry in log.data], ["hello", "hint"])
+        log.set_filters(())
+        log.update_data()
+        self.assertEqual(len(log.data), 4)
+
+    async def test_message_kind(self) -> None:
+        get_message_kind = self.kvui.get_message_kind
+        own_item = NetUtils.NetworkItem(1, 1, 1, 0)
+        other_item = NetUtils.NetworkItem(1, 1, 2, 0)
+        self.assertEqual(get_message_kind({"type": "ItemSend", "receiving": 2, "item": own_item}, 1), "own_item")
+        self.assertEqual(get_message_kind({"type": "ItemSend", "receiving": 1, "item": other_item}, 1), "own_item")
+        self.assertEqual(get_message_kind({"type": "ItemSend", "receiving": 2, "item": other_item}, 1), "")
+        self.assertEqual(get_message_kind({"type": "Hint", "receiving": 2, "item": other_item}, 1), "hint")
+        self.assertEqual(get_message_kind({"type": "Chat", "slot": 2, "message": "hi"}, 1), "chat")
+        self.assertEqual(get_message_kind({"type": "Join"}, 1), "")
+
+    async def test_hint_rows(self) -> None:
+        """Only new or changed hints are rendered, keyed by their location."""
+        hint_log = self.kvui.HintLog(self.kvui.KivyJSONtoTextParser(self.ctx))
+        rendered = []
+        render_hint = hint_log.render_hint
+
+        def count_render(hint):
+            rendered.append(hint["location"])
+            return render_hint(hint)
+
+        hint_log.render_hint = count_render
+
+        def hint(location: int, found: bool = False):
+            return {"receiving_player": 1, "finding_player": 2, "location": location, "item": 1, "found": found,
+                    "entrance": "", "item_flags": 0}
+
+        hint_log.refresh_hints([hint(1), hint(2)])
+        hint_log.refresh_hints([hint(1), hint(2), hint(3)])
+        hint_log.update_data()
+        self.assertEqual(rendered, [1, 2, 3])
+        self.assertEqual(len(hint_log.data), 4)
+
+        hint_log.refresh_hints([hint(1), hint(2, True), hint(3)])
+        hint_log.update_data()
+        self.assertEqual(rendered, [1, 2, 3, 2])
+        self.assertIn("Found", hint_log.data[2]["found"]["text"])
+        self.assertEqual([row.get("striped") for row in hint_log.data], [True, True, False, True])
+
+        data = hint_log.data
+        hint_log.refresh_hints([hint(1), hint(2, True), hint(3)])
+        hint_log.update_data()
+        self.assertIs(hint_log.data, data)  # nothing changed, so nothing was sorted or set
+
+        hint_log.refresh_hints([hint(3)])
+        hint_log.update_data()
+        self.assertEqual(rendered, [1, 2, 3, 2])
+        self.assertEqual(len(hint_log.data), 2)
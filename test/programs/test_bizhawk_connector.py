@@ -0,0 +1,178 @@
+import asyncio
+import typing
+import unittest
+
+import worlds._bizhawk as bizhawk
+from worlds._bizhawk import BizHawkContext, ConnectionStatus, RequestFailedError
+from worlds._bizhawk.client import BizHawkClient
+from worlds._bizhawk.context import BizHawkClientContext, _watch_memory
+
+from ..bizhawk import FakeConnector
+
+
+class TestBizHawkConnector(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.connector = FakeConnector({"RAM": bytearray(range(256)), "ROM": bytearray(b"ROM NAME")})
+        self.ctx = BizHawkContext()
+        await self.connector.connect(self.ctx)
+
+    async def asyncTearDown(self) -> None:
+        bizhawk.disconnect(self.ctx)
+        await self.connector.stop()
+
+    async def test_requests(self) -> None:
+        self.assertEqual(await bizhawk.get_script_version(self.ctx), 2)
+        self.assertEqual(self.ctx.script_version, 2)
+        self.assertEqual(self.ctx.connection_status, ConnectionStatus.CONNECTED)
+        await bizhawk.ping(self.ctx)
+        self.assertEqual(await bizhawk.get_system(self.ctx), "GBA")
+        self.assertEqual(await bizhawk.read(self.ctx, [(4, 2, "RAM"), (0, 3, "ROM")]), [b"\x04\x05", b"ROM"])
+        await bizhawk.write(self.ctx, [(4, [0xAA], "RAM")])
+        self.assertEqual(self.connector.memory["RAM"][4], 0xAA)
+        self.assertIsNone(await bizhawk.guarded_read(self.ctx, [(0, 1, "RAM")], [(4, [0], "RAM")]))
+        self.assertFalse(await bizhawk.guarded_write(self.ctx, [(0, [1], "RAM")], [(4, [0], "RAM")]))
+        self.assertTrue(await bizhawk.guarded_write(self.ctx, [(0, [1], "RAM")], [(4, [0xAA], "RAM")]))
+        self.assertEqual(self.connector.memory["RAM"][0], 1)
+
+    async def test_pipelined(self) -> None:
+        self.connector.frame_time = 0.01
+        results = await asyncio.gather(
+            bizhawk.write(self.ctx, [(0, [0xFF], "RAM")]),
+            bizhawk.get_hash(self.ctx),
+            bizhawk.guarded_read(self.ctx, [(1, 1, "RAM")], [(0, [0xFF], "RAM")]),
+            bizhawk.read(self.ctx, [(10, 1, "RAM")]),
+            bizhawk.read(self.ctx, [(20, 2, "RAM")]),
+            bizhawk.read(self.ctx, [(30, 1, "RAM"), (0, 1, "RAM")]),
+        )
+        self.assertEqual(results, [None, "F7D18982", [b"\x01"], [b"\x0a"], [b"\x14\x15"], [b"\x1e", b"\xff"]],
+                         "responses go to the request they belong to")
+        self.assertEqual(self.connector.messages, 4, "reads of the same tick are sent as one request list")
+
+    async def test_throughput(self) -> None:
+        self.connector.frame_time = 0.01
+
+        async def handler(offset: int) -> None:
+            for index in range(5):
+                self.assertEqual(await bizhawk.read(self.ctx, [(offset + index, 1, "RAM")]),
+                                 [bytes([offset + index])])
+
+        # 10 handlers reading 5 times each take 5 frames instead of 50
+        await asyncio.gather(*(handler(offset * 10) for offset in range(10)))
+        self.assertEqual(self.connector.messages, 5)
+
+    async def test_connection_lost(self) -> None:
+        self.connector.frame_time = 0.05
+        reads = [asyncio.create_task(bizhawk.read(self.ctx, [(0, 1, "RAM")])) for _ in range(2)]
+        ping = asyncio.create_task(bizhawk.ping(self.ctx))
+        await asyncio.sleep(0.01)
+        self.assertEqual(len(self.ctx._pending), 2, "waiting for the connector")
+        bizhawk.disconnect(self.ctx)
+        for task in [*reads, ping]:
+            with self.assertRaises(RequestFailedError):
+                await task
+        self.assertEqual(self.ctx.connection_status, ConnectionStatus.NOT_CONNECTED)
+
+
+class WatchingClient(BizHawkClient):
+    watch_list = [(0, 2, "RAM"), (8, 1, "RAM")]
+
+    def __init__(self) -> None:
+        self.changes: typing.List[typing.Dict[typing.Tuple[int, int, str], bytes]] = []
+
+    async def validate_rom(self, ctx: BizHawkClientContext) -> bool:
+        return True
+
+    async def game_watcher(self, ctx: BizHawkClientContext) -> None:
+        pass
+
+    async def on_memory_changed(self, ctx: BizHawkClientContext,
+                                changed: typing.Dict[typing.Tuple[int, int, str], bytes]) -> None:
+        self.changes.append(changed)
+
+
+class TestWatchList(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.connector = FakeConnector({"RAM": bytearray(16)})
+        self.ctx = BizHawkClientContext(None, None)
+        self.ctx.client_handler = self.handler = WatchingClient()
+        await self.connector.connect(self.ctx.bizhawk_ctx)
+
+    async def asyncTearDown(self) -> None:
+        bizhawk.disconnect(self.ctx.bizhawk_ctx)
+        await self.connector.stop()
+
+    async def test_memory_changed(self) -> None:
+        await _watch_memory(self.ctx)
+        self.assertEqual(self.handler.changes, [{(0, 2, "RAM"): b"\x00\x00", (8, 1, "RAM"): b"\x00"}])
+        await _watch_memory(self.ctx)
+        self.assertEqual(len(self.handler.changes), 1, "nothing changed")
+
+        self.connector.memory["RAM"][1] = 5
+        self.connector.memory["RAM"][9] = 5  # not watched
+        await _watch_memory(self.ctx)
+        self.assertEqual(self.handler.changes[-1], {(0, 2, "RAM"): b"\x00\x05"})
+        self.assertEqual(self.ctx.watched_memory.data[(8, 1, "RAM")], b"\x00")
+        self.assertEqual(self.connector.messages, 3, "one request per loop")
+
+        self.ctx.watched_memory.reset()
+        await _watch_memory(self.ctx)
+        self.assertEqual(len(self.handler.changes[-1]), 2, "everything is reported again after reconnecting")
+        self.assertEqual([req["type"] for req in self.connector.requests],
+                         ["WATCH", "WATCH_CHANGES", "WATCH_CHANGES", "WATCH_CHANGES", "WATCH", "WATCH_CHANGES"],
+                         "the connector compares the ranges, registered again after the reset")
+
+    async def test_connector_changes(self) -> None:
+        """Only the ranges that changed are sent by the connector."""
+        changes = []
+        process_request = self.connector.process_request
+
+        def record_changes(req):
+            res = process_request(req)
+            if res["type"] == "WATCH_CHANGES_RESPONSE":
+                changes.append([change["index"] for change in res["value"]])
+            return res
+
+        self.connector.process_request = record_changes  # type: ignore
+        await _watch_memory(self.ctx)
+        await _watch_memory(self.ctx)
+        self.connector.memory["RAM"][8] = 1
+        await _watch_memory(self.ctx)
+        self.assertEqual(changes, [[0, 1], [], [1]])
+        self.assertEqual(self.handler.changes[-1], {(8, 1, "RAM"): b"\x01"})
+
+    async def test_reconnect(self) -> None:
+        await _watch_memory(self.ctx)
+        bizhawk.disconnect(self.ctx.bizhawk_ctx)
+        await self.connector.stop()
+        await self.connector.connect(self.ctx.bizhawk_ctx)
+        await _watch_memory(self.ctx)
+        self.assertEqual(len(self.handler.changes), 1, "nothing changed")
+        self.assertEqual(self.connector.requests[-2]["type"], "WATCH", "the new connection has no watch list yet")
+
+    async def test_older_script(self) -> None:
+        """Connector scripts without watch lists get all ranges read, compared by the client."""
+        bizhawk.disconnect(self.ctx.bizhawk_ctx)
+        await self.connector.stop()
+        self.connector = FakeConnector({"RAM": bytearray(16)}, script_version=1)
+        await self.connector.connect(self.ctx.bizhawk_ctx)
+
+        await _watch_memory(self.ctx)
+        await _watch_memory(self.ctx)
+        self.connector.memory["RAM"][0] = 5
+        await _watch_memory(self.ctx)
+        self.assertEqual(self.handler.changes, [{(0, 2, "RAM"): b"\x00\x00", (8, 1, "RAM"): b"\x00"},
+                                                {(0, 2, "RAM"): b"\x05\x00"}])
+        self.assertEqual({req["type"] for req in self.connector.requests}, {"READ"})
+        self.assertEqual(self.connector.messages, 3)
+
+    async def test_failed_callback(self) -> None:
+        async def fail(ctx: BizHawkClientContext, changed: typing.Dict[typing.Tuple[int, int, str], bytes]) -> None:
+            raise RequestFailedError("Connection timed out")
+
+        self.handler.on_memory_changed = fail  # type: ignore
+        with self.assertRaises(RequestFailedError):
+            await _watch_memory(self.ctx)
+        del self.handler.on_memory_changed
+        await _watch_memory(self.ctx)
+        self.assertEqual(len(self.handler.changes), 1)
+        self.assertEqual(len(self.handler.changes[0]), 2, "changes are reported again")
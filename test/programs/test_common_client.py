@@ -1,3 +1,5 @@
+import asyncio
+import time
 import unittest
 
 import NetUtils
@@ -58,6 +60,18 @@ class TestCommonContext(unittest.IsolatedAsyncioTestCase):
         assert self.ctx.location_names[2**54 + 3] == f"Unknown location (ID: {2**54+3})"
         assert self.ctx.location_names[-1] == "Cheat Console"
 
+    async def test_repeated_updates(self):
+        """Updating a game again, like a client joining many rooms does, replaces its pending lookup table."""
+        pending = len(self.ctx.item_names._flat_store_updates)
+        for name in ("Old Name", "New Name"):
+            for _ in range(10):
+                self.ctx.item_names.update_game("__TestGame1", {name: 2**54 + 1})
+        self.ctx.item_names.update_game("__TestGame2", {"Other Name": 2**54 + 3})
+        assert len(self.ctx.item_names._flat_store_updates) == pending
+        assert self.ctx.item_names[2**54 + 1] == "New Name"
+        assert self.ctx.item_names[2**54 + 3] == "Other Name"
+        assert not self.ctx.item_names._flat_store_updates
+
     async def test_explicit_name_lookups(self):
         # Items
         assert self.ctx.item_names["__TestGame1"][2**54+1] == "Test Item 1 - Safe"
@@ -104,3 +118,22 @@ class TestCommonContext(unittest.IsolatedAsyncioTestCase):
         assert self.ctx.item_names.lookup_in_slot(-1, 3) == "Nothing"
         assert self.ctx.item_names.lookup_in_game(-1, "__TestGame1") == "Nothing"
         assert self.ctx.item_names.lookup_in_game(-1, "__TestGame2") == "Nothing"
+
+    async def test_schedule_messages(self):
+        logged = []
+        start = time.monotonic()
+        task = self.ctx.schedule_messages(["first", "second", "third"], interval=0.02, log=logged.append)
+        self.assertEqual(logged, [], "messages are logged by the task")
+        self.assertIn(task, self.ctx.scheduled_message_tasks)
+        await asyncio.sleep(0.01)
+        self.assertEqual(logged, ["first"])
+        await task
+        self.assertEqual(logged, ["first", "second", "third"])
+        self.assertGreaterEqual(time.monotonic() - start, 0.04)
+        self.assertNotIn(task, self.ctx.scheduled_message_tasks)
+
+        task = self.ctx.schedule_messages(["dropped"], delay=10, log=logged.append)
+        await self.ctx.shutdown()
+        await asyncio.sleep(0)
+        self.assertTrue(task.cancelled())
+        self.assertEqual(logged, ["first", "second", "third"])
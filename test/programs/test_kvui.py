@@ -0,0 +1,14 @@
+import os
+import subprocess
+import sys
+import unittest
+
+
+class TestKivyUI(unittest.TestCase):
+    def test_views(self) -> None:
+        """Runs the kvui tests in their own process, as importing Kivy keeps references alive that the memory tests
+        would report as leaks."""
+        root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        result = subprocess.run([sys.executable, "-m", "unittest", "test.programs.kvui_views"],
+                                cwd=root, capture_output=True, text=True, timeout=300)
+        self.assertEqual(result.returncode, 0, result.stderr)
@@ -1,3 +1,5 @@
+import asyncio
+import typing
 import unittest
 from MultiServer import Context, ServerCommandProcessor
 
@@ -38,3 +40,169 @@ class TestResolvePlayerName(unittest.TestCase):
         assert p.resolve_player("ABC") == (1, 2, "abc"), "case insensitive resolves when 1 match"
         assert p.resolve_player("abcd") == (1, 3, "abCD"), "case insensitive resolves when 1 match"
         assert not p.resolve_player("aB"), "partial name shouldn't resolve to player"
+
+
+class TestLocationJobs(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        from MultiServer import get_missing_checks
+        from NetUtils import LocationStore, NetworkSlot, SlotType
+
+        self.ctx = Context("", 0, "", "", 0, 0, False)
+        self.ctx.location_job_chunk_size = 10
+        self.ctx.slot_info = {
+            1: NetworkSlot("Player 1", "__TestGame", SlotType.player),
+            2: NetworkSlot("Player 2", "__TestGame", SlotType.player),
+        }
+        self.ctx.player_names = {(0, 1): "Player 1", (0, 2): "Player 2"}
+        self.ctx.clients = {0: {1: [], 2: []}}
+        self.ctx.locations = LocationStore({
+            1: {location: (location, 1 + location % 2, 0) for location in range(1, 36)},
+            2: {100: (100, 1, 0)},
+        })
+        self.missing = get_missing_checks
+
+    async def test_release_in_chunks(self) -> None:
+        from MultiServer import release_player
+
+        release_player(self.ctx, 0, 1)
+        job = self.ctx.location_jobs["release", 0, 1]
+        await asyncio.sleep(0)
+        self.assertEqual(len(self.ctx.location_checks[0, 1]), 10, "job should yield after one chunk")
+        self.assertEqual(self.ctx.get_save()["location_jobs"], [("release", 0, 1)])
+        await job
+        self.assertFalse(self.missing(self.ctx, 0, 1))
+        self.assertFalse(self.ctx.location_jobs)
+        self.assertEqual(len(self.ctx.received_items[0, 2, True]), 18)
+        self.assertEqual(self.ctx.get_save()["location_jobs"], [])
+
+    async def test_cancel_release(self) -> None:
+        from MultiServer import cancel_location_job, release_player
+
+        release_player(self.ctx, 0, 1)
+        job = self.ctx.location_jobs["release", 0, 1]
+        await asyncio.sleep(0)
+        self.assertTrue(cancel_location_job(self.ctx, "release", 0, 1))
+        with self.assertRaises(asyncio.CancelledError):
+            await job
+        self.assertEqual(len(self.ctx.location_checks[0, 1]), 10, "cancel should keep registered locations")
+        self.assertFalse(self.ctx.location_jobs)
+        self.assertFalse(cancel_location_job(self.ctx, "release", 0, 1))
+
+    async def test_collect(self) -> None:
+        from MultiServer import collect_player
+
+        collect_player(self.ctx, 0, 2)
+        await self.ctx.location_jobs["collect", 0, 2]
+        self.assertEqual(self.missing(self.ctx, 0, 1), list(range(2, 36, 2)))
+        self.assertFalse(self.ctx.location_checks[0, 2])
+
+
+class _FakeSocket:
+    open = True
+
+    def __init__(self) -> None:
+        self.sent = []
+
+    async def send(self, msg: str) -> None:
+        from NetUtils import decode
+        self.sent.extend(decode(msg))
+
+
+class TestResume(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        from MultiServer import Client
+        from NetUtils import LocationStore, NetworkItem, NetworkSlot, SlotType
+        from Utils import Version, version_tuple
+
+        self.ctx = Context("", 0, "", "", 0, 0, False)
+        self.ctx.slot_info = {1: NetworkSlot("Player 1", "__TestGame", SlotType.player)}
+        self.ctx.games = {1: "__TestGame"}
+        self.ctx.player_names = {(0, 1): "Player 1"}
+        self.ctx.connect_names = {"Player 1": (0, 1)}
+        self.ctx.minimum_client_versions = {1: Version(0, 0, 0)}
+        self.ctx.slot_data = {1: {}}
+        self.ctx.clients = {0: {1: []}}
+        self.ctx.seed_name = "TestSeed"
+        self.ctx.locations = LocationStore({1: {1: (1, 1, 0)}})
+        self.ctx.received_items[0, 1, True] = [NetworkItem(item, -1, 0) for item in range(10)]
+        self.version = version_tuple
+        self.client_type = Client
+
+    async def connect(self, **kwargs) -> typing.List[dict]:
+        from MultiServer import process_client_cmd
+
+        client = self.client_type(_FakeSocket(), self.ctx)
+        self.ctx.endpoints.append(client)
+        await process_client_cmd(self.ctx, client, {
+            "cmd": "Connect", "password": None, "name": "Player 1", "game": "__TestGame", "uuid": 0,
+            "version": self.version, "tags": [], "items_handling": 0b111, **kwargs})
+        return client.socket.sent
+
+    async def test_resume(self) -> None:
+        reply = await self.connect()
+        token = reply[0]["resume_token"]
+        self.assertEqual(reply[1]["index"], 0)
+        self.assertEqual(len(reply[1]["items"]), 10)
+
+        reply = await self.connect(resume_token=token, items_index=7)
+        self.assertEqual(reply[1]["index"], 7, "resume should only send missing items")
+        self.assertEqual(len(reply[1]["items"]), 3)
+
+        reply = await self.connect(resume_token=token, items_index=10)
+        self.assertEqual([packet["cmd"] for packet in reply if packet["cmd"] == "ReceivedItems"], [],
+                         "up to date client should not be sent items")
+
+        for kwargs in ({"resume_token": "invalid", "items_index": 7},
+                       {"resume_token": token, "items_index": 11},
+                       {"resume_token": token, "items_index": 7, "items_handling": 0b011}):
+            with self.subTest(**kwargs):
+                reply = await self.connect(**kwargs)
+                self.assertEqual(reply[1]["index"], 0, "invalid resume should send all items")
+
+    async def test_token_survives_save(self) -> None:
+        token = (await self.connect())[0]["resume_token"]
+        save = self.ctx.get_save()
+        self.ctx.resume_secret = b""
+        self.ctx.set_save(save)
+        self.assertEqual(self.ctx.get_resume_token(0, 1, 0b111), token)
+
+
+class TestLocationScouts(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        await TestResume.asyncSetUp(self)
+        from NetUtils import LocationStore
+        self.ctx.locations = LocationStore({1: {location: (location, 1, 0) for location in range(1, 11)}})
+        self.client = self.client_type(_FakeSocket(), self.ctx)
+        self.client.auth = True
+        self.client.team, self.client.slot = 0, 1
+        self.ctx.clients[0][1].append(self.client)
+
+        def broadcast(endpoints, msgs: typing.List[dict]) -> None:
+            for endpoint in endpoints:
+                endpoint.socket.sent.extend(msgs)
+
+        self.ctx.broadcast = broadcast
+
+    async def scout(self, locations: typing.List[int], create_as_hint: int = 0) -> typing.List[dict]:
+        from MultiServer import process_client_cmd
+
+        self.client.socket.sent.clear()
+        await process_client_cmd(self.ctx, self.client, {
+            "cmd": "LocationScouts", "locations": locations, "create_as_hint": create_as_hint})
+        await asyncio.sleep(0)  # let broadcasts through
+        return self.client.socket.sent
+
+    async def test_full_slot_scout(self) -> None:
+        reply = await self.scout(list(range(10, 0, -1)))
+        self.assertEqual(sorted(item.location for item in reply[0]["locations"]), list(range(1, 11)))
+        reply = await self.scout([3, 1])
+        self.assertEqual([item.location for item in reply[0]["locations"]], [3, 1])
+
+    async def test_bulk_hint(self) -> None:
+        reply = await self.scout(list(range(1, 11)), create_as_hint=2)
+        self.assertEqual(len(self.ctx.hints[0, 1]), 10)
+        self.assertEqual(len([msg for msg in reply if msg["cmd"] == "RoomUpdate"]), 1,
+                         "bulk hints should notify once")
+        self.assertEqual(len([msg for msg in reply if msg["cmd"] == "PrintJSON"]), 10)
+        reply = await self.scout(list(range(1, 11)), create_as_hint=2)
+        self.assertEqual([msg["cmd"] for msg in reply], ["LocationInfo"], "no new hints should be sent")
@@ -0,0 +1,125 @@
+import gc
+import os
+import tempfile
+import unittest
+
+from MultiServer import Client, CommandRecorder, on_client_connected, process_client_cmd
+from MultiServerReplay import ReplayContext, compare_saves, read_log, replay_log
+from NetUtils import LocationStore, NetworkItem, NetworkSlot, SlotType
+from Utils import Version, version_tuple
+
+
+def make_context() -> ReplayContext:
+    ctx = ReplayContext("", 0, "", "", 0, 0, False)
+    ctx.slot_info = {1: NetworkSlot("Player 1", "__TestGame", SlotType.player)}
+    ctx.games = {1: "__TestGame"}
+    ctx.player_names = {(0, 1): "Player 1"}
+    ctx.connect_names = {"Player 1": (0, 1)}
+    ctx.minimum_client_versions = {1: Version(0, 0, 0)}
+    ctx.slot_data = {1: {}}
+    ctx.clients = {0: {1: []}}
+    ctx.seed_name = "TestSeed"
+    ctx.locations = LocationStore({1: {location: (location, 1, 0) for location in range(1, 11)}})
+    ctx.received_items[0, 1, True] = [NetworkItem(0, -1, 0)]
+    return ctx
+
+
+class _FakeSocket:
+    open = True
+
+
+class TestReplay(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.log = os.path.join(self.tempdir.name, "room.aplog")
+
+        # play a short session on a recorded "room"
+        ctx = make_context()
+        recorder = CommandRecorder(self.log, ctx)
+        client = Client(_FakeSocket(), ctx)
+        recorder.record(client, "connect")
+        await on_client_connected(ctx, client)
+        for msg in ({"cmd": "Connect", "password": None, "name": "Player 1", "game": "__TestGame", "uuid": 0,
+                     "version": version_tuple, "tags": [], "items_handling": 0b111},
+                    {"cmd": "LocationChecks", "locations": [1, 2, 3]},
+                    {"cmd": "Set", "key": "test", "default": 0, "operations": [{"operation": "add", "value": 2}]},
+                    {"cmd": "LocationChecks", "locations": [4]}):
+            recorder.record(client, "cmd", msg)
+            await process_client_cmd(ctx, client, msg)
+        recorder.record(client, "disconnect")
+        await ctx.disconnect(client)
+        recorder.close(ctx)
+        self.recorded = ctx
+
+    async def asyncTearDown(self) -> None:
+        self.tempdir.cleanup()
+
+    async def test_replay(self) -> None:
+        result = await replay_log(make_context(), self.log)
+        self.assertEqual(result.commands, 4)
+        self.assertTrue(result.final_save_recorded)
+        self.assertEqual(result.differences, [])
+        self.assertEqual(result.ctx.location_checks[0, 1], {1, 2, 3, 4})
+        self.assertEqual(result.ctx.stored_data["test"], 2)
+
+    async def test_detects_difference(self) -> None:
+        result = await replay_log(make_context(), self.log)
+        result.ctx.location_checks[0, 1].add(5)
+        final_save = read_log(self.log)[2]
+        self.assertEqual(compare_saves(final_save, result.ctx.get_save()), ["location_checks"])
+
+    async def test_wrong_seed(self) -> None:
+        ctx = make_context()
+        ctx.seed_name = "OtherSeed"
+        with self.assertRaises(Exception):
+            await replay_log(ctx, self.log)
+
+    async def test_server_commands(self) -> None:
+        """Commands from the console and from admins are replayed once, without the admin having to log in."""
+        from MultiServerReplay import _settle
+
+        log = os.path.join(self.tempdir.name, "admin.aplog")
+        ctx = make_context()
+        ctx.server_password = "secret"
+        ctx.recorder = CommandRecorder(log, ctx)
+        client = Client(_FakeSocket(), ctx)
+        ctx.recorder.record(client, "connect")
+        await on_client_connected(ctx, client)
+        for msg in ({"cmd": "Connect", "password": None, "name": "Player 1", "game": "__TestGame", "uuid": 0,
+                     "version": version_tuple, "tags": [], "items_handling": 0b111},
+                    {"cmd": "Say", "text": "!admin login secret"},
+                    {"cmd": "Say", "text": "!admin /release Player 1"}):
+            ctx.recorder.record(client, "cmd", msg)
+            await process_client_cmd(ctx, client, msg)
+        await _settle(ctx)
+        ctx.commandprocessor("/option hint_cost 5")
+        ctx.recorder.close(ctx)
+        self.assertEqual(ctx.location_checks[0, 1], set(range(1, 11)))
+
+        result = await replay_log(make_context(), log)
+        self.assertEqual(result.commands, 5)
+        self.assertEqual(result.differences, [])
+        self.assertEqual(result.ctx.location_checks[0, 1], set(range(1, 11)))
+        self.assertEqual(result.ctx.hint_cost, 5)
+
+    async def test_reconnects(self) -> None:
+        """Clients connecting after others were collected get ids of their own."""
+        log = os.path.join(self.tempdir.name, "reconnect.aplog")
+        ctx = make_context()
+        recorder = CommandRecorder(log, ctx)
+        first, second = Client(_FakeSocket(), ctx), Client(_FakeSocket(), ctx)
+        recorder.record(first, "connect")
+        recorder.record(second, "connect")
+        recorder.record(first, "disconnect")
+        del first
+        gc.collect()
+        third = Client(_FakeSocket(), ctx)
+        recorder.record(third, "connect")
+        recorder.record(second, "disconnect")
+        recorder.record(third, "disconnect")
+        recorder.close(ctx)
+
+        _header, records, _final_save = read_log(log)
+        self.assertEqual([(endpoint_id, event) for _time, endpoint_id, event, _msg in records],
+                         [(1, "connect"), (2, "connect"), (1, "disconnect"), (3, "connect"), (2, "disconnect"),
+                          (3, "disconnect")])
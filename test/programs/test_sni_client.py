@@ -0,0 +1,147 @@
+import asyncio
+import json
+import typing
+import unittest
+from collections import Counter
+
+from SNIClient import SNESState, SNIContext, coalesce_writes, snes_flush_writes, snes_buffered_write, snes_read, \
+    snes_read_multiple, snes_read_watch_list
+
+
+class FakeSNI:
+    """Stands in for the websocket to SNI, answering requests from `memory` and counting them by opcode."""
+
+    def __init__(self, ctx: SNIContext, memory: typing.Dict[int, int]) -> None:
+        self.ctx = ctx
+        self.memory = memory
+        self.requests: typing.Counter[str] = Counter()
+        self.put_address: typing.Optional[int] = None
+        self.open = True
+        self.closed = False
+        ctx.snes_socket = self  # type: ignore
+        ctx.snes_state = SNESState.SNES_ATTACHED
+
+    async def send(self, message: typing.Union[str, bytes]) -> None:
+        if isinstance(message, bytes):
+            assert self.put_address is not None
+            for offset, value in enumerate(message):
+                self.memory[self.put_address + offset] = value
+            self.put_address = None
+            return
+        request = json.loads(message)
+        self.requests[request["Opcode"]] += 1
+        operands = [int(operand, 16) for operand in request["Operands"]]
+        if request["Opcode"] == "GetAddress":
+            data = bytes(self.memory.get(address + offset, 0)
+                         for address, size in zip(operands[::2], operands[1::2]) for offset in range(size))
+            # SNI may split responses into several messages
+            for start in range(0, len(data), 4):
+                self.ctx.snes_recv_queue.put_nowait(data[start:start + 4])
+        elif request["Opcode"] == "PutAddress":
+            self.put_address = operands[0]
+
+    async def close(self) -> None:
+        self.closed = True
+
+
+class WatchingClient:
+    watch_list = [(0x100, 4), (0x200, 2)]
+
+
+class TestSNIReads(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.ctx = SNIContext("", None, None)
+        self.sni = FakeSNI(self.ctx, {address: address & 0xFF for address in range(0x100, 0x300)})
+
+    async def test_read_multiple(self) -> None:
+        results = await snes_read_multiple(self.ctx, [(0x100, 2), (0x2F0, 8), (0x100, 4)])
+        self.assertEqual(results, {0x100: bytes([0, 1, 2, 3]), 0x2F0: bytes(range(0xF0, 0xF8))})
+        self.assertEqual(self.sni.requests, {"GetAddress": 1})
+
+        self.ctx.snes_state = SNESState.SNES_CONNECTED
+        self.assertIsNone(await snes_read_multiple(self.ctx, [(0x100, 2)]))
+
+    async def test_watch_list(self) -> None:
+        await snes_read_watch_list(self.ctx, WatchingClient())  # type: ignore
+        self.assertEqual(self.sni.requests, {"GetAddress": 1})
+        self.assertEqual(await snes_read(self.ctx, 0x101, 2), bytes([1, 2]))
+        self.assertEqual(await snes_read(self.ctx, 0x200, 2), bytes([0, 1]))
+        self.assertEqual(self.sni.requests, {"GetAddress": 1}, "watched ranges are served from the tick's read")
+
+        self.assertEqual(await snes_read(self.ctx, 0x103, 2), bytes([3, 4]))
+        self.assertEqual(self.sni.requests, {"GetAddress": 2}, "exceeds the watched range")
+
+        async def other_task() -> typing.Optional[bytes]:
+            return await snes_read(self.ctx, 0x100, 1)
+        await asyncio.create_task(other_task())
+        self.assertEqual(self.sni.requests, {"GetAddress": 3}, "only the game_watcher tick uses the watched data")
+
+        snes_buffered_write(self.ctx, 0x201, bytes([0xFF]))
+        await snes_flush_writes(self.ctx)
+        self.assertEqual(await snes_read(self.ctx, 0x200, 2), bytes([0, 0xFF]))
+        self.assertEqual(await snes_read(self.ctx, 0x100, 1), bytes([0]))
+        self.assertEqual(self.sni.requests, {"GetAddress": 4, "PutAddress": 1}, "written ranges are read again")
+
+
+class TestSNIWrites(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.ctx = SNIContext("", None, None)
+        self.sni = FakeSNI(self.ctx, {address: 0xEE for address in range(0x100, 0x200)})
+
+    def test_coalesce(self) -> None:
+        coalesced = coalesce_writes([(0x10, b"\x01"), (0x20, b"\x02\x02"), (0x11, b"\x03"), (0x10, b"\x04\x04")])
+        self.assertEqual(coalesced.writes, [(0x10, bytearray(b"\x01")), (0x20, bytearray(b"\x02\x02")),
+                                            (0x10, bytearray(b"\x04\x04"))],
+                         "overlapping and adjacent writes merge into the run right before them")
+        self.assertEqual(coalesced.gaps, [])
+
+        # the flag at 0x200 was buffered after the data at 0x100, but before the one at 0x101
+        coalesced = coalesce_writes([(0x100, b"\x01"), (0x200, b"\x02"), (0x101, b"\x03")])
+        self.assertEqual(coalesced.writes, [(0x100, bytearray(b"\x01")), (0x200, bytearray(b"\x02")),
+                                            (0x101, bytearray(b"\x03"))])
+
+        coalesced = coalesce_writes([(0x10, b"\x01"), (0x13, b"\x02"), (0x20, b"\x03")], gap=2)
+        self.assertEqual(coalesced.writes, [(0x10, bytearray(b"\x01\x00\x00\x02")), (0x20, bytearray(b"\x03"))])
+        self.assertEqual(coalesced.gaps, [(0, 0x11, 2)])
+
+        # bytes between the writes of a run that an earlier run wrote are not read
+        coalesced = coalesce_writes([(0x11, b"\x05"), (0x20, b"\x06"), (0x10, b"\x01"), (0x13, b"\x02")], gap=2)
+        self.assertEqual(coalesced.writes[2], (0x10, bytearray(b"\x01\x05\x00\x02")))
+        self.assertEqual(coalesced.gaps, [(2, 0x12, 1)])
+
+    async def test_flush(self) -> None:
+        self.ctx.snes_write_gap = 4
+        snes_buffered_write(self.ctx, 0x100, b"\x01")
+        snes_buffered_write(self.ctx, 0x103, b"\x02")
+        snes_buffered_write(self.ctx, 0x180, b"\x03")
+        self.assertTrue(await snes_flush_writes(self.ctx))
+        self.assertEqual(self.sni.requests, {"GetAddress": 1, "PutAddress": 2})
+        self.assertEqual([self.sni.memory[address] for address in range(0x100, 0x104)], [1, 0xEE, 0xEE, 2])
+        self.assertEqual(self.sni.memory[0x180], 3)
+
+        snes_buffered_write(self.ctx, 0x101, b"\x04")
+        snes_buffered_write(self.ctx, 0x180, b"\x05")
+        snes_buffered_write(self.ctx, 0x100, b"\x06")
+        snes_buffered_write(self.ctx, 0x103, b"\x07")
+        self.assertTrue(await snes_flush_writes(self.ctx))
+        self.assertEqual([self.sni.memory[address] for address in range(0x100, 0x104)], [6, 4, 0xEE, 7],
+                         "a gap must not undo an earlier run of the same flush")
+
+    async def test_verify(self) -> None:
+        snes_buffered_write(self.ctx, 0x100, b"\x01\x02", verify=True)
+        snes_buffered_write(self.ctx, 0x101, b"\x03")
+        self.assertTrue(await snes_flush_writes(self.ctx))
+        self.assertEqual(self.sni.requests, {"GetAddress": 1, "PutAddress": 1})
+
+        original_send = self.sni.send
+
+        async def drop_writes(message: typing.Union[str, bytes]) -> None:
+            if isinstance(message, str) or self.sni.put_address is None:
+                await original_send(message)
+            else:
+                self.sni.put_address = None
+
+        self.sni.send = drop_writes  # type: ignore
+        snes_buffered_write(self.ctx, 0x100, b"\x04", verify=True)
+        with self.assertLogs("SNES", "WARNING"):
+            self.assertFalse(await snes_flush_writes(self.ctx))
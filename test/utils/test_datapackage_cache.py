@@ -0,0 +1,103 @@
+import os
+import tempfile
+import unittest
+
+import Utils
+from CommonClient import CommonContext
+from Utils import DataPackageNameToId, dump_data_package_binary, load_data_package_binary, \
+    load_data_package_for_checksum, store_data_package_for_checksum
+
+game_data = {
+    "item_name_to_id": {"Sword": 3, "Shield": 1, "Ünicode Item": 2 ** 40},
+    "location_name_to_id": {"Sword": 10, "Chest": 5},
+    "item_name_groups": {"Weapons": ["Sword"]},
+    "location_name_groups": {},
+    "checksum": "0123abcd",
+}
+
+
+class TestBinaryDataPackage(unittest.TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.temp_dir.name, "0123abcd.bin")
+
+    def tearDown(self) -> None:
+        self.temp_dir.cleanup()
+
+    def write(self, data: bytes) -> None:
+        with open(self.path, "wb") as f:
+            f.write(data)
+
+    def test_round_trip(self) -> None:
+        self.write(dump_data_package_binary(game_data))
+        loaded = load_data_package_binary(self.path, "0123abcd")
+        self.assertEqual(loaded["item_name_groups"], {"Weapons": ["Sword"]})
+        self.assertIsInstance(loaded["item_name_to_id"], DataPackageNameToId)
+        self.assertEqual(dict(loaded["item_name_to_id"]), game_data["item_name_to_id"])
+        self.assertEqual(dict(loaded["location_name_to_id"]), game_data["location_name_to_id"])
+
+        id_to_name = loaded["item_name_to_id"].id_to_name
+        self.assertEqual(id_to_name[2 ** 40], "Ünicode Item")
+        self.assertEqual(list(id_to_name), [1, 3, 2 ** 40])
+        self.assertNotIn(4, id_to_name)
+        self.assertEqual(loaded["location_name_to_id"].id_to_name[10], "Sword")
+
+    def test_verification(self) -> None:
+        data = dump_data_package_binary(game_data)
+        self.write(data)
+        with self.assertRaisesRegex(ValueError, "checksum"):
+            load_data_package_binary(self.path, "other")
+        self.write(data[:-1])
+        with self.assertRaisesRegex(ValueError, "damaged"):
+            load_data_package_binary(self.path, "0123abcd")
+        self.write(data[:-1] + bytes([data[-1] ^ 1]))
+        with self.assertRaisesRegex(ValueError, "damaged"):
+            load_data_package_binary(self.path, "0123abcd")
+
+
+class TestDataPackageCache(unittest.TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.old_cache_path = getattr(Utils.cache_path, "cached_path", None)
+        Utils.cache_path.cached_path = self.temp_dir.name
+        self.folder = os.path.join(self.temp_dir.name, "datapackage", "Test Game")
+
+    def tearDown(self) -> None:
+        if self.old_cache_path is None:
+            del Utils.cache_path.cached_path
+        else:
+            Utils.cache_path.cached_path = self.old_cache_path
+        self.temp_dir.cleanup()
+
+    def test_fallback(self) -> None:
+        store_data_package_for_checksum("Test Game", game_data)
+        self.assertEqual(sorted(os.listdir(self.folder)), ["0123abcd.bin", "0123abcd.json"])
+        self.assertIsInstance(load_data_package_for_checksum("Test Game", "0123abcd")["item_name_to_id"],
+                              DataPackageNameToId)
+
+        with open(os.path.join(self.folder, "0123abcd.bin"), "r+b") as f:
+            f.write(b"XXXX")
+        loaded = load_data_package_for_checksum("Test Game", "0123abcd")
+        self.assertEqual(loaded, game_data, "falls back to json")
+        self.assertIsInstance(load_data_package_for_checksum("Test Game", "0123abcd")["item_name_to_id"],
+                              DataPackageNameToId, "binary file is written again")
+
+        os.remove(os.path.join(self.folder, "0123abcd.bin"))
+        os.remove(os.path.join(self.folder, "0123abcd.json"))
+        self.assertEqual(load_data_package_for_checksum("Test Game", "0123abcd"), {})
+
+
+class TestClientLookups(unittest.IsolatedAsyncioTestCase):
+    async def test_binary_lookups(self) -> None:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, "0123abcd.bin")
+            with open(path, "wb") as f:
+                f.write(dump_data_package_binary(game_data))
+            ctx = CommonContext()
+            ctx.update_game(load_data_package_binary(path, "0123abcd"), "Test Game")
+            self.assertEqual(ctx.data_package_checksums["Test Game"], "0123abcd")
+            self.assertEqual(ctx.item_names.lookup_in_game(3, "Test Game"), "Sword")
+            self.assertEqual(ctx.location_names.lookup_in_game(5, "Test Game"), "Chest")
+            self.assertEqual(ctx.item_names.lookup_in_game(4, "Test Game"), "Unknown item (ID: 4)")
+            self.assertEqual(ctx.item_names.lookup_in_game(-1, "Test Game"), "Nothing", "Archipelago items")
+            del ctx
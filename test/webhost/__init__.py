@@ -1,3 +1,4 @@
+import os
 import unittest
 import typing
 from uuid import uuid4
@@ -15,11 +16,18 @@ class TestBase(unittest.TestCase):
         from WebHostLib import app as raw_app
         from WebHost import get_app
 
-        raw_app.config["PONY"] = {
-            "provider": "sqlite",
-            "filename": ":memory:",
-            "create_db": True,
-        }
+        if os.environ.get("WEBHOST_TEST_POSTGRES"):
+            # libpq connection string of an empty database, which the tests fill and clear
+            raw_app.config["PONY"] = {
+                "provider": "postgres",
+                "dsn": os.environ["WEBHOST_TEST_POSTGRES"],
+            }
+        else:
+            raw_app.config["PONY"] = {
+                "provider": "sqlite",
+                "filename": ":memory:",
+                "create_db": True,
+            }
         raw_app.config.update({
             "TESTING": True,
             "DEBUG": True,
@@ -0,0 +1,57 @@
+import gzip
+import json
+import pickle
+
+from . import TestBase
+
+
+class TestDataPackage(TestBase):
+    game_data = {"item_name_groups": {}, "item_name_to_id": {"Item": 1}, "location_name_groups": {},
+                 "location_name_to_id": {"Location": 1}, "checksum": "0123abcd"}
+
+    def setUp(self) -> None:
+        from pony.orm import db_session
+        from WebHostLib.models import GameDataPackage, GameDataPackageJSON
+
+        super().setUp()
+        with db_session:
+            GameDataPackageJSON.select().delete(bulk=True)
+            GameDataPackage.select().delete(bulk=True)
+            # stored before json was, so the first request has to encode it
+            GameDataPackage(checksum=self.game_data["checksum"], data=pickle.dumps(self.game_data))
+        with self.app.test_request_context():
+            from flask import url_for
+            self.url = url_for("api.get_datapackage_by_checksum", checksum=self.game_data["checksum"])
+
+    def test_by_checksum(self) -> None:
+        from pony.orm import db_session
+        from WebHostLib.models import GameDataPackageJSON
+
+        response = self.client.get(self.url, headers={"Accept-Encoding": "gzip"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content_encoding, "gzip")
+        self.assertEqual(response.get_etag(), (self.game_data["checksum"], False))
+        self.assertEqual(json.loads(gzip.decompress(response.data)), self.game_data)
+        with db_session:
+            self.assertEqual(GameDataPackageJSON[self.game_data["checksum"]].data, response.data)
+
+        response = self.client.get(self.url, headers={"Accept-Encoding": "identity"})
+        self.assertIsNone(response.content_encoding)
+        self.assertEqual(response.json, self.game_data)
+
+        response = self.client.get(self.url, headers={"If-None-Match": f'"{self.game_data["checksum"]}"'})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.data, b"")
+        self.assertEqual(self.client.get(self.url.replace("0123abcd", "unknown")).status_code, 404)
+
+    def test_full_datapackage(self) -> None:
+        from worlds import network_data_package
+
+        with self.app.test_request_context():
+            from flask import url_for
+            url = url_for("api.get_datapackage")
+        response = self.client.get(url)
+        self.assertEqual(response.json, json.loads(json.dumps(network_data_package)))
+        etag, weak = response.get_etag()
+        self.assertFalse(weak)
+        self.assertEqual(self.client.get(url, headers={"If-None-Match": f'"{etag}"'}).status_code, 304)
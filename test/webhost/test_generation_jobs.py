@@ -0,0 +1,108 @@
+import json
+import pickle
+from uuid import uuid4
+
+from . import TestBase
+
+
+class TestGenerationJobs(TestBase):
+    def setUp(self) -> None:
+        from pony.orm import db_session, delete
+        from WebHostLib.models import Generation, GenerationJob
+
+        super().setUp()
+        with db_session:
+            delete(job for job in GenerationJob)
+            delete(generation for generation in Generation)
+
+    def queue(self, players: int, owner=None):
+        from pony.orm import db_session
+        from WebHostLib.jobs import queue_generation
+
+        with db_session:
+            return queue_generation({f"Player{player}.yaml": {} for player in range(players)}, {}, owner or uuid4(),
+                                    self.app.config).id
+
+    def test_priority_class(self) -> None:
+        from WebHostLib.jobs import get_priority_class
+
+        owner = uuid4()
+        config = {"GENERATION_PRIORITY_PLAYERS": [2, 8], "GENERATION_PRIORITY_OWNERS": []}
+        self.assertEqual([get_priority_class(players, owner, config) for players in (1, 2, 3, 8, 9)], [0, 0, 1, 1, 2])
+        config["GENERATION_PRIORITY_OWNERS"] = [str(owner)]
+        self.assertEqual(get_priority_class(20, owner, config), 0)
+
+    def test_status_and_progress(self) -> None:
+        from pony.orm import db_session
+        from WebHostLib.jobs import JobProgress
+        from WebHostLib.models import Generation, STATE_STARTED
+
+        first, second = self.queue(10), self.queue(1)
+        with self.app.test_request_context():
+            from flask import url_for
+            urls = [url_for("api.wait_seed_api", seed=generation) for generation in (first, second)]
+        self.assertEqual(self.client.get(urls[0]).json["queue_position"], 2, "the smaller multiworld goes first")
+        self.assertEqual(self.client.get(urls[1]).json["queue_position"], 1)
+
+        with db_session:
+            Generation[second].state = STATE_STARTED
+        progress = JobProgress(second)
+        progress("generate_early")
+        progress("fill")
+        status = self.client.get(urls[1]).json
+        self.assertEqual(status["phase"], "fill")
+        self.assertEqual([phase for phase, _ in status["phases"]], ["generate_early"])
+        self.assertEqual([phase for phase, _ in progress.finish()], ["generate_early", "fill"])
+
+    def test_cancel(self) -> None:
+        from pony.orm import db_session
+        from WebHostLib.jobs import GenerationCancelled, JobProgress
+        from WebHostLib.models import Generation, STATE_ERROR, STATE_STARTED
+
+        owner = uuid4()
+        with self.client.session_transaction() as session:
+            session["_id"] = owner
+        queued, running = self.queue(1, owner), self.queue(1, owner)
+        with db_session:
+            Generation[running].state = STATE_STARTED
+
+        with self.app.test_request_context():
+            from flask import url_for
+            queued_url, running_url = (url_for("api.cancel_seed_api", seed=generation)
+                                       for generation in (queued, running))
+        self.assertEqual(self.client.post(queued_url).status_code, 200)
+        self.assertEqual(self.client.post(running_url).status_code, 200)
+        with db_session:
+            self.assertEqual(Generation[queued].state, STATE_ERROR)
+            self.assertEqual(json.loads(Generation[queued].meta)["error"], "Generation was cancelled.")
+            self.assertEqual(Generation[running].state, STATE_STARTED, "running generations stop on their own")
+        with self.assertRaises(GenerationCancelled):
+            JobProgress(running)("fill")
+
+        self.assertEqual(self.client.post(queued_url).status_code, 409)
+        with self.client.session_transaction() as session:
+            session["_id"] = uuid4()
+        self.assertEqual(self.client.post(running_url).status_code, 403)
+
+    def test_queue_summary(self) -> None:
+        self.queue(1)
+        self.queue(10)
+        with self.app.test_request_context():
+            from flask import url_for
+            url = url_for("api.generation_queue_api")
+        self.app.config["ADMIN_TOKEN"] = None
+        self.assertEqual(self.client.get(url).status_code, 403)
+        self.app.config["ADMIN_TOKEN"] = "secret"
+        self.assertEqual(self.client.get(url, headers={"X-Admin-Token": "wrong"}).status_code, 403)
+        summary = self.client.get(url, headers={"X-Admin-Token": "secret"}).json
+        self.assertEqual((summary["queued"], summary["queued_by_priority"]), (2, {"0": 1, "2": 1}))
+        self.app.config["ADMIN_TOKEN"] = None
+
+    def test_job_for_old_generation(self) -> None:
+        from pony.orm import db_session
+        from WebHostLib.jobs import get_job
+        from WebHostLib.models import Generation
+
+        with db_session:
+            generation = Generation(options=pickle.dumps({"Player1.yaml": {}}), owner=uuid4())
+            self.assertEqual(get_job(generation, self.app.config).players, 1)
@@ -0,0 +1,62 @@
+import typing
+import unittest
+from uuid import UUID, uuid4
+
+from WebHostLib.autolauncher import GenerationScheduler, QueuedGeneration
+
+
+def queued(priority: int = 0, waited: float = 0, owner: typing.Optional[UUID] = None) -> QueuedGeneration:
+    return QueuedGeneration(uuid4(), owner or uuid4(), priority, waited)
+
+
+class TestGenerationScheduling(unittest.TestCase):
+    def run_all(self, scheduler: GenerationScheduler, generations: typing.List[QueuedGeneration]
+                ) -> typing.List[QueuedGeneration]:
+        """Starts generations until the scheduler picks none, returning them in order."""
+        started = []
+        while True:
+            chosen = scheduler.choose(generations)
+            if not chosen:
+                return started
+            generations.remove(chosen)
+            scheduler.start(chosen.id, chosen.owner)
+            started.append(chosen)
+
+    def test_priority_before_age(self) -> None:
+        scheduler = GenerationScheduler(1)
+        large, small = queued(priority=2, waited=10), queued(priority=0)
+        self.assertIs(scheduler.choose([large, small]), small)
+
+        scheduler = GenerationScheduler(1, aging=5)
+        self.assertIs(scheduler.choose([large, small]), large, "waiting should raise the priority class")
+        self.assertIs(scheduler.choose([queued(priority=1, waited=1), large]), large)
+
+    def test_capacity(self) -> None:
+        scheduler = GenerationScheduler(2)
+        generations = [queued(waited=3 - i) for i in range(3)]
+        first, second, third = generations
+        self.assertEqual(self.run_all(scheduler, generations), [first, second])
+        self.assertIsNone(scheduler.choose(generations))
+        scheduler.finish(next(iter(scheduler.running)))
+        self.assertEqual(self.run_all(scheduler, generations), [third])
+
+    def test_fair_share(self) -> None:
+        busy, other = uuid4(), uuid4()
+        scheduler = GenerationScheduler(4)
+        # the busy owner queued first, everything else being equal they would get all generators
+        generations = [queued(owner=busy, waited=10 - i) for i in range(4)] + [queued(owner=other, waited=1)]
+        started = self.run_all(scheduler, generations)
+        self.assertEqual([generation.owner for generation in started], [busy, other, busy, busy])
+
+        scheduler = GenerationScheduler(4, owner_limit=2)
+        generations = [queued(owner=busy, waited=10 - i) for i in range(4)]
+        self.assertEqual(len(self.run_all(scheduler, generations)), 2)
+
+    def test_reserved(self) -> None:
+        scheduler = GenerationScheduler(3, reserved=1)
+        generations = [queued(priority=1, waited=10 - i) for i in range(3)]
+        self.assertEqual(len(self.run_all(scheduler, generations)), 2, "the last generator should be kept free")
+        top = queued(priority=0)
+        self.assertIs(scheduler.choose(generations + [top]), top)
+
+        self.assertEqual(GenerationScheduler(1, reserved=1).reserved, 0, "at least one generator is never reserved")
@@ -191,3 +191,28 @@ class TestHostFakeRoom(TestBase):
         with db_session:
             commands = select(command for command in Command if command.room.id == self.room_id)  # type: ignore
             self.assertNotIn("/help", (command.commandtext for command in commands))
+
+    def test_command_dispatcher(self) -> None:
+        """Verify that commands of all registered rooms are fetched with one poll and handed to their room."""
+        from pony.orm import db_session, select
+        from WebHostLib.customserver import DBCommandDispatcher
+        from WebHostLib.models import Command, Room
+
+        class FakeLoop:
+            @staticmethod
+            def call_soon_threadsafe(callback, *args) -> None:
+                callback(*args)
+
+        received = []
+        dispatcher = DBCommandDispatcher(FakeLoop())  # type: ignore
+        dispatcher.rooms[self.room_id] = received.append  # type: ignore
+        with db_session:
+            room = Room.get(id=self.room_id)
+            Command(room=room, commandtext="/help")
+            Command(room=room, commandtext="/players")
+
+        self.assertEqual(dispatcher.poll(), 2)
+        self.assertEqual(received, ["/help", "/players"])
+        with db_session:
+            self.assertFalse(select(command for command in Command if command.room.id == self.room_id)[:])
+        self.assertEqual(dispatcher.poll(), 0)
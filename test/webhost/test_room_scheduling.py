@@ -0,0 +1,142 @@
+import random
+import typing
+import unittest
+from uuid import UUID, uuid4
+
+from WebHostLib.autolauncher import RoomScheduler
+from WebHostLib.customserver import HosterLoad
+
+
+class SimulatedHoster:
+    """Stand-in for MultiworldInstance, reporting the load of its rooms instead of running them."""
+
+    def __init__(self) -> None:
+        self.room_ids: typing.Set[UUID] = set()
+        self.load = HosterLoad()
+        self.pending_rooms = 0
+        self.pending_slots = 0
+        self.rooms: typing.Dict[UUID, typing.Tuple[int, int]] = {}  # room: (slots, clients)
+        self.loop_lag = 0.0
+        self.rss = 0
+
+    def update(self) -> None:
+        pass
+
+    def start_room(self, room_id: UUID, slots: int = 0) -> None:
+        self.room_ids.add(room_id)
+        self.pending_rooms += 1
+        self.pending_slots += slots
+
+    def shut_down(self, room_id: UUID) -> None:
+        self.room_ids.discard(room_id)
+        del self.rooms[room_id]
+
+    def report(self) -> None:
+        self.load = HosterLoad(len(self.rooms), sum(slots for slots, _ in self.rooms.values()),
+                               sum(clients for _, clients in self.rooms.values()), self.loop_lag, self.rss)
+        self.pending_rooms = self.pending_slots = 0
+
+    @property
+    def clients(self) -> int:
+        return sum(clients for _, clients in self.rooms.values())
+
+
+def synthetic_rooms(rng: random.Random, count: int) -> typing.List[typing.Tuple[UUID, int, int]]:
+    """Mostly small rooms with the occasional 100 slot async, each with a random share of connected slots."""
+    rooms = []
+    for _ in range(count):
+        slots = 100 if rng.random() < 0.05 else rng.randint(1, 8)
+        rooms.append((UUID(int=rng.getrandbits(128)), slots, round(slots * rng.random())))
+    return rooms
+
+
+class TestRoomScheduling(unittest.TestCase):
+    hoster_count = 8
+
+    def setUp(self) -> None:
+        self.hosters = [SimulatedHoster() for _ in range(self.hoster_count)]
+        self.scheduler = RoomScheduler(self.hosters)  # type: ignore
+
+    def place(self, rooms: typing.Iterable[typing.Tuple[UUID, int, int]], report_every: int = 10) -> None:
+        for index, (room_id, slots, clients) in enumerate(rooms):
+            hoster = self.scheduler.start_room(room_id, slots)
+            hoster.rooms[room_id] = slots, clients  # type: ignore
+            if index % report_every == report_every - 1:
+                for simulated in self.hosters:
+                    simulated.report()
+
+    def test_balances_synthetic_load(self) -> None:
+        spread = modulo_spread = 0
+        for seed in range(10):
+            with self.subTest(seed=seed):
+                self.setUp()
+                rooms = synthetic_rooms(random.Random(seed), 400)
+                self.place(rooms)
+
+                clients = [hoster.clients for hoster in self.hosters]
+                self.assertLessEqual(max(clients), sum(clients) / len(clients) * 1.35)
+                big_rooms = [sum(slots == 100 for slots, _ in hoster.rooms.values()) for hoster in self.hosters]
+                self.assertLessEqual(max(big_rooms) - min(big_rooms), 3, "large rooms should be spread out")
+                spread += max(clients) - min(clients)
+
+                modulo = [0] * self.hoster_count
+                for room_id, _, room_clients in rooms:
+                    modulo[room_id.int % self.hoster_count] += room_clients
+                modulo_spread += max(modulo) - min(modulo)
+        self.assertLess(spread, modulo_spread / 2, "should clearly beat placement by room id")
+
+    def test_places_between_reports(self) -> None:
+        """Without any reports, rooms placed since the last one still count towards a hoster's load."""
+        self.place([(uuid4(), 4, 0) for _ in range(16)], report_every=1000)
+        self.assertEqual([len(hoster.rooms) for hoster in self.hosters], [2] * self.hoster_count)
+
+    def test_avoids_memory_limit(self) -> None:
+        self.scheduler.memory_limit = 1000
+        for hoster in self.hosters[1:]:
+            hoster.rss = 2000
+        for hoster in self.hosters:
+            hoster.report()
+        self.place([(uuid4(), 100, 100) for _ in range(5)], report_every=1)
+        self.assertEqual(len(self.hosters[0].rooms), 5, "only hoster below memory limit should get rooms")
+
+        self.hosters[0].rss = 2000
+        self.hosters[0].report()
+        self.place([(uuid4(), 1, 1) for _ in range(7)], report_every=1)
+        self.assertEqual(len(self.hosters[0].rooms), 5, "all above limit should fall back to load")
+
+    def test_measures_rss(self) -> None:
+        """Memory is measured without psutil where /proc is available, and its absence is reported once."""
+        import sys
+        from unittest import mock
+        from WebHostLib import customserver
+
+        self.assertGreater(customserver.get_rss(), 0)
+        with mock.patch.dict(sys.modules, {"psutil": None}):
+            if sys.platform.startswith("linux"):
+                self.assertGreater(customserver.get_rss(), 0)
+            with mock.patch("builtins.open", side_effect=OSError), \
+                    mock.patch.object(customserver, "_rss_unknown_warned", False), \
+                    self.assertLogs(level="WARNING") as logs:
+                self.assertEqual(customserver.get_rss(), 0)
+                self.assertEqual(customserver.get_rss(), 0)
+        self.assertEqual(len(logs.records), 1)
+
+    def test_avoids_loop_lag(self) -> None:
+        self.hosters[0].loop_lag = 1.0
+        for hoster in self.hosters:
+            hoster.report()
+        self.place([(uuid4(), 2, 1) for _ in range(14)], report_every=1)
+        self.assertEqual(len(self.hosters[0].rooms), 0)
+
+    def test_idle_rooms_migrate(self) -> None:
+        rooms = [(uuid4(), 10, 10) for _ in range(self.hoster_count)]
+        self.place(rooms, report_every=1)
+        # everyone on the first hoster leaves, while the rest gets busy
+        moved_room = next(iter(self.hosters[0].rooms))
+        self.hosters[0].shut_down(moved_room)
+        self.place([(uuid4(), 10, 10) for _ in range(self.hoster_count - 1)], report_every=1)
+        for hoster in self.hosters:
+            hoster.report()
+        self.assertFalse(self.scheduler.is_hosted(moved_room))
+        busiest = max(self.hosters, key=lambda hoster: hoster.clients)
+        self.assertIsNot(self.scheduler.start_room(moved_room, 10), busiest)
@@ -0,0 +1,112 @@
+import datetime
+import pickle
+from uuid import uuid4
+
+from . import TestBase
+
+
+class TestRoomStorage(TestBase):
+    """Runs against the database of TestBase, so set WEBHOST_TEST_POSTGRES to check Postgres as well."""
+
+    def setUp(self) -> None:
+        from pony.orm import db_session
+        from WebHostLib.models import Room, Seed
+
+        super().setUp()
+        self.day = datetime.datetime(2024, 5, 1, 12)
+        with db_session:
+            seed = Seed(multidata=b"", owner=uuid4())
+            self.room_ids = [Room(seed=seed, owner=seed.owner, last_activity=self.day, timeout=60).id
+                             for _ in range(3)]
+
+    def test_save_roundtrip(self) -> None:
+        from pony.orm import db_session
+        from WebHostLib.models import Room, RoomSave
+        from WebHostLib.room_storage import load_room_save, store_room_save
+
+        save = {"location_checks": {(0, 1): set(range(500))}, "hints": {}}
+        with db_session:
+            room = Room[self.room_ids[0]]
+            self.assertEqual(load_room_save(room), (None, 0))
+            compressed_size = store_room_save(room, save)
+        with db_session:
+            room = Room[self.room_ids[0]]
+            self.assertEqual(load_room_save(room), (save, len(pickle.dumps(save))))
+            self.assertLess(compressed_size, len(pickle.dumps(save)))
+            save["hints"] = {(0, 1): set()}
+            store_room_save(room, save)
+        with db_session:
+            self.assertEqual(load_room_save(Room[self.room_ids[0]])[0], save)
+            saves = RoomSave.select().count()
+            Room[self.room_ids[0]].delete()
+        with db_session:
+            self.assertEqual(RoomSave.select().count(), saves - 1, "saves should be deleted with their room")
+
+    def test_tracker_sees_new_saves(self) -> None:
+        """Decoded saves are cached until the room saves again, even if its activity was not written since."""
+        from pony.orm import db_session
+        from WebHostLib.models import Room
+        from WebHostLib.room_storage import store_room_save
+        from WebHostLib.tracker import _load_multisave
+
+        with db_session:
+            room = Room[self.room_ids[0]]
+            self.assertEqual(_load_multisave(room), {})
+            store_room_save(room, {"hints": {}})
+        with db_session:
+            self.assertEqual(_load_multisave(Room[self.room_ids[0]]), {"hints": {}})
+            store_room_save(Room[self.room_ids[0]], {"hints": {(0, 1): set()}})
+        with db_session:
+            room = Room[self.room_ids[0]]
+            self.assertEqual(room.last_activity, self.day)
+            self.assertEqual(_load_multisave(room), {"hints": {(0, 1): set()}})
+
+    def test_legacy_multisave(self) -> None:
+        from pony.orm import db_session
+        from WebHostLib.models import Room
+        from WebHostLib.room_storage import load_room_save, store_room_save
+
+        save = {"hints": {}}
+        with db_session:
+            Room[self.room_ids[0]].multisave = pickle.dumps(save)
+        with db_session:
+            room = Room[self.room_ids[0]]
+            self.assertEqual(load_room_save(room)[0], save)
+            store_room_save(room, {"hints": {(0, 1): set()}})
+        with db_session:
+            room = Room[self.room_ids[0]]
+            self.assertIsNone(room.multisave, "the save should have moved out of the room")
+            self.assertEqual(load_room_save(room)[0], {"hints": {(0, 1): set()}})
+
+    def test_bulk_activity(self) -> None:
+        from pony.orm import db_session
+        from WebHostLib.models import Room
+        from WebHostLib.room_storage import get_active_rooms, update_room_activity
+
+        later = self.day + datetime.timedelta(hours=1)
+        with db_session:
+            updated = update_room_activity({self.room_ids[0]: later, self.room_ids[1]: self.day - datetime.timedelta(
+                hours=1), uuid4(): later})
+            self.assertEqual(updated, 1, "activity should only move forward, unknown rooms are ignored")
+        with db_session:
+            self.assertEqual([Room[room_id].last_activity for room_id in self.room_ids], [later, self.day, self.day])
+            active = get_active_rooms(later)
+        self.assertEqual([(room.id, room.last_activity, room.timeout) for room in active],
+                         [(self.room_ids[0], later, 60)])
+
+    def test_publisher_activity(self) -> None:
+        import asyncio
+        import types
+        from pony.orm import db_session
+        from WebHostLib.customserver import SlotProgressPublisher
+        from WebHostLib.models import Room
+
+        later = self.day + datetime.timedelta(hours=1)
+        publisher = SlotProgressPublisher(asyncio.new_event_loop())
+        # rooms without changed progress only have their activity written, never waiting on their event loop
+        ctx = types.SimpleNamespace(room_id=self.room_ids[0], progress_dirty=False, pending_activity=later)
+        publisher.rooms = {ctx.room_id: ctx}
+        self.assertEqual(publisher.publish(), 0)
+        self.assertIsNone(ctx.pending_activity)
+        with db_session:
+            self.assertEqual(Room[ctx.room_id].last_activity, later)
@@ -0,0 +1,208 @@
+import logging
+import pickle
+import unittest
+import zlib
+from uuid import uuid4
+
+from NetUtils import ClientStatus, Hint, LocationStore, NetworkItem, NetworkSlot, SlotType
+from WebHostLib.progress import (ProgressRecord, decode_checked, decode_hints, decode_received, decode_video,
+                                 encode_checked, encode_hints, encode_received, encode_video)
+
+from . import TestBase
+
+
+class TestProgressEncoding(unittest.TestCase):
+    def test_checked(self) -> None:
+        locations = [20, 3, 7, 100, 8, 9, 10, 11, 12, 13]
+        for checked in (set(), {3}, {20, 100, 13}, set(locations)):
+            with self.subTest(checked=checked):
+                data = encode_checked(locations, checked)
+                self.assertEqual(len(data), 2)
+                self.assertEqual(decode_checked(locations, data), checked)
+
+    def test_received(self) -> None:
+        items = [NetworkItem(1, 2, 3, 4), NetworkItem(2 ** 40, -1, 0, 0), NetworkItem(5, -2, 1, 1)]
+        self.assertEqual(decode_received(encode_received(items)), items)
+        self.assertEqual(decode_received(b""), [])
+
+    def test_hints_and_video(self) -> None:
+        hints = {Hint(1, 2, 3, 4, False), Hint(2, 1, 5, 6, True, "Entrance", 1)}
+        self.assertEqual(decode_hints(encode_hints(hints)), hints)
+        self.assertEqual(decode_video(encode_video(("Twitch", "someone"))), ("Twitch", "someone"))
+        self.assertIsNone(decode_video(encode_video(None)))
+
+
+class TestCollectProgress(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        from WebHostLib.customserver import WebHostContext
+
+        static_server_data = {"non_hintable_names": {}, "gamespackage": {},
+                              "item_name_groups": {}, "location_name_groups": {}}
+        self.ctx = WebHostContext(static_server_data, logging.getLogger("TestCollectProgress"))
+        self.ctx.player_names = {(0, 1): "Player 1", (0, 2): "Player 2"}
+        self.ctx.locations = LocationStore({1: {1: (1, 2, 0), 2: (2, 2, 0)}, 2: {3: (3, 1, 0)}})
+
+    async def test_only_changed_slots(self) -> None:
+        self.assertEqual([record.slot for record in self.ctx.collect_progress()], [1, 2])
+        self.assertFalse(self.ctx.progress_dirty)
+        self.assertEqual(self.ctx.collect_progress(), [])
+
+        self.ctx.location_checks[0, 1].add(2)
+        self.ctx.received_items[0, 2, True] = [NetworkItem(2, 2, 1, 0)]
+        self.ctx.save()
+        self.assertTrue(self.ctx.progress_dirty)
+        records = self.ctx.collect_progress()
+        self.assertEqual([record.slot for record in records], [1, 2])
+        self.assertEqual(decode_checked([1, 2], records[0].checked), {2})
+        self.assertEqual(records[1].received_count, 1)
+
+        self.ctx.client_game_state[0, 2] = ClientStatus.CLIENT_GOAL
+        self.assertEqual([(record.slot, record.status) for record in self.ctx.collect_progress()],
+                         [(2, ClientStatus.CLIENT_GOAL)])
+
+
+    async def test_item_link_group(self) -> None:
+        """Groups are in player_names, but have no locations."""
+        self.ctx.player_names[0, 3] = "Group"
+        self.ctx.slot_info = {3: NetworkSlot("Group", "Test Game", SlotType.group, group_members=[1, 2])}
+        self.ctx.received_items[0, 3, True] = [NetworkItem(3, -2, 1, 0)]
+        records = self.ctx.collect_progress()
+        self.assertEqual([record.slot for record in records], [1, 2, 3])
+        self.assertEqual(records[2].checked, b"")
+        self.assertEqual(records[2].received_count, 1)
+
+
+class FakeRoom:
+    """Stands in for a WebHostContext in the publisher."""
+
+    def __init__(self, room_id, records) -> None:
+        self.room_id = room_id
+        self.records = records
+        self.progress_dirty = True
+        self.pending_activity = None
+        self._published_progress = {}
+        self.logger = logging.getLogger("FakeRoom")
+
+    def collect_progress(self):
+        self.progress_dirty = False
+        if isinstance(self.records, Exception):
+            raise self.records
+        return self.records
+
+    def discard_progress(self, records) -> None:
+        from WebHostLib.customserver import WebHostContext
+        WebHostContext.discard_progress(self, records)
+
+
+class TestTrackerProgress(TestBase):
+    def setUp(self) -> None:
+        from pony.orm import db_session
+        from WebHostLib.models import Room, Seed
+
+        super().setUp()
+        multidata = {
+            "seed_name": "0", "slot_data": {1: {}}, "datapackage": {}, "precollected_items": {1: [7]},
+            "slot_info": {1: NetworkSlot("Player 1", "Test Game", SlotType.player)},
+            "locations": {1: {3: (1, 1, 0), 5: (2, 1, 0), 9: (3, 1, 0)}},
+        }
+        with db_session:
+            seed = Seed(multidata=bytes([3]) + zlib.compress(pickle.dumps(multidata)), owner=uuid4())
+            self.room_id = Room(seed=seed, owner=seed.owner, tracker=uuid4()).id
+
+    def test_tracker_reads_progress(self) -> None:
+        from pony.orm import db_session
+        from WebHostLib.customserver import SlotProgressPublisher
+        from WebHostLib.models import Room
+        from WebHostLib.tracker import TrackerData
+
+        received = [NetworkItem(1, 3, 1, 0)]
+        record = ProgressRecord(0, 1, encode_checked([3, 5, 9], {3, 9}), encode_received(received), 1,
+                                encode_hints({Hint(1, 1, 5, 2, False)}), ClientStatus.CLIENT_PLAYING, 1000.0,
+                                "Alias", encode_video(("Twitch", "someone")))
+        self.assertEqual(SlotProgressPublisher.write([(self.room_id, [record])]), 1)
+        self.assertEqual(SlotProgressPublisher.write([(self.room_id, [record._replace(status=30)])]), 1)
+
+        with db_session:
+            tracker_data = TrackerData(Room.get(id=self.room_id))
+            self.assertEqual(tracker_data.get_player_checked_locations(0, 1), {3, 9})
+            self.assertEqual(tracker_data.get_player_missing_locations(0, 1), {5})
+            self.assertEqual(tracker_data.get_player_received_items(0, 1), received)
+            self.assertEqual(tracker_data.get_player_inventory_counts(0, 1), {1: 1, 7: 1})
+            self.assertEqual(tracker_data.get_player_client_status(0, 1), ClientStatus.CLIENT_GOAL)
+            self.assertEqual(tracker_data.get_room_long_player_names()[0, 1], "Alias (Player 1)")
+            self.assertEqual(tracker_data.get_room_videos(), {(0, 1): ("Twitch", "someone")})
+            self.assertEqual(len(tracker_data.get_player_hints(0, 1)), 1)
+
+    def test_publisher_isolates_rooms(self) -> None:
+        """A room failing to collect its progress doesn't stop the other rooms from being published."""
+        import asyncio
+        import threading
+        from pony.orm import db_session
+        from WebHostLib.customserver import SlotProgressPublisher
+        from WebHostLib.models import SlotProgress
+
+        loop = asyncio.new_event_loop()
+        thread = threading.Thread(target=loop.run_forever, daemon=True)
+        thread.start()
+        try:
+            publisher = SlotProgressPublisher(loop)
+            record = ProgressRecord(0, 1, b"", b"", 0, b"", ClientStatus.CLIENT_PLAYING, None, None, None)
+            broken, working = FakeRoom(uuid4(), KeyError(2)), FakeRoom(self.room_id, [record])
+            publisher.rooms = {broken.room_id: broken, working.room_id: working}
+            with self.assertLogs("FakeRoom", logging.ERROR):
+                self.assertEqual(publisher.publish(), 1)
+        finally:
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join()
+        with db_session:
+            self.assertEqual(SlotProgress.select(lambda row: row.room.id == self.room_id).count(), 1)
+
+    def test_unregister_writes_progress(self) -> None:
+        """Progress since the last publish is written when a room shuts down."""
+        import asyncio
+        from pony.orm import db_session
+        from WebHostLib.customserver import SlotProgressPublisher
+        from WebHostLib.models import SlotProgress
+
+        publisher = SlotProgressPublisher(asyncio.new_event_loop())
+        record = ProgressRecord(0, 1, b"", b"", 0, b"", ClientStatus.CLIENT_GOAL, None, None, None)
+        room = FakeRoom(self.room_id, [record])
+        room._published_progress[0, 1] = ("published",)
+        publisher.rooms = {room.room_id: room}
+        publisher.unregister(room)
+        self.assertEqual(publisher.rooms, {})
+        self.assertEqual(room._published_progress, {}, "everything should have been collected again")
+        with db_session:
+            self.assertEqual([row.status for row in SlotProgress.select(lambda row: row.room.id == self.room_id)],
+                             [ClientStatus.CLIENT_GOAL])
+
+    def test_publisher_keeps_failed_changes(self) -> None:
+        """Activity and progress that could not be written are written by the next publish."""
+        import asyncio
+        import datetime
+        import threading
+        from WebHostLib.customserver import SlotProgressPublisher
+
+        class FailingPublisher(SlotProgressPublisher):
+            @staticmethod
+            def write(changes) -> int:
+                raise RuntimeError("database is gone")
+
+        loop = asyncio.new_event_loop()
+        thread = threading.Thread(target=loop.run_forever, daemon=True)
+        thread.start()
+        try:
+            publisher = FailingPublisher(loop)
+            record = ProgressRecord(0, 1, b"", b"", 0, b"", ClientStatus.CLIENT_PLAYING, None, None, None)
+            room = FakeRoom(self.room_id, [record])
+            room._published_progress[0, 1] = ("collected before",)
+            room.pending_activity = activity = datetime.datetime(2024, 5, 1, 12)
+            publisher.rooms = {room.room_id: room}
+            with self.assertRaises(RuntimeError):
+                publisher.publish()
+        finally:
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join()
+        self.assertEqual(room.pending_activity, activity)
+        self.assertTrue(room.progress_dirty)
+        self.assertEqual(room._published_progress, {})
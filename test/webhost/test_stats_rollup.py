@@ -0,0 +1,107 @@
+import datetime
+import typing
+from uuid import uuid4
+
+from . import TestBase
+
+
+class TestStatsRollup(TestBase):
+    def setUp(self) -> None:
+        from pony.orm import db_session, delete
+        from WebHostLib.models import GameStatistics, Room, Seed, Slot
+
+        super().setUp()
+        with db_session:
+            delete(statistics for statistics in GameStatistics)
+            delete(room for room in Room)
+            delete(slot for slot in Slot)
+            delete(seed for seed in Seed)
+
+    @staticmethod
+    def create_seed(games: typing.List[str], creation_time: datetime.datetime):
+        from WebHostLib.models import Seed, Slot
+
+        slots = {Slot(player_id=player, player_name=f"Player {player}", game=game)
+                 for player, game in enumerate(games, 1)}
+        return Seed(multidata=b"", owner=uuid4(), slots=slots, creation_time=creation_time)
+
+    @staticmethod
+    def get_rows() -> typing.Dict[typing.Tuple[datetime.date, str], typing.Tuple[int, ...]]:
+        from pony.orm import select
+        from WebHostLib.models import GameStatistics
+
+        return {(statistics.day, statistics.game): (statistics.seeds, statistics.rooms, statistics.players,
+                                                    statistics.active_rooms)
+                for statistics in select(statistics for statistics in GameStatistics)}
+
+    def test_incremental_matches_backfill(self) -> None:
+        from pony.orm import db_session
+        from WebHostLib.models import GameStatistics, Room
+        from WebHostLib.stats_rollup import backfill, record_activity, record_room, record_seed
+
+        day = datetime.datetime(2024, 5, 1, 12)
+        next_day = day + datetime.timedelta(days=1)
+        with db_session:
+            seed = self.create_seed(["A", "A", "B"], day)
+            record_seed(seed, generation_time=2.5)
+            other_seed = self.create_seed(["B"], day)
+            record_seed(other_seed)
+
+            room = Room(seed=seed, owner=seed.owner, creation_time=day, last_activity=day)
+            record_room(room)
+            record_room(Room(seed=other_seed, owner=seed.owner, creation_time=day, last_activity=day))
+            # only the first activity of a day counts
+            for activity in (day, next_day, next_day + datetime.timedelta(hours=1)):
+                record_activity(room, room.last_activity, activity)
+                room.last_activity = activity
+
+            self.assertEqual(GameStatistics[day.date(), "A"].generation_time, 2.5)
+            self.assertEqual(GameStatistics[day.date(), "B"].generations, 1)
+            incremental = self.get_rows()
+            self.assertEqual(incremental, {
+                (day.date(), "A"): (1, 1, 2, 1),
+                (day.date(), "B"): (2, 2, 2, 2),
+                (next_day.date(), "A"): (0, 0, 0, 1),
+                (next_day.date(), "B"): (0, 0, 0, 1),
+            })
+
+        with db_session:
+            self.assertEqual(backfill(day.date(), next_day.date() + datetime.timedelta(days=1)), 4)
+        with db_session:
+            self.assertEqual(self.get_rows(), incremental)
+            self.assertEqual(GameStatistics[day.date(), "A"].generation_time, 0, "generation times can't be backfilled")
+
+    def test_backfill_keeps_existing_days(self) -> None:
+        from pony.orm import db_session
+        from WebHostLib.stats_rollup import backfill, record_room, record_seed
+        from WebHostLib.models import Room
+
+        old_day = datetime.datetime(2024, 5, 1, 12)
+        day = datetime.datetime(2024, 6, 1, 12)
+        with db_session:
+            seed = self.create_seed(["A"], old_day)
+            Room(seed=seed, owner=seed.owner, creation_time=old_day, last_activity=old_day)
+            new_seed = self.create_seed(["A"], day)
+            record_seed(new_seed)
+            record_room(Room(seed=new_seed, owner=new_seed.owner, creation_time=day, last_activity=day))
+
+        with db_session:
+            self.assertEqual(backfill(), 1, "only days before the first rolled up day should be rebuilt")
+        with db_session:
+            self.assertEqual(self.get_rows(), {(old_day.date(), "A"): (1, 1, 1, 1), (day.date(), "A"): (1, 1, 1, 1)})
+            self.assertEqual(backfill(), 0)
+
+    def test_increment_existing_row(self) -> None:
+        """Increments add to rows another transaction created, instead of inserting them again."""
+        from pony.orm import db_session
+        from WebHostLib.models import GameStatistics
+        from WebHostLib.stats_rollup import _increment
+
+        day = datetime.date(2024, 5, 1)
+        with db_session:
+            GameStatistics(day=day, game="A", seeds=1)
+        with db_session:
+            _increment(day, "A", seeds=1, rooms=2)
+            _increment(day, "B", active_rooms=1)
+        with db_session:
+            self.assertEqual(self.get_rows(), {(day, "A"): (2, 2, 0, 0), (day, "B"): (0, 0, 0, 1)})
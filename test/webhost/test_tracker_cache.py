@@ -0,0 +1,50 @@
+import unittest
+
+from WebHostLib import app
+from WebHostLib.tracker import _DecodedDataCache
+
+
+class TestDecodedDataCache(unittest.TestCase):
+    def setUp(self) -> None:
+        self.cache = _DecodedDataCache()
+        self.cache.blob_memory_factor = 1
+        self.loads = []
+        self.old_limit = app.config["TRACKER_DATA_CACHE_SIZE"]
+        app.config["TRACKER_DATA_CACHE_SIZE"] = 100
+
+    def tearDown(self) -> None:
+        app.config["TRACKER_DATA_CACHE_SIZE"] = self.old_limit
+
+    def get(self, key: str, version: int = 0, size: int = 10) -> str:
+        def load():
+            self.loads.append(key)
+            return f"{key}@{version}", size
+
+        return self.cache.get("test", key, version, load)
+
+    def test_reuses_decoded_data(self) -> None:
+        self.assertEqual(self.get("a"), "a@0")
+        self.assertEqual(self.get("a"), "a@0")
+        self.assertEqual(self.loads, ["a"])
+
+    def test_reloads_changed_version(self) -> None:
+        self.get("a", 0)
+        self.assertEqual(self.get("a", 1), "a@1")
+        self.assertEqual(self.loads, ["a", "a"])
+        self.assertEqual(self.cache.size, 10)
+
+    def test_evicts_least_recently_used(self) -> None:
+        for key in "abcdefghij":
+            self.get(key)
+        self.get("a")  # a is now most recently used
+        self.get("k")
+        self.assertEqual(self.cache.size, 100)
+        self.loads.clear()
+        self.get("a")
+        self.get("b")
+        self.assertEqual(self.loads, ["b"], "least recently used entry should have been evicted")
+
+    def test_keeps_oversized_entry(self) -> None:
+        self.assertEqual(self.get("big", size=1000), "big@0")
+        self.get("big", size=1000)
+        self.assertEqual(self.loads, ["big"])
@@ -0,0 +1,110 @@
+import json
+import pickle
+import typing
+import zlib
+from uuid import uuid4
+
+from NetUtils import ClientStatus, Hint, NetworkItem, NetworkSlot, SlotType
+from WebHostLib.progress import ProgressRecord, encode_checked, encode_hints, encode_received
+
+from . import TestBase
+
+
+class TestTrackerEvents(TestBase):
+    def setUp(self) -> None:
+        from pony.orm import db_session
+        from WebHostLib.models import Room, Seed
+
+        super().setUp()
+        self.app.config.update(TRACKER_EVENTS_INTERVAL=0, TRACKER_EVENTS_DURATION=0, TRACKER_EVENTS_STREAMS=4)
+        multidata = {
+            "seed_name": "0", "slot_data": {1: {}, 2: {}}, "datapackage": {}, "precollected_items": {1: [7], 2: []},
+            "slot_info": {1: NetworkSlot("Player 1", "Test Game", SlotType.player),
+                          2: NetworkSlot("Player 2", "Test Game", SlotType.player)},
+            "locations": {1: {3: (1, 1, 0), 5: (2, 2, 0), 9: (3, 1, 0)}, 2: {4: (4, 1, 0)}},
+        }
+        with db_session:
+            seed = Seed(multidata=bytes([3]) + zlib.compress(pickle.dumps(multidata)), owner=uuid4())
+            room = Room(seed=seed, owner=seed.owner, tracker=uuid4())
+            self.room_id = room.id
+            self.tracker = room.tracker
+
+    def publish(self, slot: int, checked: typing.Set[int], received: typing.List[NetworkItem],
+                hints: typing.Set[Hint] = frozenset(), status: int = ClientStatus.CLIENT_PLAYING) -> None:
+        from WebHostLib.customserver import SlotProgressPublisher
+
+        locations = [3, 5, 9] if slot == 1 else [4]
+        record = ProgressRecord(0, slot, encode_checked(locations, checked), encode_received(received),
+                                len(received), encode_hints(hints), status, None, None, None)
+        SlotProgressPublisher.write([(self.room_id, [record])])
+
+    def get_events(self, url: str, since: int = 0) -> typing.Tuple[int, typing.List[dict]]:
+        response = self.client.get(url, query_string={"since": since})
+        self.assertEqual(response.status_code, 200)
+        return response.json["last_event_id"], response.json["events"]
+
+    def test_room_events(self) -> None:
+        from flask import url_for
+
+        with self.app.test_request_context():
+            url = url_for("get_multiworld_tracker_events", tracker=self.tracker)
+        self.assertEqual(self.get_events(url), (0, []))
+
+        self.publish(1, {3}, [])
+        self.publish(2, set(), [], status=ClientStatus.CLIENT_GOAL)
+        last_event_id, events = self.get_events(url)
+        self.assertGreater(last_event_id, 0)
+        self.assertEqual([(event["slot"], event["status"], event["checks_done"], event["checks_total"])
+                          for event in events],
+                         [(1, ClientStatus.CLIENT_PLAYING, 1, 3), (2, ClientStatus.CLIENT_GOAL, 0, 1)])
+        self.assertNotIn("checked", events[0], "room events should only summarize slots")
+        self.assertEqual(self.get_events(url, last_event_id), (last_event_id, []))
+
+        self.publish(1, {3, 9}, [])
+        newest_event_id, events = self.get_events(url, last_event_id)
+        self.assertGreater(newest_event_id, last_event_id)
+        self.assertEqual([(event["slot"], event["checks_done"]) for event in events], [(1, 2)])
+
+    def test_player_events(self) -> None:
+        from flask import url_for
+
+        with self.app.test_request_context():
+            url = url_for("get_player_tracker_events", tracker=self.tracker, tracked_team=0, tracked_player=1)
+        self.publish(1, {3}, [NetworkItem(1, 4, 2, 0)], {Hint(1, 2, 4, 1, False)})
+        self.publish(2, {4}, [])
+        last_event_id, events = self.get_events(url)
+        self.assertEqual(len(events), 1, "only the tracked slot should be sent")
+        self.assertEqual(events[0]["checked"], [3])
+        self.assertEqual([(entry["index"], entry["order"], entry["item"]) for entry in events[0]["received"]],
+                         [(0, 1, 1)])
+        self.assertEqual([hint["cells"][:2] for hint in events[0]["hints"]], [["Player 2", "Player 1"]],
+                         "finder should come first")
+
+    def test_stream(self) -> None:
+        from flask import url_for
+
+        with self.app.test_request_context():
+            url = url_for("get_player_tracker_events", tracker=self.tracker, tracked_team=0, tracked_player=1)
+        self.publish(1, {3}, [NetworkItem(1, 4, 2, 0)])
+        response = self.client.get(url, headers={"Accept": "text/event-stream"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, "text/event-stream")
+        frames = [frame for frame in response.get_data(as_text=True).split("\n\n") if frame]
+        self.assertTrue(frames[0].startswith("retry: "))
+        fields = dict(line.split(": ", 1) for line in frames[1].splitlines())
+        self.assertEqual(fields["event"], "progress")
+        events = json.loads(fields["data"])
+        self.assertEqual(events[0]["checked"], [3])
+
+        # a reconnecting EventSource continues after the last event it received
+        response = self.client.get(url, headers={"Accept": "text/event-stream", "Last-Event-ID": fields["id"]})
+        self.assertEqual(response.get_data(as_text=True).split("\n\n")[1], ": keep-alive")
+
+    def test_stream_limit(self) -> None:
+        from flask import url_for
+
+        self.app.config["TRACKER_EVENTS_STREAMS"] = 0
+        with self.app.test_request_context():
+            url = url_for("get_multiworld_tracker_events", tracker=self.tracker)
+        self.assertEqual(self.client.get(url, headers={"Accept": "text/event-stream"}).status_code, 503)
+        self.assertEqual(self.client.get(url).status_code, 200, "polling should still be possible")
@@ -0,0 +1,140 @@
+import io
+import pickle
+import random
+import typing
+import unittest
+import zipfile
+import zlib
+from uuid import uuid4
+
+from MultiServer import Context
+from NetUtils import NetworkSlot, SlotType
+from WebHostLib import app
+from WebHostLib.upload import UploadLimitError, load_multidata
+from worlds.AutoWorld import data_package_checksum
+
+from . import TestBase
+
+
+def make_multidata(players: int = 2, padding: int = 0) -> bytes:
+    game_data = {"item_name_groups": {"Everything": ["Item"]}, "item_name_to_id": {"Item": 1},
+                 "location_name_groups": {"Everywhere": ["Location"]}, "location_name_to_id": {"Location": 1}}
+    game_data["checksum"] = data_package_checksum(game_data)
+    multidata = {
+        "slot_info": {player: NetworkSlot(f"Player {player}", "Upload Game", SlotType.player)
+                      for player in range(1, players + 1)},
+        "datapackage": {"Upload Game": game_data},
+        "padding": random.Random(0).randbytes(padding),
+    }
+    return bytes([3]) + zlib.compress(pickle.dumps(multidata), 9)
+
+
+def make_zip(files: typing.Dict[str, bytes]) -> zipfile.ZipFile:
+    data = io.BytesIO()
+    with zipfile.ZipFile(data, "w", zipfile.ZIP_DEFLATED) as zfile:
+        for name, content in files.items():
+            zfile.writestr(name, content)
+    return zipfile.ZipFile(data)
+
+
+class TestLoadMultidata(unittest.TestCase):
+    def setUp(self) -> None:
+        self.old_limit = app.config["MAX_UPLOAD_SIZE"]
+
+    def tearDown(self) -> None:
+        app.config["MAX_UPLOAD_SIZE"] = self.old_limit
+
+    def test_matches_decompress(self) -> None:
+        # large enough to need many reads of the decompressing stream
+        multidata = make_multidata(padding=1024 * 1024)
+        self.assertEqual(load_multidata(multidata), Context.decompress(multidata))
+
+    def test_size_limit(self) -> None:
+        app.config["MAX_UPLOAD_SIZE"] = 512 * 1024
+        with self.assertRaises(UploadLimitError):
+            load_multidata(make_multidata(padding=1024 * 1024))
+        app.config["MAX_UPLOAD_SIZE"] = 0
+        load_multidata(make_multidata(padding=1024 * 1024))
+
+    def test_truncated(self) -> None:
+        with self.assertRaises(zlib.error):
+            load_multidata(make_multidata()[:-10])
+
+
+class TestUpload(TestBase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.old_config = {key: app.config[key] for key in ("MAX_UPLOAD_SIZE", "MAX_UPLOAD_SLOTS")}
+
+    def tearDown(self) -> None:
+        app.config.update(self.old_config)
+
+    def upload(self, files: typing.Union[typing.Dict[str, bytes], zipfile.ZipFile]
+               ) -> typing.Tuple[typing.Any, typing.List[str]]:
+        from flask import get_flashed_messages
+        from pony.orm import db_session
+        from WebHostLib.upload import upload_zip_to_db
+
+        with self.app.test_request_context(), db_session:
+            seed = upload_zip_to_db(files if isinstance(files, zipfile.ZipFile) else make_zip(files), owner=uuid4())
+            return (seed.id if seed else None), get_flashed_messages()
+
+    def test_slot_files(self) -> None:
+        from pony.orm import db_session
+        from WebHostLib.models import Seed
+
+        seed_id, messages = self.upload({"AP_1.archipelago": make_multidata(), "AP_1_P2_Player 2.dat": b"patch",
+                                         "AP_1_Spoiler.txt": b"spoiler"})
+        self.assertEqual(messages, [])
+        with db_session:
+            seed = Seed[seed_id]
+            self.assertEqual({slot.player_id: slot.data for slot in seed.slots}, {1: None, 2: b"patch"})
+            self.assertEqual(seed.spoiler, "spoiler")
+
+    def test_slot_files_memory(self) -> None:
+        """Slot files are written one by one, so the upload's peak memory stays far below all of them together."""
+        import tracemalloc
+        from pony.orm import db_session
+        from WebHostLib.models import Seed
+
+        file_size = 1024 * 1024
+        files = {f"AP_1_P{player}_Player {player}.dat": random.Random(player).randbytes(file_size)
+                 for player in range(1, 17)}
+        zfile = make_zip({"AP_1.archipelago": make_multidata(players=16), **files})
+        tracemalloc.start()
+        try:
+            seed_id, messages = self.upload(zfile)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        self.assertEqual(messages, [])
+        self.assertLess(peak, len(files) * file_size // 2)
+        with db_session:
+            self.assertEqual({slot.player_id: slot.data for slot in Seed[seed_id].slots},
+                             {player: files[f"AP_1_P{player}_Player {player}.dat"] for player in range(1, 17)})
+
+    def test_stores_current_format_as_uploaded(self) -> None:
+        from pony.orm import db_session
+        from WebHostLib.models import Seed
+
+        seed_id, _ = self.upload({"AP_1.archipelago": make_multidata()})
+        with db_session:
+            stored = Seed[seed_id].multidata
+        self.assertEqual(set(Context.decompress(stored)["datapackage"]["Upload Game"]), {"version", "checksum"})
+
+        seed_id, messages = self.upload({"AP_1.archipelago": stored})
+        self.assertEqual(messages, [])
+        with db_session:
+            self.assertEqual(Seed[seed_id].multidata, stored, "stripped multidata should not be recompressed")
+
+    def test_limits(self) -> None:
+        app.config["MAX_UPLOAD_SIZE"] = 1024
+        seed_id, messages = self.upload({"AP_1.archipelago": make_multidata(), "AP_1_P1_Player 1.dat": bytes(2048)})
+        self.assertIsNone(seed_id)
+        self.assertIn("extracts to", messages[0])
+
+        app.config["MAX_UPLOAD_SIZE"] = 0
+        app.config["MAX_UPLOAD_SLOTS"] = 2
+        with self.assertRaisesRegex(UploadLimitError, "3 slots"):
+            self.upload({"AP_1.archipelago": make_multidata(players=3)})
+        self.assertIsNotNone(self.upload({"AP_1.archipelago": make_multidata(players=2)})[0])
@@ -1,7 +1,7 @@
 
 from __future__ import annotations
 import abc
-from typing import TYPE_CHECKING, ClassVar, Dict, Iterable, Tuple, Any, Optional, Union
+from typing import TYPE_CHECKING, ClassVar, Dict, Iterable, Sequence, Tuple, Any, Optional, Union
 
 from typing_extensions import TypeGuard
 
@@ -70,6 +70,10 @@ class SNIClient(abc.ABC, metaclass=AutoSNIClientRegister):
     patch_suffix: ClassVar[Union[str, Iterable[str]]] = ()
     """The file extension(s) this client is meant to open and patch (e.g. ".aplttp")"""
 
+    watch_list: ClassVar[Sequence[Tuple[int, int]]] = ()
+    """(address, size) ranges read every game_watcher tick, before validate_rom, in a single request to SNI.
+    snes_read of ranges within them is served from that read for the rest of the tick, until they get written to."""
+
     @abc.abstractmethod
     async def validate_rom(self, ctx: SNIContext) -> bool:
         """ TODO: interface documentation here """
@@ -7,6 +7,7 @@ naively passed to BizHawk without validation or modification.
 
 import asyncio
 import base64
+import collections
 import enum
 import json
 import sys
@@ -16,6 +17,9 @@ import typing
 BIZHAWK_SOCKET_PORT_RANGE_START = 43055
 BIZHAWK_SOCKET_PORT_RANGE_SIZE = 5
 
+WATCH_SCRIPT_VERSION = 2
+"""The first version of the connector script with the `WATCH` and `WATCH_CHANGES` requests"""
+
 
 class ConnectionStatus(enum.IntEnum):
     NOT_CONNECTED = 1
@@ -46,47 +50,123 @@ class SyncError(Exception):
 class BizHawkContext:
     streams: typing.Optional[typing.Tuple[asyncio.StreamReader, asyncio.StreamWriter]]
     connection_status: ConnectionStatus
+    script_version: typing.Optional[int]
+    """ version of the connector script of the current connection, once `get_script_version` asked for it """
     _lock: asyncio.Lock
     _port: typing.Optional[int]
+    _request_id: int
+    _pending: typing.Deque[typing.Tuple[int, "asyncio.Future[str]"]]
+    """ (request id, future) of sent messages, in the order the connector will respond to them """
+    _receive_task: typing.Optional["asyncio.Task[None]"]
+    _receive_streams: typing.Optional[typing.Tuple[asyncio.StreamReader, asyncio.StreamWriter]]
+    _read_batch: typing.List[typing.Tuple[typing.List[typing.Dict[str, typing.Any]],
+                                          "asyncio.Future[typing.List[typing.Dict[str, typing.Any]]]"]]
+    _read_batch_task: typing.Optional["asyncio.Task[None]"]
 
     def __init__(self) -> None:
         self.streams = None
         self.connection_status = ConnectionStatus.NOT_CONNECTED
+        self.script_version = None
         self._lock = asyncio.Lock()
         self._port = None
-
-    async def _send_message(self, message: str):
-        async with self._lock:
-            if self.streams is None:
-                raise NotConnectedError("You tried to send a request before a connection to BizHawk was made")
-
-            try:
-                reader, writer = self.streams
-                writer.write(message.encode("utf-8") + b"\n")
-                await asyncio.wait_for(writer.drain(), timeout=5)
-
-                res = await asyncio.wait_for(reader.readline(), timeout=5)
-
+        self._request_id = 0
+        self._pending = collections.deque()
+        self._receive_task = None
+        self._receive_streams = None
+        self._read_batch = []
+        self._read_batch_task = None
+
+    def _close(self, streams: typing.Tuple[asyncio.StreamReader, asyncio.StreamWriter],
+               exc: RequestFailedError) -> None:
+        """Closes the connection, failing the requests still waiting for a response with `exc`."""
+        streams[1].close()
+        if self.streams is not streams:
+            return  # already replaced by a new connection
+        self.streams = None
+        self.connection_status = ConnectionStatus.NOT_CONNECTED
+        self.script_version = None
+        while self._pending:
+            _request_id, future = self._pending.popleft()
+            if not future.done():
+                future.set_exception(exc)
+
+    async def _receive(self, streams: typing.Tuple[asyncio.StreamReader, asyncio.StreamWriter]) -> None:
+        """Hands responses to the oldest pending request. The connector handles messages in the order it receives them,
+        so responses arrive in the order of `_pending`."""
+        reader, _writer = streams
+        try:
+            while True:
+                res = await reader.readline()
                 if res == b"":
-                    writer.close()
-                    self.streams = None
-                    self.connection_status = ConnectionStatus.NOT_CONNECTED
                     raise RequestFailedError("Connection closed")
 
                 if self.connection_status == ConnectionStatus.TENTATIVE:
                     self.connection_status = ConnectionStatus.CONNECTED
 
-                return res.decode("utf-8")
-            except asyncio.TimeoutError as exc:
-                writer.close()
-                self.streams = None
-                self.connection_status = ConnectionStatus.NOT_CONNECTED
-                raise RequestFailedError("Connection timed out") from exc
-            except ConnectionResetError as exc:
-                writer.close()
-                self.streams = None
-                self.connection_status = ConnectionStatus.NOT_CONNECTED
-                raise RequestFailedError("Connection reset") from exc
+                if self._pending:
+                    _request_id, future = self._pending.popleft()
+                    if not future.done():
+                        future.set_result(res.decode("utf-8"))
+        except ConnectionResetError:
+            self._close(streams, RequestFailedError("Connection reset"))
+        except RequestFailedError as exc:
+            self._close(streams, exc)
+
+    async def _send_message(self, message: str) -> str:
+        """Sends a message and waits for its response. Doesn't wait for the responses to messages sent before it, so
+        several requests can be on their way to the connector at once."""
+        if self.streams is None:
+            raise NotConnectedError("You tried to send a request before a connection to BizHawk was made")
+
+        streams = self.streams
+        if self._receive_streams is not streams or self._receive_task is None or self._receive_task.done():
+            self._receive_streams = streams
+            self._receive_task = asyncio.create_task(self._receive(streams), name="BizHawkReceive")
+
+        self._request_id += 1
+        future: "asyncio.Future[str]" = asyncio.get_running_loop().create_future()
+        try:
+            async with self._lock:
+                self._pending.append((self._request_id, future))
+                streams[1].write(message.encode("utf-8") + b"\n")
+                await asyncio.wait_for(streams[1].drain(), timeout=5)
+
+            return await asyncio.wait_for(future, timeout=5)
+        except asyncio.TimeoutError as exc:
+            self._close(streams, RequestFailedError("Connection timed out"))
+            raise RequestFailedError("Connection timed out") from exc
+        except ConnectionResetError as exc:
+            self._close(streams, RequestFailedError("Connection reset"))
+            raise RequestFailedError("Connection reset") from exc
+
+    async def _send_reads(self, req_list: typing.List[typing.Dict[str, typing.Any]]
+                          ) -> typing.List[typing.Dict[str, typing.Any]]:
+        """Reads requested during the same iteration of the event loop are sent together as one request list, so they
+        cost one frame of the connector and execute on the same frame."""
+        future: "asyncio.Future[typing.List[typing.Dict[str, typing.Any]]]" = \
+            asyncio.get_running_loop().create_future()
+        self._read_batch.append((req_list, future))
+        if len(self._read_batch) == 1:
+            # starts after the tasks that are ready now had their turn to add their reads
+            self._read_batch_task = asyncio.create_task(self._send_read_batch(), name="BizHawkReads")
+        return await future
+
+    async def _send_read_batch(self) -> None:
+        batch, self._read_batch = self._read_batch, []
+        try:
+            responses = json.loads(await self._send_message(json.dumps([req for req_list, _ in batch
+                                                                         for req in req_list])))
+        except Exception as exc:
+            for _req_list, future in batch:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+
+        start = 0
+        for req_list, future in batch:
+            if not future.done():
+                future.set_result(responses[start:start + len(req_list)])
+            start += len(req_list)
 
 
 async def connect(ctx: BizHawkContext) -> bool:
@@ -99,6 +179,7 @@ async def connect(ctx: BizHawkContext) -> bool:
         try:
             ctx.streams = await asyncio.open_connection("127.0.0.1", port)
             ctx.connection_status = ConnectionStatus.TENTATIVE
+            ctx.script_version = None
             ctx._port = port
             return True
         except (TimeoutError, ConnectionRefusedError):
@@ -113,20 +194,30 @@ async def connect(ctx: BizHawkContext) -> bool:
 def disconnect(ctx: BizHawkContext) -> None:
     """Closes the connection to the connector script."""
     if ctx.streams is not None:
-        ctx.streams[1].close()
-        ctx.streams = None
+        ctx._close(ctx.streams, RequestFailedError("Disconnected"))
     ctx.connection_status = ConnectionStatus.NOT_CONNECTED
 
 
 async def get_script_version(ctx: BizHawkContext) -> int:
-    return int(await ctx._send_message("VERSION"))
+    """Asks the connector script for its version, keeping it in `ctx.script_version` until the connection closes."""
+    streams = ctx.streams
+    script_version = int(await ctx._send_message("VERSION"))
+    if ctx.streams is streams:
+        ctx.script_version = script_version
+    return script_version
 
 
 async def send_requests(ctx: BizHawkContext, req_list: typing.List[typing.Dict[str, typing.Any]]) -> typing.List[typing.Dict[str, typing.Any]]:
     """Sends a list of requests to the BizHawk connector and returns their responses.
 
+    Requests are sent without waiting for earlier ones to complete. Request lists consisting only of reads are merged
+    with reads requested at the same time, executing on the same frame.
+
     It's likely you want to use the wrapper functions instead of this."""
-    responses = json.loads(await ctx._send_message(json.dumps(req_list)))
+    if req_list and all(req["type"] == "READ" for req in req_list):
+        responses = await ctx._send_reads(req_list)
+    else:
+        responses = json.loads(await ctx._send_message(json.dumps(req_list)))
     errors: typing.List[ConnectorError] = []
 
     for response in responses:
@@ -324,3 +415,72 @@ async def write(ctx: BizHawkContext, write_list: typing.Sequence[typing.Tuple[in
     - `value` is a list of bytes to write, in order, starting at `address`
     - `domain` is the name of the region of memory the address corresponds to"""
     await guarded_write(ctx, write_list, [])
+
+
+class WatchList:
+    """Ranges of memory checked together every time, keeping the data of the last check to tell which ranges changed.
+
+    Items in `ranges` should be organized `(address, size, domain)` like for `read`. The ranges are registered with the
+    connector script, which compares them and sends only the ones that changed. Scripts older than
+    `WATCH_SCRIPT_VERSION` can't, so for them all ranges are read and compared here instead.
+
+    The connector keeps one watch list per connection, so only one `WatchList` should be updated per connection."""
+    ranges: typing.List[typing.Tuple[int, int, str]]
+    data: typing.Dict[typing.Tuple[int, int, str], bytes]
+    _watching: typing.Optional[typing.Tuple[asyncio.StreamReader, asyncio.StreamWriter]]
+    """ the connection the ranges were registered with """
+
+    def __init__(self, ranges: typing.Iterable[typing.Tuple[int, int, str]]) -> None:
+        self.ranges = list(ranges)
+        self.data = {}
+        self._watching = None
+
+    def reset(self) -> None:
+        """Forgets the data read, so the next update reports all ranges as changed."""
+        self.data.clear()
+        self._watching = None
+
+    def forget(self, ranges: typing.Iterable[typing.Tuple[int, int, str]]) -> None:
+        """Forgets the data of some ranges, so the next update reports them as changed again."""
+        for watched in ranges:
+            self.data.pop(watched, None)
+        # registering again makes the connector report all ranges, of which the unchanged ones are filtered out here
+        self._watching = None
+
+    async def update(self, ctx: BizHawkContext) -> typing.Dict[typing.Tuple[int, int, str], bytes]:
+        """Checks all ranges, returning the data of the ones that changed since the last update."""
+        if not self.ranges:
+            return {}
+
+        streams = ctx.streams
+        script_version = ctx.script_version
+        if script_version is None:
+            script_version = await get_script_version(ctx)
+
+        changed: typing.Dict[typing.Tuple[int, int, str], bytes]
+        if script_version < WATCH_SCRIPT_VERSION:
+            changed = {watched: data for watched, data in zip(self.ranges, await read(ctx, self.ranges))
+                       if self.data.get(watched) != data}
+        else:
+            req_list: typing.List[typing.Dict[str, typing.Any]] = [{"type": "WATCH_CHANGES"}]
+            if self._watching is not streams:
+                # a new connection or a reset, after which the connector reports all ranges again
+                req_list.insert(0, {
+                    "type": "WATCH",
+                    "ranges": [{"address": address, "size": size, "domain": domain}
+                               for address, size, domain in self.ranges],
+                })
+            res = (await send_requests(ctx, req_list))[-1]
+            if res["type"] != "WATCH_CHANGES_RESPONSE":
+                raise SyncError(f"Expected response of type WATCH_CHANGES_RESPONSE but got {res['type']}")
+            self._watching = streams
+
+            changed = {}
+            for change in res["value"]:
+                watched = self.ranges[change["index"]]
+                data = base64.b64decode(change["value"])
+                if self.data.get(watched) != data:
+                    changed[watched] = data
+
+        self.data.update(changed)
+        return changed
@@ -5,7 +5,7 @@ A module containing the BizHawkClient base class and metaclass
 from __future__ import annotations
 
 import abc
-from typing import TYPE_CHECKING, Any, ClassVar, Dict, Optional, Tuple, Union
+from typing import TYPE_CHECKING, Any, ClassVar, Dict, Optional, Sequence, Tuple, Union
 
 from worlds.LauncherComponents import Component, SuffixIdentifier, Type, components, launch_subprocess
 
@@ -74,6 +74,10 @@ class BizHawkClient(abc.ABC, metaclass=AutoBizHawkClientRegister):
     patch_suffix: ClassVar[Optional[Union[str, Tuple[str, ...]]]]
     """The file extension(s) this client is meant to open and patch (e.g. ".apz3")"""
 
+    watch_list: ClassVar[Sequence[Tuple[int, int, str]]] = ()
+    """`(address, size, domain)` ranges of memory to watch. They are checked in one request before every call to
+    `game_watcher`, and `on_memory_changed` is called with the ones whose data changed."""
+
     @abc.abstractmethod
     async def validate_rom(self, ctx: "BizHawkClientContext") -> bool:
         """Should return whether the currently loaded ROM should be handled by this client. You might read the game name
@@ -96,6 +100,14 @@ class BizHawkClient(abc.ABC, metaclass=AutoBizHawkClientRegister):
         to have passed your validator when this function is called, and the emulator is very likely to be connected."""
         ...
 
+    async def on_memory_changed(self, ctx: "BizHawkClientContext",
+                                changed: Dict[Tuple[int, int, str], bytes]) -> None:
+        """Called before `game_watcher` with the data of the ranges in `watch_list` that changed since the last loop,
+        keyed by their entry in `watch_list`. The first loop after connecting or loading a ROM reports all of them. The
+        latest data of every watched range is in `ctx.watched_memory.data`, so `game_watcher` doesn't have to read
+        it again."""
+        pass
+
     def on_package(self, ctx: "BizHawkClientContext", cmd: str, args: dict) -> None:
         """For handling packages from the server. Called from `BizHawkClientContext.on_package`."""
         pass
@@ -12,12 +12,14 @@ from CommonClient import CommonContext, ClientCommandProcessor, get_base_parser,
 import Patch
 import Utils
 
-from . import BizHawkContext, ConnectionStatus, NotConnectedError, RequestFailedError, connect, disconnect, get_hash, \
-    get_script_version, get_system, ping
+from . import BizHawkContext, ConnectionStatus, NotConnectedError, RequestFailedError, WatchList, connect, disconnect, \
+    get_hash, get_script_version, get_system, ping
 from .client import BizHawkClient, AutoBizHawkClientRegister
 
 
-EXPECTED_SCRIPT_VERSION = 1
+EXPECTED_SCRIPT_VERSION = 2
+MINIMUM_SCRIPT_VERSION = 1
+"""Older connector scripts still work, without the requests added since then"""
 
 
 class AuthStatus(enum.IntEnum):
@@ -47,6 +49,8 @@ class BizHawkClientContext(CommonContext):
     slot_data: Optional[Dict[str, Any]] = None
     rom_hash: Optional[str] = None
     bizhawk_ctx: BizHawkContext
+    watched_memory: WatchList
+    """The `watch_list` of the client handler, with the data of the last loop"""
 
     watcher_timeout: float
     """The maximum amount of time the game watcher loop will wait for an update from the server before executing"""
@@ -57,6 +61,7 @@ class BizHawkClientContext(CommonContext):
         self.password_requested = False
         self.client_handler = None
         self.bizhawk_ctx = BizHawkContext()
+        self.watched_memory = WatchList([])
         self.watcher_timeout = 0.5
 
     def make_gui(self):
@@ -103,6 +108,21 @@ class BizHawkClientContext(CommonContext):
         await super().disconnect(allow_autoreconnect)
 
 
+async def _watch_memory(ctx: BizHawkClientContext) -> None:
+    """Updates the handler's watch list, telling it about ranges that changed."""
+    assert ctx.client_handler is not None
+    if ctx.watched_memory.ranges != list(ctx.client_handler.watch_list):
+        ctx.watched_memory = WatchList(ctx.client_handler.watch_list)
+    changed = await ctx.watched_memory.update(ctx.bizhawk_ctx)
+    if changed:
+        try:
+            await ctx.client_handler.on_memory_changed(ctx, changed)
+        except BaseException:
+            # report these changes again next time
+            ctx.watched_memory.forget(changed)
+            raise
+
+
 async def _game_watcher(ctx: BizHawkClientContext):
     showed_connecting_message = False
     showed_connected_message = False
@@ -138,13 +158,14 @@ async def _game_watcher(ctx: BizHawkClientContext):
                     # Failed to connect
                     continue
 
+                ctx.watched_memory.reset()
                 showed_no_handler_message = False
 
                 script_version = await get_script_version(ctx.bizhawk_ctx)
 
-                if script_version != EXPECTED_SCRIPT_VERSION:
-                    logger.info(f"Connector script is incompatible. Expected version {EXPECTED_SCRIPT_VERSION} but "
-                                f"got {script_version}. Disconnecting.")
+                if not MINIMUM_SCRIPT_VERSION <= script_version <= EXPECTED_SCRIPT_VERSION:
+                    logger.info(f"Connector script is incompatible. Expected version {MINIMUM_SCRIPT_VERSION} to "
+                                f"{EXPECTED_SCRIPT_VERSION} but got {script_version}. Disconnecting.")
                     disconnect(ctx.bizhawk_ctx)
                     continue
 
@@ -165,6 +186,7 @@ async def _game_watcher(ctx: BizHawkClientContext):
                 ctx.username = None
                 ctx.client_handler = None
                 ctx.finished_game = False
+                ctx.watched_memory.reset()
                 await ctx.disconnect(False)
             ctx.rom_hash = rom_hash
 
@@ -182,6 +204,8 @@ async def _game_watcher(ctx: BizHawkClientContext):
                     showed_no_handler_message = False
                     logger.info(f"Running handler for {ctx.client_handler.game}")
 
+            await _watch_memory(ctx)
+
         except RequestFailedError as exc:
             logger.info(f"Lost connection to BizHawk: {exc.args[0]}")
             continue
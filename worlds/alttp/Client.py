@@ -472,6 +472,12 @@ async def track_locations(ctx, roomid, roomdata) -> bool:
 class ALTTPSNIClient(SNIClient):
     game = "A Link to the Past"
     patch_suffix = [".aplttp", ".apz3"]
+    watch_list = [
+        (ROMNAME_START, ROMNAME_SIZE + 1),  # including DEATH_LINK_ACTIVE_ADDR
+        (WRAM_START + 0x10, 1),  # game mode
+        (SAVEDATA_START + 0x42E, 0x443 + 1 - 0x42E),  # game timer to game end
+        (RECV_PROGRESS_ADDR, 8),
+    ]
 
     async def deathlink_kill_player(self, ctx):
         from SNIClient import DeathState, snes_read, snes_buffered_write, snes_flush_writes
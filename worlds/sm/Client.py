@@ -38,6 +38,13 @@ SM_REMOTE_ITEM_FLAG_ADDR = ROM_START + 0x277F06    # 1 byte
 class SMSNIClient(SNIClient):
     game = "Super Metroid"
     patch_suffix = [".apsm", ".apm3"]
+    watch_list = [
+        (SM_ROMNAME_START, ROMNAME_SIZE),
+        (SM_DEATH_LINK_ACTIVE_ADDR, SM_REMOTE_ITEM_FLAG_ADDR + 1 - SM_DEATH_LINK_ACTIVE_ADDR),
+        (WRAM_START + 0x0998, 1),  # game mode
+        (SM_SEND_QUEUE_RCOUNT, 4),  # including SM_SEND_QUEUE_WCOUNT
+        (SM_RECV_QUEUE_WCOUNT, 2),
+    ]
 
     async def deathlink_kill_player(self, ctx):
         from SNIClient import DeathState, snes_buffered_write, snes_flush_writes, snes_read
@@ -4,7 +4,7 @@ import asyncio
 import collections
 import time
 import traceback
-from typing import Any, Dict, List, Optional, Set, Tuple
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
 from dataclasses import dataclass
 
 import ModuleUpdate
@@ -12,6 +12,7 @@ from .options import SmsOptions
 from .bit_helper import change_endian, bit_flagger, extract_bits
 import dolphin_memory_engine as dme
 from . import addresses
+from .memory import DolphinMemory, MemorySnapshot
 
 ModuleUpdate.update()
 
@@ -71,7 +72,9 @@ class SmsCommandProcessor(ClientCommandProcessor):
         """Manually trigger a resync."""
         self.output(f"Syncing items.")
         self.ctx.syncing = True
+        self.ctx.reapply_items = True
         refresh_collection_counts(self.ctx)
+        self.ctx.memory.flush()
 
 
 class SmsContext(CommonContext):
@@ -103,14 +106,27 @@ class SmsContext(CommonContext):
 
     ap_nozzles_received = []
 
+    location_resend_delay = 10.0
+    """ seconds the server has to acknowledge a check, before the client resyncs """
+
     def __init__(self, server_address, password):
         super(SmsContext, self).__init__(server_address, password)
         self.send_index: int = 0
+        self.locations_sent: Dict[int, float] = {}
+        """ checks sent to the server that it has not acknowledged yet, with the time they were sent """
+        self.items_applied: int = 0
+        """ index into items_received up to which items were applied to the game """
+        self.item_counts: Optional[collections.Counter[int]] = collections.Counter()
+        """ of the applied items, None while they still have to be counted from items_received """
+        self.reapply_items: bool = False
+        """ set when the game may have lost applied items, by a stage change or reloading the save """
+        self.next_stage: Optional[int] = None
         self.syncing = False
         self.awaiting_bridge = False
         self.dolphin_sync_task: Optional[asyncio.Task[None]] = None
         self.dolphin_status: str = CONNECTION_INITIAL_STATUS
         self.awaiting_rom: bool = False
+        self.memory = MemorySnapshot(DolphinMemory())
 
     async def server_auth(self, password_requested: bool = False):
         if password_requested and not self.password:
@@ -138,8 +154,41 @@ class SmsContext(CommonContext):
         self.ui = SmsManager(self)
         self.ui_task = asyncio.create_task(self.ui.async_run(), name="UI")
 
+    async def send_new_checks(self) -> None:
+        """Sends the checks the server doesn't know of yet. Connecting already sends all of them, so this only sends
+        new ones, unless the server failed to acknowledge some, which means client and server are out of sync."""
+        if self.slot is None:
+            return
+        now = time.monotonic()
+        pending = self.locations_checked & self.missing_locations
+        self.locations_sent = {location: sent for location, sent in self.locations_sent.items()
+                               if location in pending}
+        if any(now - sent > self.location_resend_delay for sent in self.locations_sent.values()):
+            logger.info("Server did not acknowledge checks, resyncing.")
+            self.locations_sent = {}
+            await self.send_msgs([{"cmd": "Sync"}])
+        new = pending - self.locations_sent.keys()
+        if new:
+            await self.send_msgs([{"cmd": "LocationChecks", "locations": list(new)}])
+            self.locations_sent.update(dict.fromkeys(new, now))
+
+    @property
+    def items_applied_key(self) -> str:
+        return f"{self.seed_name}_{self.team}_{self.slot}"
+
+    def store_items_applied(self) -> None:
+        if self.seed_name:
+            Utils.persistent_store("sms_items_applied", self.items_applied_key, self.items_applied)
+
     def on_package(self, cmd: str, args: dict):
         if cmd == "Connected":
+            # connecting sent all checks, including the ones we were waiting on
+            self.locations_sent = dict.fromkeys(self.locations_checked, time.monotonic())
+            # a game left running while the client restarted still has the items applied before
+            applied = Utils.persistent_load().get("sms_items_applied", {}).get(self.items_applied_key, 0)
+            if applied != self.items_applied:
+                self.items_applied = applied
+                self.item_counts = None
             slot_data = args.get("slot_data")
             self.goal = slot_data.get("corona_mountain_shines")
             temp = slot_data.get("blue_coin_sanity")
@@ -181,11 +230,7 @@ def game_start():
 
 async def game_watcher(ctx: SmsContext):
     while not ctx.exit_event.is_set():
-
-        sync_msg = [{'cmd': 'Sync'}]
-        if ctx.locations_checked:
-            sync_msg.append({"cmd": "LocationChecks", "locations": list(ctx.locations_checked)})
-        await ctx.send_msgs(sync_msg)
+        await ctx.send_new_checks()
 
         #Gravi01 Begin      
         '''
@@ -196,6 +241,7 @@ async def game_watcher(ctx: SmsContext):
         if ctx.dolphin_status == CONNECTION_CONNECTED_STATUS:
             try:
                 refresh_collection_counts(ctx)
+                ctx.memory.flush()
             except Exception:
                 logger.info("Connection to Dolphin lost, reconnecting...")
                 ctx.dolphin_status = CONNECTION_LOST_STATUS
@@ -203,9 +249,7 @@ async def game_watcher(ctx: SmsContext):
         ctx.lives_switch = True
         #Gravi01 End
 
-        if ctx.victory and not ctx.finished_game:
-            await ctx.send_msgs([{"cmd": "StatusUpdate", "status": ClientStatus.CLIENT_GOAL}])
-            ctx.finished_game = True
+        await complete_goal(ctx)
 
         await asyncio.sleep(0.2)
         ctx.lives_switch = False
@@ -213,13 +257,10 @@ async def game_watcher(ctx: SmsContext):
 
 async def location_watcher(ctx):
     def _sub():
-        if not dme.is_hooked():
+        if not ctx.memory.is_hooked():
             return
 
-        for x in range(0, addresses.SMS_SHINE_BYTE_COUNT):
-            targ_location = addresses.SMS_SHINE_LOCATION_OFFSET + x
-            cache_byte = dme.read_byte(targ_location)
-            curShines[x] = cache_byte
+        curShines[:] = ctx.memory.read_bytes(addresses.SMS_SHINE_LOCATION_OFFSET, addresses.SMS_SHINE_BYTE_COUNT)
 
         if storedShines != curShines:
             memory_changed(ctx)
@@ -266,6 +307,8 @@ async def dolphin_sync_task(ctx: SmsContext) -> None:
                         logger.info(CONNECTION_CONNECTED_STATUS)
                         ctx.dolphin_status = CONNECTION_CONNECTED_STATUS
                         ctx.locations_checked = set()
+                        ctx.memory.invalidate()
+                        ctx.reapply_items = True
                 else:
                     logger.info("Connection to Dolphin failed, attempting again in 5 seconds...")
                     dme_status = dme.get_status()
@@ -284,14 +327,20 @@ async def dolphin_sync_task(ctx: SmsContext) -> None:
         
 
 async def arbitrary_ram_checks(ctx):
-    activated_bits = dme.read_byte(addresses.ARB_NOZZLES_ENABLER)
-
-    while dme.is_hooked():
-        for noz in ctx.ap_nozzles_received:
-            if noz < 4:
-                activated_bits = bit_flagger(activated_bits, noz, True)
-                dme.write_byte(addresses.ARB_FLUDD_ENABLER, 0x1)
-                dme.write_byte(addresses.ARB_NOZZLES_ENABLER, activated_bits)
+    while not ctx.exit_event.is_set():
+        if ctx.dolphin_status == CONNECTION_CONNECTED_STATUS:
+            try:
+                activated_bits = ctx.memory.read_byte(addresses.ARB_NOZZLES_ENABLER)
+                for noz in ctx.ap_nozzles_received:
+                    if noz < 4:
+                        activated_bits = bit_flagger(activated_bits, noz, True)
+                        ctx.memory.write_byte(addresses.ARB_FLUDD_ENABLER, 0x1)
+                        ctx.memory.write_byte(addresses.ARB_NOZZLES_ENABLER, activated_bits)
+                ctx.memory.flush()
+            except Exception:
+                logger.info("Connection to Dolphin lost, reconnecting...")
+                ctx.dolphin_status = CONNECTION_LOST_STATUS
+                dme.un_hook()
         await asyncio.sleep(delaySeconds)
 
 
@@ -306,38 +355,36 @@ def memory_changed(ctx: SmsContext):
     parse_bits(bit_list, ctx)
 
 
-def send_victory(ctx: SmsContext):
-    if ctx.victory:
-        return
+CREDITS = [
+    "Congratulations on completing your seed!",
+    "ARCHIPELAGO SUPER MARIO SUNSHINE CREDITS:",
+    "MrsMarinaRose - Client, Modding and Patching",
+    "Hatkirby - APworld",
+    "ScorelessPine - Original Manual",
+    "Fedora - Logic and testing",
+    "J2Slow - Logic and testing",
+    "Quizzeh - Extra testing",
+    "Spicynun - Additional research",
+    "JoshuaMKW - Sunshine Toolset",
+    "All Archipelago core devs",
+    "Nintendo EAD",
+    "...and you. Thanks for playing!",
+]
 
+
+def send_victory(ctx: SmsContext):
+    """Marks the goal as reached, game_watcher reports it through complete_goal."""
     ctx.victory = True
-    ctx.send_msgs([{"cmd": "StatusUpdate", "status": ClientStatus.CLIENT_GOAL}])
-    logger.info("Congratulations on completing your seed!")
-    time.sleep(.05)
-    logger.info("ARCHIPELAGO SUPER MARIO SUNSHINE CREDITS:")
-    time.sleep(.05)
-    logger.info("MrsMarinaRose - Client, Modding and Patching")
-    time.sleep(.05)
-    logger.info("Hatkirby - APworld")
-    time.sleep(.05)
-    logger.info("ScorelessPine - Original Manual")
-    time.sleep(.05)
-    logger.info("Fedora - Logic and testing")
-    time.sleep(.05)
-    logger.info("J2Slow - Logic and testing")
-    time.sleep(.05)
-    logger.info("Quizzeh - Extra testing")
-    time.sleep(.05)
-    logger.info("Spicynun - Additional research")
-    time.sleep(.05)
-    logger.info("JoshuaMKW - Sunshine Toolset")
-    time.sleep(.05)
-    logger.info("All Archipelago core devs")
-    time.sleep(.05)
-    logger.info("Nintendo EAD")
-    time.sleep(.05)
-    logger.info("...and you. Thanks for playing!")
-    return
+
+
+async def complete_goal(ctx: SmsContext) -> None:
+    """Reports the goal once the client is connected to a slot. Reconnecting reports it again from finished_game,
+    so the credits are only shown the first time."""
+    if not ctx.victory or ctx.finished_game or ctx.slot is None:
+        return
+    await ctx.send_msgs([{"cmd": "StatusUpdate", "status": ClientStatus.CLIENT_GOAL}])
+    ctx.finished_game = True
+    ctx.schedule_messages(CREDITS)
 
 
 def parse_bits(all_bits, ctx: SmsContext):
@@ -364,12 +411,11 @@ def get_shine_id(location, value):
 
 
 def refresh_item_count(ctx, item_id, targ_address):
-    counts = collections.Counter(received_item.item for received_item in ctx.items_received)
-    temp = change_endian(counts[item_id])
+    temp = change_endian(ctx.item_counts[item_id])
     #Gravi01 Begin      #Stacktrace where the original Exception was thrown. Keeping the changes in this place as well, you still land here without connection, due to it being an async task
     if ctx.dolphin_status == CONNECTION_CONNECTED_STATUS:
         try:
-            dme.write_byte(targ_address, temp) 
+            ctx.memory.write_byte(targ_address, temp)
         except Exception:
             logger.info("Connection to Dolphin lost, reconnecting...")
             ctx.dolphin_status = CONNECTION_LOST_STATUS
@@ -377,44 +423,70 @@ def refresh_item_count(ctx, item_id, targ_address):
     #Gravi01 End
 
 
-def refresh_all_items(ctx: SmsContext):
-    counts = collections.Counter(received_item.item for received_item in ctx.items_received)
-    for items in counts:
-        if counts[items] > 0:
-            unpack_item(items, ctx, counts[items])
-    if counts[523004] >= ctx.get_corona_goal():
-        activate_ticket(999999)
+def refresh_all_items(ctx: SmsContext, items: Iterable[int]):
+    for item in items:
+        if ctx.item_counts[item] > 0:
+            unpack_item(item, ctx, ctx.item_counts[item])
+    if ctx.item_counts[523004] >= ctx.get_corona_goal():
+        activate_ticket(999999, ctx)
         if not ctx.corona_message_given:
             logger.info("Corona Mountain requirements reached! Reload Delfino Plaza to unlock.")
             ctx.corona_message_given = True
 
 
 def refresh_collection_counts(ctx):
+    """Applies the items received since the last call. All of them are applied again if the game may have lost them,
+    which is noticed by the shine counter not matching the received shines, or flagged by a stage change."""
+    received = ctx.items_received
+    if len(received) < ctx.items_applied:
+        if ctx.item_counts is None and not received:
+            return  # the applied index was restored, wait for ReceivedItems to count what it covers
+        # connected to another slot since
+        ctx.items_applied = 0
+        ctx.item_counts = collections.Counter()
+    elif ctx.item_counts is None:
+        ctx.item_counts = collections.Counter(item.item for item in received[:ctx.items_applied])
+    if ctx.memory.read_byte(addresses.SMS_SHINE_COUNTER) != change_endian(ctx.item_counts[523004]):
+        ctx.reapply_items = True
+
+    new_items = [item.item for item in received[ctx.items_applied:]]
+    ctx.item_counts.update(new_items)
+    if ctx.reapply_items:
+        ctx.reapply_items = False
+        items = list(ctx.item_counts)
+    elif new_items:
+        items = list(dict.fromkeys(new_items))
+    else:
+        return
+
     #if debug: logger.info("refresh_collection_counts")
     refresh_item_count(ctx, 523004, addresses.SMS_SHINE_COUNTER)
     if ctx.blue_status == 1:
         refresh_item_count(ctx, 523014, addresses.SMS_BLUECOIN_COUNTER)
-    refresh_all_items(ctx)
+    refresh_all_items(ctx, items)
+    if ctx.items_applied != len(received):
+        ctx.items_applied = len(received)
+        ctx.store_items_applied()
 
 
-def check_world_flags(byte_location, byte_pos, bool_setting):
+def check_world_flags(byte_location, byte_pos, bool_setting, ctx: SmsContext):
     if world_flags.get(byte_location):
         byte_value = world_flags.get(byte_location)
     else:
-        byte_value = dme.read_byte(byte_location)
+        byte_value = ctx.memory.read_byte(byte_location)
     byte_value = bit_flagger(byte_value, byte_pos, bool_setting)
     world_flags.update({byte_location: byte_value})
     return byte_value
 
 
-def open_stage(ticket):
-    value = check_world_flags(ticket.address, ticket.bit_position, True)
-    dme.write_byte(ticket.address, value)
+def open_stage(ticket, ctx: SmsContext):
+    value = check_world_flags(ticket.address, ticket.bit_position, True, ctx)
+    ctx.memory.write_byte(ticket.address, value)
     return
 
 
-def special_noki_handling():
-    dme.write_byte(addresses.SMS_NOKI_REQ, addresses.SMS_NOKI_LO)
+def special_noki_handling(ctx: SmsContext):
+    ctx.memory.write_byte(addresses.SMS_NOKI_REQ, addresses.SMS_NOKI_LO)
     return
 
 
@@ -424,12 +496,12 @@ def unpack_item(item, ctx, amt=0):
     elif item == 523013:
         activate_yoshi(ctx)
     elif 523004 < item < 523012:
-        activate_ticket(item)
+        activate_ticket(item, ctx)
 
 
-def disable_shadow_mario():
-    if dme.is_hooked():
-        dme.write_double(addresses.SMS_SHADOW_MARIO_STATE, 0)
+def disable_shadow_mario(ctx: SmsContext):
+    if ctx.memory.is_hooked():
+        ctx.memory.write_bytes(addresses.SMS_SHADOW_MARIO_STATE, bytes(8))
 
 
 @dataclass
@@ -454,36 +526,36 @@ TICKETS: list[Ticket] = [
 ]
 
 
-def activate_ticket(id: int):
+def activate_ticket(id: int, ctx: SmsContext):
     for tickets in TICKETS:
         if id == tickets.item_id:
             tickets.active = True
-            handle_ticket(tickets)
+            handle_ticket(tickets, ctx)
             if not ticket_listing.__contains__(tickets.item_name):
                 ticket_listing.append(tickets.item_name)
                 logger.info("Current Tickets: " + str(ticket_listing))
 
 
-def handle_ticket(tick: Ticket):
+def handle_ticket(tick: Ticket, ctx: SmsContext):
     if not tick.active:
         return
     if tick.item_name == "Noki Bay Ticket":
-        special_noki_handling()
-    open_stage(tick)
+        special_noki_handling(ctx)
+    open_stage(tick, ctx)
     return
 
 
-def refresh_all_tickets():
+def refresh_all_tickets(ctx: SmsContext):
     for tickets in TICKETS:
-        handle_ticket(tickets)
+        handle_ticket(tickets, ctx)
 
 
-def extra_unlocks_needed():
-    if not dme.is_hooked():
+def extra_unlocks_needed(ctx: SmsContext):
+    if not ctx.memory.is_hooked():
         return
-    dme.write_byte(addresses.SMS_YOSHI_UNLOCK-1, 240)
-    val = bit_flagger((dme.read_byte(addresses.SMS_YOSHI_UNLOCK)), 1, True)
-    dme.write_byte(addresses.SMS_YOSHI_UNLOCK, val)
+    ctx.memory.write_byte(addresses.SMS_YOSHI_UNLOCK-1, 240)
+    val = bit_flagger((ctx.memory.read_byte(addresses.SMS_YOSHI_UNLOCK)), 1, True)
+    ctx.memory.write_byte(addresses.SMS_YOSHI_UNLOCK, val)
 
 
 def activate_nozzle(id, ctx):
@@ -495,10 +567,10 @@ def activate_nozzle(id, ctx):
             ctx.ap_nozzles_received.append(1)
 
     if id == 523013:
-        temp = dme.read_byte(addresses.SMS_YOSHI_UNLOCK)
+        temp = ctx.memory.read_byte(addresses.SMS_YOSHI_UNLOCK)
         if temp < 2:
-            dme.write_byte(addresses.SMS_YOSHI_UNLOCK, 2)
-        extra_unlocks_needed()
+            ctx.memory.write_byte(addresses.SMS_YOSHI_UNLOCK, 2)
+        extra_unlocks_needed(ctx)
     if id == 523002:
         if not ctx.ap_nozzles_received.__contains__(2):
             ctx.ap_nozzles_received.append(2)
@@ -511,16 +583,16 @@ def activate_nozzle(id, ctx):
 
 
 def activate_yoshi(ctx):
-    temp = dme.read_byte(addresses.SMS_YOSHI_UNLOCK)
+    temp = ctx.memory.read_byte(addresses.SMS_YOSHI_UNLOCK)
     if temp < 130:
-        dme.write_byte(addresses.SMS_YOSHI_UNLOCK, 0x80)
+        ctx.memory.write_byte(addresses.SMS_YOSHI_UNLOCK, 0x80)
         # BEGIN YOSHI BANDAID
     if ctx.yoshi_mode:
-        flag = dme.read_byte(0x8057898c)
+        flag = ctx.memory.read_byte(0x8057898c)
         new_flag = bit_flagger(flag, 1, True)
-        dme.write_byte(0x8057898c, new_flag)
+        ctx.memory.write_byte(0x8057898c, new_flag)
     # END YOSHI BANDAID
-    extra_unlocks_needed()
+    extra_unlocks_needed(ctx)
 
     if not ctx.ap_nozzles_received.__contains__(4):
         ctx.ap_nozzles_received.append(4)
@@ -532,9 +604,9 @@ def resolve_tickets(stage, ctx):
         if tick.course_id == stage and not tick.active:
             logger.info("Entering a stage without a ticket! Initiating bootout...")
             # Byte 1 should correspond to Delfino Plaza
-            dme.write_byte(addresses.SMS_NEXT_STAGE, 1)
+            ctx.memory.write_byte(addresses.SMS_NEXT_STAGE, 1)
             #dme.write_byte(addresses.SMS_NEXT_EPISODE, 8)
-            dme.write_byte(addresses.SMS_CURRENT_STAGE, 1)
+            ctx.memory.write_byte(addresses.SMS_CURRENT_STAGE, 1)
             #dme.write_byte(addresses.SMS_CURRENT_STAGE, ctx.plaza_episode)
         else:
             send_map_id(stage, ctx)
@@ -553,36 +625,42 @@ async def send_map_id(map_id, ctx):
 async def handle_stages(ctx):
     while not ctx.exit_event.is_set():
         if ctx.dolphin_status == CONNECTION_CONNECTED_STATUS: #Gravi01  change to connection status
-            next_stage = dme.read_byte(addresses.SMS_NEXT_STAGE)
-            cur_stage = dme.read_byte(addresses.SMS_CURRENT_STAGE)
+            next_stage = ctx.memory.read_byte(addresses.SMS_NEXT_STAGE)
+            cur_stage = ctx.memory.read_byte(addresses.SMS_CURRENT_STAGE)
+            if next_stage != ctx.next_stage:
+                # loading a stage loads the flags from the save, which may not have all items yet
+                ctx.next_stage = next_stage
+                ctx.reapply_items = True
             if ctx.fludd_start == 2 and next_stage == 0x00: # Airstrip 1 skip
-                dme.write_byte(addresses.SMS_NEXT_STAGE, 0x01)
+                ctx.memory.write_byte(addresses.SMS_NEXT_STAGE, 0x01)
 
             if next_stage == 0x01: # Delfino Plaza
-                next_episode = dme.read_byte(addresses.SMS_NEXT_EPISODE)
+                next_episode = ctx.memory.read_byte(addresses.SMS_NEXT_EPISODE)
                 ctx.plaza_episode = next_episode
 
                 # If starting Fluddless without ticket mode on, open Bianco Hills
                 if next_episode == 0x0 and ctx.fludd_start == 2 and ctx.ticket_mode == 0:
-                    check_world_flags(TICKETS[0].address, 4, True)
-                    open_stage(TICKETS[0])
+                    check_world_flags(TICKETS[0].address, 4, True, ctx)
+                    open_stage(TICKETS[0], ctx)
                 # Sets plaza state to 8 if it is not and goal hasn't been reached
                 if (ctx.ticket_mode == 1 and next_episode != 0x8 and not ctx.corona_message_given):
-                    dme.write_byte(addresses.SMS_NEXT_EPISODE, 8)
+                    ctx.memory.write_byte(addresses.SMS_NEXT_EPISODE, 8)
                 if not next_episode == 0x01:
-                    dme.write_byte(addresses.SMS_SHADOW_MARIO_STATE, 0x0)
+                    ctx.memory.write_byte(addresses.SMS_SHADOW_MARIO_STATE, 0x0)
                     # BEGIN YOSHI BANDAID
             elif next_stage == 0x05 and cur_stage != next_stage: # Pinna Park
                 if ctx.yoshi_mode:
-                    next_episode = dme.read_byte(addresses.SMS_NEXT_EPISODE)
+                    next_episode = ctx.memory.read_byte(addresses.SMS_NEXT_EPISODE)
                     if next_episode == 0x03:
-                        dme.write_byte(addresses.SMS_NEXT_EPISODE, 0x04)
-                        dme.write_byte(addresses.SMS_CURRENT_EPISODE, 0x04)
+                        ctx.memory.write_byte(addresses.SMS_NEXT_EPISODE, 0x04)
+                        ctx.memory.write_byte(addresses.SMS_CURRENT_EPISODE, 0x04)
                     # END YOSHI BANDAID
+            ctx.memory.flush()
             if cur_stage != next_stage:
                 await send_map_id(next_stage, ctx)
                 if ctx.ticket_mode:
                     resolve_tickets(next_stage, ctx)
+                    ctx.memory.flush()
                  
         await asyncio.sleep(0.1)
 
@@ -0,0 +1,146 @@
+"""Access to the emulated memory of Super Mario Sunshine for the client.
+
+Every call into dolphin_memory_engine crosses into the emulator process, so the client reads each watched region
+with one call per tick and serves all reads from that snapshot. Writes are collected and written at the end of the
+tick, skipping values memory already holds, with neighbouring bytes written together."""
+from __future__ import annotations
+
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from . import addresses
+
+
+class DolphinMemory:
+    """Memory of the running emulator, through dolphin_memory_engine."""
+
+    def __init__(self) -> None:
+        import dolphin_memory_engine
+        self.dme = dolphin_memory_engine
+
+    def is_hooked(self) -> bool:
+        return self.dme.is_hooked()
+
+    def read_bytes(self, address: int, size: int) -> bytes:
+        return self.dme.read_bytes(address, size)
+
+    def write_bytes(self, address: int, data: bytes) -> None:
+        self.dme.write_bytes(address, data)
+
+
+class MockDolphinMemory(DolphinMemory):
+    """Memory without an emulator, for running the client logic headless. Counts the calls that would have gone to
+    Dolphin. Unwritten memory reads as 0."""
+
+    def __init__(self, memory: Optional[Dict[int, int]] = None) -> None:
+        self.memory: Dict[int, int] = dict(memory or {})
+        self.hooked = True
+        self.reads = 0
+        self.writes = 0
+
+    def is_hooked(self) -> bool:
+        return self.hooked
+
+    def read_bytes(self, address: int, size: int) -> bytes:
+        self.reads += 1
+        return bytes(self.memory.get(address + offset, 0) for offset in range(size))
+
+    def write_bytes(self, address: int, data: bytes) -> None:
+        self.writes += 1
+        for offset, value in enumerate(data):
+            self.memory[address + offset] = value
+
+
+class MemoryRegion:
+    def __init__(self, start: int, size: int) -> None:
+        self.start = start
+        self.size = size
+        self.data: Optional[bytearray] = None
+        self.read_time = 0.0
+
+    def __contains__(self, address: int) -> bool:
+        return self.start <= address < self.start + self.size
+
+
+WATCHED_REGIONS: List[Tuple[int, int]] = [
+    # save file flags: shines, blue coins, tickets, Yoshi, counters and Shadow Mario
+    (addresses.SMS_SHINE_LOCATION_OFFSET, addresses.ARB_VERSION_CHECKER + 4 - addresses.SMS_SHINE_LOCATION_OFFSET),
+    # current and next stage and episode
+    (addresses.SMS_CURRENT_STAGE, addresses.SMS_NEXT_EPISODE + 1 - addresses.SMS_CURRENT_STAGE),
+    (addresses.ARB_FLUDD_ENABLER, addresses.ARB_NOZZLES_ENABLER + 1 - addresses.ARB_FLUDD_ENABLER),
+]
+
+
+class MemorySnapshot:
+    """Reads of watched regions are served from a copy of the region, which is read again once it is older than
+    max_age. Writes are only applied to the copy until flush, which writes the changed bytes."""
+    max_age: float = 0.05
+    """ seconds a snapshot is used for, shorter than the client's quickest loop so every tick sees fresh memory """
+
+    def __init__(self, backend: DolphinMemory, regions: Iterable[Tuple[int, int]] = WATCHED_REGIONS) -> None:
+        self.backend = backend
+        self.regions = [MemoryRegion(start, size) for start, size in regions]
+        self.pending: Dict[int, int] = {}
+        """ address: byte to write on flush """
+
+    def is_hooked(self) -> bool:
+        return self.backend.is_hooked()
+
+    def invalidate(self) -> None:
+        """Drops the snapshots and pending writes, for when the game was (re)loaded."""
+        for region in self.regions:
+            region.data = None
+        self.pending.clear()
+
+    def _get_region(self, address: int, size: int = 1) -> Optional[MemoryRegion]:
+        for region in self.regions:
+            if address in region and address + size - 1 in region:
+                now = time.monotonic()
+                if region.data is None or now - region.read_time > self.max_age:
+                    region.data = bytearray(self.backend.read_bytes(region.start, region.size))
+                    region.read_time = now
+                    for pending_address, value in self.pending.items():
+                        if pending_address in region:
+                            region.data[pending_address - region.start] = value
+                return region
+        return None
+
+    def read_bytes(self, address: int, size: int) -> bytes:
+        region = self._get_region(address, size)
+        if region is None:
+            return self.backend.read_bytes(address, size)
+        offset = address - region.start
+        return bytes(region.data[offset:offset + size])
+
+    def read_byte(self, address: int) -> int:
+        return self.read_bytes(address, 1)[0]
+
+    def write_bytes(self, address: int, data: bytes) -> None:
+        for offset, value in enumerate(data):
+            self.write_byte(address + offset, value)
+
+    def write_byte(self, address: int, value: int) -> None:
+        region = self._get_region(address)
+        if region is None:
+            self.pending[address] = value
+        elif region.data[address - region.start] != value or address in self.pending:
+            region.data[address - region.start] = value
+            self.pending[address] = value
+
+    def flush(self) -> int:
+        """Writes pending bytes, one write per run of consecutive addresses. Returns the number of writes."""
+        writes = 0
+        run_start, run = 0, bytearray()
+        for address in sorted(self.pending):
+            if run and address != run_start + len(run):
+                self.backend.write_bytes(run_start, bytes(run))
+                writes += 1
+                run = bytearray()
+            if not run:
+                run_start = address
+            run.append(self.pending[address])
+        if run:
+            self.backend.write_bytes(run_start, bytes(run))
+            writes += 1
+        self.pending.clear()
+        return writes
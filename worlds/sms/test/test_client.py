@@ -0,0 +1,86 @@
+import typing
+import unittest
+from collections import Counter
+
+from CommonClient import process_server_cmd
+
+from ..SMSClient import CREDITS, SmsContext, complete_goal, send_victory
+
+
+class MockServer:
+    """Stands in for the server connection of a client, counting the messages it gets.
+    Acknowledges checks like MultiServer does, with a RoomUpdate of the newly checked locations."""
+
+    def __init__(self, ctx: SmsContext, locations: typing.Set[int]):
+        self.ctx = ctx
+        self.checked: typing.Set[int] = set()
+        self.messages: typing.Counter[str] = Counter()
+        self.acknowledge = True
+        ctx.send_msgs = self.receive
+        ctx.slot = 1
+        ctx.missing_locations = set(locations)
+
+    async def receive(self, msgs: typing.List[typing.Dict[str, typing.Any]]) -> None:
+        for msg in msgs:
+            self.messages[msg["cmd"]] += 1
+            if msg["cmd"] == "LocationChecks" and self.acknowledge:
+                new = set(msg["locations"]) - self.checked
+                self.checked |= new
+                if new:
+                    await process_server_cmd(self.ctx, {"cmd": "RoomUpdate", "checked_locations": list(new)})
+
+
+class TestCheckReporting(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.ctx = SmsContext(None, None)
+        self.server = MockServer(self.ctx, set(range(523000, 523100)))
+
+    async def test_only_new_checks(self) -> None:
+        # a session of 5 ticks per second, finding a shine every 10 seconds
+        for tick in range(5 * 60):
+            if tick % 50 == 0:
+                self.ctx.locations_checked.add(523000 + tick // 50)
+            await self.ctx.send_new_checks()
+        self.assertEqual(self.server.checked, set(range(523000, 523006)))
+        self.assertEqual(self.server.messages, {"LocationChecks": 6})
+
+    async def test_resync_when_unacknowledged(self) -> None:
+        self.ctx.location_resend_delay = 0
+        self.server.acknowledge = False
+        self.ctx.locations_checked.add(523000)
+        await self.ctx.send_new_checks()
+        await self.ctx.send_new_checks()
+        self.assertEqual(self.server.messages, {"LocationChecks": 2, "Sync": 1})
+
+        self.server.acknowledge = True
+        await self.ctx.send_new_checks()
+        await self.ctx.send_new_checks()
+        self.assertEqual(self.server.messages, {"LocationChecks": 3, "Sync": 2})
+        self.assertEqual(self.server.checked, {523000})
+        await self.ctx.send_new_checks()
+        self.assertEqual(self.server.messages, {"LocationChecks": 3, "Sync": 2}, "nothing left to send")
+
+
+class TestGoal(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.ctx = SmsContext(None, None)
+        self.server = MockServer(self.ctx, set())
+        self.logged: typing.List[str] = []
+        self.ctx.schedule_messages = lambda messages: self.logged.extend(messages)
+
+    async def test_goal_reported_once(self) -> None:
+        await complete_goal(self.ctx)
+        self.assertEqual(self.server.messages, {})
+
+        send_victory(self.ctx)
+        self.ctx.slot = None  # not connected
+        await complete_goal(self.ctx)
+        self.assertEqual(self.server.messages, {})
+        self.assertFalse(self.ctx.finished_game)
+
+        self.ctx.slot = 1
+        for _ in range(3):
+            await complete_goal(self.ctx)
+        self.assertEqual(self.server.messages, {"StatusUpdate": 1})
+        self.assertTrue(self.ctx.finished_game)
+        self.assertEqual(self.logged, CREDITS)
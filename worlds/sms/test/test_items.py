@@ -0,0 +1,81 @@
+import unittest
+
+from NetUtils import NetworkItem
+
+from .. import SMSClient, addresses
+from ..memory import MemorySnapshot, MockDolphinMemory
+from ..SMSClient import CONNECTION_CONNECTED_STATUS, SmsContext, refresh_collection_counts
+
+SHINE = 523004
+BIANCO_TICKET = 523005
+BIANCO_TICKET_FLAG = (0x805789f8, 1 << 5)
+
+
+class TestItemApplication(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        SMSClient.world_flags.clear()
+        for ticket in SMSClient.TICKETS:
+            ticket.active = False
+        self.ctx = SmsContext(None, None)
+        self.ctx.dolphin_status = CONNECTION_CONNECTED_STATUS
+        self.backend = MockDolphinMemory()
+        self.ctx.memory = MemorySnapshot(self.backend)
+        self.ctx.memory.max_age = -1  # every tick reads memory again
+
+    def receive(self, *items: int) -> None:
+        self.ctx.items_received += [NetworkItem(item, 1, 1, 1) for item in items]
+
+    def tick(self) -> int:
+        """Runs the item part of a game_watcher tick, returning the number of writes."""
+        writes = self.backend.writes
+        refresh_collection_counts(self.ctx)
+        self.ctx.memory.flush()
+        return self.backend.writes - writes
+
+    def ticket_flag_set(self) -> bool:
+        address, mask = BIANCO_TICKET_FLAG
+        return bool(self.backend.memory.get(address, 0) & mask)
+
+    async def test_only_new_items(self) -> None:
+        self.receive(SHINE, BIANCO_TICKET)
+        self.assertGreater(self.tick(), 0)
+        self.assertEqual(self.backend.memory[addresses.SMS_SHINE_COUNTER], 1)
+        self.assertTrue(self.ticket_flag_set())
+        self.assertEqual(self.ctx.items_applied, 2)
+        self.assertEqual(self.tick(), 0, "nothing new arrived")
+
+        self.receive(SHINE)
+        self.tick()
+        self.assertEqual(self.backend.memory[addresses.SMS_SHINE_COUNTER], 2)
+        self.assertEqual(self.ctx.items_applied, 3)
+
+    async def test_reapply(self) -> None:
+        self.receive(SHINE, BIANCO_TICKET)
+        self.tick()
+        address, mask = BIANCO_TICKET_FLAG
+
+        # entering a stage loads the flags of the save
+        self.backend.memory[address] &= ~mask
+        self.assertEqual(self.tick(), 0, "without a stage change nothing is reapplied")
+        self.ctx.reapply_items = True
+        self.tick()
+        self.assertTrue(self.ticket_flag_set())
+
+        # reloading the save resets the shine counter as well
+        self.backend.memory[address] &= ~mask
+        self.backend.memory[addresses.SMS_SHINE_COUNTER] = 0
+        self.tick()
+        self.assertTrue(self.ticket_flag_set())
+        self.assertEqual(self.backend.memory[addresses.SMS_SHINE_COUNTER], 1)
+
+    async def test_restored_index(self) -> None:
+        # the client restarted while the game kept running with the first two items applied
+        self.backend.memory[addresses.SMS_SHINE_COUNTER] = 1
+        self.ctx.items_applied = 2
+        self.ctx.item_counts = None
+        self.assertEqual(self.tick(), 0, "items have not arrived yet")
+
+        self.receive(SHINE, BIANCO_TICKET, SHINE)
+        self.tick()
+        self.assertEqual(self.backend.memory[addresses.SMS_SHINE_COUNTER], 2)
+        self.assertFalse(self.ticket_flag_set(), "already applied items should not be applied again")
@@ -0,0 +1,57 @@
+import unittest
+
+from NetUtils import NetworkItem
+
+from .. import addresses
+from ..memory import MemorySnapshot, MockDolphinMemory
+from ..SMSClient import CONNECTION_CONNECTED_STATUS, SmsContext, refresh_collection_counts
+
+
+class TestMemorySnapshot(unittest.TestCase):
+    def setUp(self) -> None:
+        self.backend = MockDolphinMemory({0x100: 1, 0x101: 2})
+        self.memory = MemorySnapshot(self.backend, [(0x100, 16)])
+
+    def test_reads_from_snapshot(self) -> None:
+        self.assertEqual([self.memory.read_byte(0x100 + offset) for offset in range(16)], [1, 2] + [0] * 14)
+        self.assertEqual(self.memory.read_bytes(0x100, 2), b"\x01\x02")
+        self.assertEqual(self.backend.reads, 1)
+        self.memory.read_byte(0x200)
+        self.assertEqual(self.backend.reads, 2, "unwatched memory is read directly")
+
+        self.memory.max_age = -1
+        self.backend.memory[0x100] = 5
+        self.assertEqual(self.memory.read_byte(0x100), 5, "old snapshots should be read again")
+
+    def test_writes(self) -> None:
+        self.memory.write_byte(0x100, 1)
+        self.memory.write_bytes(0x102, b"\x00\x00")
+        self.assertEqual(self.memory.flush(), 0, "unchanged values should not be written")
+
+        for address in (0x102, 0x103, 0x105, 0x200):
+            self.memory.write_byte(address, 7)
+        self.assertEqual(self.memory.read_byte(0x103), 7, "reads should see pending writes")
+        self.assertEqual(self.backend.writes, 0)
+        self.assertEqual(self.memory.flush(), 3, "neighbouring bytes should be written together")
+        self.assertEqual([self.backend.memory.get(address) for address in (0x102, 0x103, 0x104, 0x105, 0x200)],
+                         [7, 7, None, 7, 7])
+
+
+class TestClientMemory(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.ctx = SmsContext(None, None)
+        self.ctx.dolphin_status = CONNECTION_CONNECTED_STATUS
+        self.backend = MockDolphinMemory()
+        self.ctx.memory = MemorySnapshot(self.backend)
+
+    async def test_item_counters(self) -> None:
+        self.ctx.items_received = [NetworkItem(523004, 1, 1, 1)] * 3
+        refresh_collection_counts(self.ctx)
+        self.ctx.memory.flush()
+        self.assertEqual(self.backend.memory[addresses.SMS_SHINE_COUNTER], 3)
+        self.assertEqual(self.backend.reads, 1, "the watched region should be read once")
+        writes = self.backend.writes
+
+        refresh_collection_counts(self.ctx)
+        self.ctx.memory.flush()
+        self.assertEqual(self.backend.writes, writes, "nothing changed, so nothing should be written")